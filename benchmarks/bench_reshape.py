@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of reshaping a month of archive rows for many cells to wide hourly rows,
+long_to_wide against pandas.pivot_table, with run time and peak memory of each.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_reshape.py --n-cells 100
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from wind_dashapp.data_processing.dmi import OBSERVATIONAL_WIND_PARAMETERS
+from wind_dashapp.data_processing.reshape import long_to_wide
+
+
+def make_archive_rows(n_cells: int, n_days: int) -> pd.DataFrame:
+    cell_ids = np.array([f"10km_{600 + i // 50}_{40 + i % 50}" for i in range(n_cells)], dtype=object)
+    hours = pd.date_range("2023-01-01", periods=n_days * 24, freq="h", tz="UTC").as_unit("s").asi8
+    n_parameters = len(OBSERVATIONAL_WIND_PARAMETERS)
+
+    return pd.DataFrame(
+        {
+            "cell_id": np.repeat(cell_ids, len(hours) * n_parameters),
+            "from": np.tile(np.repeat(hours, n_parameters), n_cells),
+            "parameter_id": np.tile(OBSERVATIONAL_WIND_PARAMETERS, n_cells * len(hours)),
+            "value": np.random.default_rng(0).uniform(0, 20, n_cells * len(hours) * n_parameters),
+        }
+    )
+
+
+def reshape_with_pivot_table(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.pivot_table(df, values="value", index=["cell_id", "from"], columns="parameter_id").reset_index()
+
+
+def reshape_with_long_to_wide(df: pd.DataFrame) -> pd.DataFrame:
+    (cell_ids, from_seconds), parameters, values = long_to_wide(
+        [df["cell_id"].to_numpy(), df["from"].to_numpy()], df["parameter_id"].to_numpy(), df["value"].to_numpy()
+    )
+    df_wide = pd.DataFrame(values, columns=parameters)
+    df_wide.insert(0, "cell_id", cell_ids)
+    df_wide.insert(1, "from", from_seconds)
+
+    return df_wide
+
+
+def peak_memory(func, df: pd.DataFrame) -> int:
+    tracemalloc.start()
+    func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark reshaping archive rows to wide hourly rows.")
+    parser.add_argument("--n-cells", type=int, default=100)
+    parser.add_argument("--n-days", type=int, default=31)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    df = make_archive_rows(args.n_cells, args.n_days)
+    expected = reshape_with_pivot_table(df)
+    result = reshape_with_long_to_wide(df)
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+    print(f"{len(df)} rows, {args.n_cells} cells, {args.n_days} days")
+    timings = {}
+    for name, func in [("pivot_table", reshape_with_pivot_table), ("long_to_wide", reshape_with_long_to_wide)]:
+        timings[name] = min(timeit.repeat(lambda: func(df), number=1, repeat=args.repeat))
+        print(f"{name:>14}: {timings[name] * 1000:.1f} ms, peak {peak_memory(func, df) / 1024**2:.1f} MB")
+
+    print(f"{'speedup':>14}: {timings['pivot_table'] / timings['long_to_wide']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
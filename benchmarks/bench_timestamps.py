@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of parse_and_filter_dates on a year of hourly observations in the long format of
+the climateData API, against the previous implementation (regex scan, ISO 8601 parser, tz_convert).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_timestamps.py
+"""
+
+import argparse
+import timeit
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from wind_dashapp.data_processing.dmi import OBSERVATIONAL_WIND_PARAMETERS
+from wind_dashapp.helper_functions.app_helper_functions import parse_and_filter_dates
+
+
+def make_year_of_observations(year: int = 2023) -> pd.DataFrame:
+    hours = pd.date_range(f"{year}-01-01", f"{year + 1}-01-01", freq="h", tz="UTC", inclusive="left")
+    from_values = np.asarray(hours.strftime("%Y-%m-%dT%H:%M:%S+00:00"), dtype=object)
+    # One row per day with the millisecond bug of the DMI API
+    midnights = pd.date_range(f"{year}-01-01", periods=365, freq="D", tz="Europe/Copenhagen")
+    bug_values = np.asarray(midnights.strftime("%Y-%m-%dT00:00:00.001000%z"), dtype=object)
+    bug_values = np.array([value[:-2] + ":" + value[-2:] for value in bug_values], dtype=object)
+
+    from_column = np.tile(np.concatenate([from_values, bug_values]), len(OBSERVATIONAL_WIND_PARAMETERS))
+    n_per_parameter = len(from_values) + len(bug_values)
+
+    return pd.DataFrame(
+        {
+            "from": from_column,
+            "parameter_id": np.repeat(OBSERVATIONAL_WIND_PARAMETERS, n_per_parameter),
+            "value": np.random.default_rng(0).uniform(0, 20, len(from_column)),
+        }
+    )
+
+
+def parse_and_filter_dates_previous(df: pd.DataFrame) -> pd.DataFrame:
+    df["has_microseconds"] = df["from"].str.contains("00:00:00.001000")
+    df_filtered = df[~df["has_microseconds"]].copy()
+    df_filtered["from_datetime"] = pd.to_datetime(df_filtered["from"], format="ISO8601")
+    df_filtered["from_datetime"] = df_filtered["from_datetime"].dt.tz_convert("Europe/Copenhagen")
+
+    return df_filtered.drop(columns=["from", "to", "has_microseconds"], errors="ignore")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the parsing of observation timestamps.")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    df = make_year_of_observations()
+    new = parse_and_filter_dates(df.copy())
+    previous = parse_and_filter_dates_previous(df.copy())
+    pd.testing.assert_frame_equal(new.reset_index(drop=True), previous.reset_index(drop=True))
+
+    print(f"{len(df)} rows, {len(df) - len(new)} with the millisecond bug")
+    timings = {}
+    candidates = [("previous", parse_and_filter_dates_previous), ("parse_and_filter_dates", parse_and_filter_dates)]
+    for name, func in candidates:
+        timings[name] = min(timeit.repeat(lambda: func(df.copy()), number=1, repeat=args.repeat))
+        print(f"{name:>24}: {timings[name] * 1000:.1f} ms")
+
+    print(f"{'speedup':>24}: {timings['previous'] / timings['parse_and_filter_dates']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,39 @@
-from dash import dcc, html, Dash, set_props, State
+import time
+
+# Taken before the other imports, which are most of the cold start of a worker
+_worker_start = time.perf_counter()
+
+from dash import dcc, html, Dash, set_props, State, Patch, ctx, no_update
 import dash_bootstrap_components as dbc
 from dash_bootstrap_templates import load_figure_template
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output
 import dash_mantine_components as dmc
 import os
+import threading
 
 from wind_dashapp.helper_functions import app_graph_functions as graphs
+from wind_dashapp.helper_functions.background_callbacks import create_background_callback_manager, get_celery_app
+from wind_dashapp.helper_functions.forecast_prewarm import record_cell_request
+from wind_dashapp.helper_functions.frame_store import (
+    FRAME_STORE_BACKEND,
+    get_frame_store,
+    is_session_key,
+    make_frame_key,
+    new_session_id,
+)
+from wind_dashapp.helper_functions.map_figure import load_map_figure, register_map_figure_route
 import datetime as dt
 from dotenv import load_dotenv
 import pandas as pd
+import plotly.graph_objects as go
 from dash_iconify import DashIconify
 
 from wind_dashapp.helper_functions.app_helper_functions import (
     load_wind_obs_data_to_app,
     load_wind_forecast_data_to_app,
     DEFAULT_NUMBER_OF_HOURS_FETCH_FORECAST,
-    convert_json_to_df,
+    decode_store_frame,
+    encode_frame_for_store,
     map_slider_to_date,
 )
 
@@ -24,6 +42,19 @@ load_dotenv()
 DMI_API_KEY_OBSERVATION = os.getenv("DMI_API_KEY_OBSERVATION")
 DMI_API_KEY_FORECAST = os.getenv("DMI_API_KEY_FORECAST")
 USE_MOCK_DATA = os.getenv("USE_MOCK_DATA", "True").lower() in ("true", "1", "yes", "on")
+# "lazy" renders the layout with placeholders and loads the initial forecast on the first request,
+# "eager" loads it at import time
+APP_STARTUP_MODE = os.getenv("APP_STARTUP_MODE", "lazy").lower()
+# "clientside" moves the forecast chart window and the observations in the browser (assets/forecast_chart.js),
+# "server" sends dash.Patch updates from update_chart_with_obs
+CHART_WINDOWING = os.getenv("CHART_WINDOWING", "clientside").lower()
+# Load the initial forecast in a background thread at startup, so the first request hits the cache
+APP_WARM_ON_STARTUP = os.getenv("APP_WARM_ON_STARTUP", "False").lower() in ("true", "1", "yes", "on")
+# Send the numeric columns of the stores as base64-packed typed arrays instead of JSON lists
+STORE_PACK_ARRAYS = os.getenv("STORE_PACK_ARRAYS", "False").lower() in ("true", "1", "yes", "on")
+# "client" sends the forecast and observation frames through the browser in the stores, "server" keeps them
+# in the frame store of the server (see frame_store.py) and the stores hold only their keys
+APP_DATA_STORE = os.getenv("APP_DATA_STORE", "client").lower()
 
 
 ######## INITIALIZE APP ####################
@@ -34,7 +65,15 @@ def custom_error_handler(err):
     )
 
 
-app = Dash(prevent_initial_callbacks=True)
+# Runs the data loading callbacks in fetch workers when APP_BACKGROUND_CALLBACKS is set (see background_callbacks.py)
+background_callback_manager = create_background_callback_manager()
+# For the celery workers: celery -A wind_dashapp.app:celery_app worker
+celery_app = get_celery_app(background_callback_manager)
+BACKGROUND_CALLBACKS_ENABLED = background_callback_manager is not None
+if BACKGROUND_CALLBACKS_ENABLED and APP_DATA_STORE == "server" and FRAME_STORE_BACKEND == "memory":
+    raise ValueError("Background callbacks run in other processes, use FRAME_STORE_BACKEND=redis with them")
+
+app = Dash(prevent_initial_callbacks=True, background_callback_manager=background_callback_manager)
 
 load_figure_template("MORPH")
 
@@ -44,38 +83,106 @@ start_lat = 56.078
 start_date = "2023-01-02"
 
 ######## READ BASE DATA ######################
-# Compute initial forecast data for dcc.Store initialization
-initial_wind_forecast_data = load_wind_forecast_data_to_app(
-    DMI_API_KEY_FORECAST, start_lon, start_lat, "wind", use_mock_data=USE_MOCK_DATA
-)
-initial_forecast_data_store = {
-    "forecast_data": initial_wind_forecast_data.to_dict("records"),
-    "cell_id": start_cell_id,
-    "lon": start_lon,
-    "lat": start_lat,
-}
+if APP_STARTUP_MODE == "eager":
+    # Compute initial forecast data for dcc.Store initialization
+    initial_wind_forecast_data = load_wind_forecast_data_to_app(
+        DMI_API_KEY_FORECAST, start_lon, start_lat, "wind", use_mock_data=USE_MOCK_DATA
+    )
+    initial_forecast_data_store = {
+        "forecast_data": encode_frame_for_store(initial_wind_forecast_data, STORE_PACK_ARRAYS),
+        "cell_id": start_cell_id,
+        "lon": start_lon,
+        "lat": start_lat,
+    }
+else:
+    # Filled by load_forecast_data on the first request
+    initial_wind_forecast_data = None
+    initial_forecast_data_store = None
+
+
+def warm_initial_forecast():
+    start = time.perf_counter()
+    try:
+        load_wind_forecast_data_to_app(DMI_API_KEY_FORECAST, start_lon, start_lat, "wind", use_mock_data=USE_MOCK_DATA)
+    except ValueError as e:
+        print(f"[warm_initial_forecast] Failed to load the initial forecast: {e}")
+        return
+    print(f"[warm_initial_forecast] Initial forecast loaded in {time.perf_counter() - start:.2f} s")
+
+
+if APP_WARM_ON_STARTUP:
+    threading.Thread(target=warm_initial_forecast, daemon=True).start()
+
+
+# Frames in the server-side store are accessible by the session of the page that loaded them
+def create_session_id_store():
+    return dcc.Store(id="session_id_store", data=new_session_id())
+
+
+def to_data_store(df: pd.DataFrame, kind: str, session_id: str) -> dict:
+    if APP_DATA_STORE == "server":
+        frame_key = make_frame_key(session_id, kind)
+        try:
+            get_frame_store().put(frame_key, df)
+            return {"frame_key": frame_key}
+        except ValueError as e:
+            # Sent through the browser instead, from_data_store reads both
+            print(f"[to_data_store] {e}, sending the {kind} frame to the browser")
+
+    return encode_frame_for_store(df, STORE_PACK_ARRAYS)
+
+
+def from_data_store(data: dict, session_id: str, reload) -> pd.DataFrame:
+    """
+    Returns the frame of a store value of to_data_store. Frames that expired from the
+    server-side store, or belong to another session, are loaded again with `reload`.
+    """
+    if "frame_key" not in data:
+        return decode_store_frame(data)
+
+    frame_key = data["frame_key"]
+    df = get_frame_store().get(frame_key) if is_session_key(frame_key, session_id) else None
+    if df is None:
+        print(f"[from_data_store] Frame {frame_key} not in the frame store, reloading")
+        df = reload()
+
+    return df
+
 
 forecast_wind_store = dcc.Store(id="forecast_data_store", data=initial_forecast_data_store)
 obs_wind_store = dcc.Store(id="obs_data_store")
 
 
-forecast_slider_date_map = map_slider_to_date(initial_wind_forecast_data)
+forecast_slider_date_map = {}
+if initial_wind_forecast_data is not None:
+    forecast_slider_date_map = map_slider_to_date(initial_wind_forecast_data)
 forecast_slider_date_map_store = dcc.Store(id="forecast_slider_date_map_store", data=forecast_slider_date_map)
 obs_slider_date_map_store = dcc.Store(id="obs_slider_date_map_store", data={})
 
 ######## CREATE INITIAL FIGURES ##############
-# Map
-fig_map = graphs.create_map_chart()
+# Map, served prebuilt and loaded by the browser (see map_figure.py)
+map_figure_hash, map_figure_payload = load_map_figure()
+map_figure_url = register_map_figure_route(app, map_figure_hash, map_figure_payload)
+map_figure_url_store = dcc.Store(id="map_figure_url_store", data=map_figure_url)
+fig_map = go.Figure(layout=graphs.create_map_layout())
 
 # Forecast chart
-chart_dmi_forecast = graphs.create_forecast_chart(
-    forecast_data=initial_wind_forecast_data,
-    col_wind_speed="wind_speed",
-    col_wind_max_speed="gust_wind_speed_10m",
-    col_wind_direction="wind_dir",
-    col_datetime="from_datetime",
-    cell_id=start_cell_id,
-)
+if initial_wind_forecast_data is not None:
+    chart_dmi_forecast = graphs.create_forecast_chart(
+        forecast_data=initial_wind_forecast_data,
+        col_wind_speed="wind_speed",
+        col_wind_max_speed="gust_wind_speed_10m",
+        col_wind_direction="wind_dir",
+        col_datetime="from_datetime",
+        cell_id=start_cell_id,
+    )
+    chart_dmi_forecast.update_xaxes(
+        range=graphs.get_forecast_x_range(
+            pd.DatetimeIndex(initial_wind_forecast_data["from_datetime"]), 1, DEFAULT_NUMBER_OF_HOURS_FETCH_FORECAST
+        )
+    )
+else:
+    chart_dmi_forecast = graphs.create_placeholder_chart("Loading forecast...")
 
 ######## SET UP DASH COMPONENTS ##############
 
@@ -262,6 +369,9 @@ fig_forecast_w_obs = dbc.Card(
     [
         html.Div(
             [
+                # Shown while the data loading callbacks run
+                html.Div(id="forecast_loading_status", style={"margin": "0 1rem"}),
+                html.Div(id="obs_loading_status", style={"margin": "0 1rem"}),
                 dcc.Graph(
                     id="chart_forecast",
                     figure=chart_dmi_forecast,
@@ -311,26 +421,46 @@ page_content = dbc.Container(
     fluid=True,
 )
 
-app.layout = dmc.MantineProvider(
-    [
-        forecast_wind_store,
-        obs_wind_store,
-        forecast_slider_date_map_store,
-        obs_slider_date_map_store,
-        html.Div(
-            [
-                sidebar,
-                page_content,
-            ],
-            className="main-div",
-        ),
-    ]
-)
+
+def serve_layout():
+    # A function, so every page load gets its own session id
+    return dmc.MantineProvider(
+        [
+            create_session_id_store(),
+            forecast_wind_store,
+            obs_wind_store,
+            forecast_slider_date_map_store,
+            obs_slider_date_map_store,
+            map_figure_url_store,
+            html.Div(
+                [
+                    sidebar,
+                    page_content,
+                ],
+                className="main-div",
+            ),
+        ]
+    )
+
+
+app.layout = serve_layout
 
 
 ############ CALLBAKCKS ###############
 # def get_area_data(click_data)
 
+app.clientside_callback(
+    """
+    async function(url) {
+        const response = await fetch(url);
+        return await response.json();
+    }
+    """,
+    Output("map_figure", "figure"),
+    Input("map_figure_url_store", "data"),
+    prevent_initial_call=False,
+)
+
 
 @app.callback(
     Output("area_name_card", "children"),
@@ -352,8 +482,13 @@ def update_area_name(click_data):
     [
         Input("map_figure", "clickData"),
     ],
+    State("session_id_store", "data"),
+    # Loads the initial forecast when it was not loaded at startup
+    prevent_initial_call=APP_STARTUP_MODE == "eager",
+    background=BACKGROUND_CALLBACKS_ENABLED,
+    running=[(Output("forecast_loading_status", "children"), "Loading forecast...", "")],
 )
-def load_forecast_data(click_data):
+def load_forecast_data(click_data, session_id):
     if click_data is None:
         cell_id = start_cell_id
         lon = start_lon
@@ -363,16 +498,25 @@ def load_forecast_data(click_data):
         lon = click_data["points"][0]["customdata"][1]
         lat = click_data["points"][0]["customdata"][2]
 
+    # Counted for pre-warming the forecasts of the most requested cells (see forecast_prewarm.py)
+    if not USE_MOCK_DATA:
+        record_cell_request(cell_id)
     wind_forecast_data_from_click = load_wind_forecast_data_to_app(
         DMI_API_KEY_FORECAST, lon, lat, "wind", use_mock_data=USE_MOCK_DATA
     )
-    # Return as dict (json-serializable)
-    return {
-        "forecast_data": wind_forecast_data_from_click.to_dict("records"),
+    forecast_data_store = {
+        "forecast_data": to_data_store(wind_forecast_data_from_click, "forecast", session_id),
         "cell_id": cell_id,
         "lon": lon,
         "lat": lat,
     }
+    if APP_DATA_STORE == "server":
+        # The time axis for windowing the chart, in the browser or in update_chart_with_obs
+        forecast_data_store["forecast_times"] = encode_frame_for_store(
+            wind_forecast_data_from_click[["from_datetime"]], STORE_PACK_ARRAYS
+        )
+
+    return forecast_data_store
 
 
 # --- Callback: Load observational data and store in dcc.Store ---
@@ -386,8 +530,11 @@ def load_forecast_data(click_data):
         Input("date_picker", "value"),
         Input("map_figure", "clickData"),
     ],
+    State("session_id_store", "data"),
+    background=BACKGROUND_CALLBACKS_ENABLED,
+    running=[(Output("obs_loading_status", "children"), "Loading observations...", "")],
 )
-def load_obs_data(obs_toggle, date, click_data):
+def load_obs_data(obs_toggle, date, click_data, session_id):
     if not obs_toggle or not date:
         return None, {}
 
@@ -403,25 +550,33 @@ def load_obs_data(obs_toggle, date, click_data):
         date,
         use_mock_data=USE_MOCK_DATA,
     )
-    # Convert to dict for storage
-    return wind_obs_data_from_click.to_dict("records"), map_slider_to_date(wind_obs_data_from_click)
+    return (
+        to_data_store(wind_obs_data_from_click, "obs", session_id),
+        map_slider_to_date(wind_obs_data_from_click),
+    )
 
 
 # --- Callback: Update chart (with or without obs data) ---
+CHART_PATCH_INPUTS = {"range_slider_forecast", "range_slider_obs", "time_picker"}
+# With clientside windowing the server only rebuilds the chart when the data changes
+ChartWindowDependency = State if CHART_WINDOWING == "clientside" else Input
+
+
 @app.callback(
     Output("chart_forecast", "figure"),
     [
         Input("forecast_data_store", "data"),
         Input("toggle-observational-data", "checked"),
         Input("obs_data_store", "data"),
-        Input("range_slider_forecast", "value"),
-        Input("range_slider_obs", "value"),
-        Input("time_picker", "value"),
+        ChartWindowDependency("range_slider_forecast", "value"),
+        ChartWindowDependency("range_slider_obs", "value"),
+        ChartWindowDependency("time_picker", "value"),
     ],
     [
         State("date_picker", "value"),
         State("forecast_slider_date_map_store", "data"),
         State("obs_slider_date_map_store", "data"),
+        State("session_id_store", "data"),
     ],
 )
 def update_chart_with_obs(
@@ -434,14 +589,61 @@ def update_chart_with_obs(
     date,
     forecast_slider_date_map_store,
     obs_slider_date_map_store,
+    session_id,
 ):
-    forecast_data = pd.DataFrame(forecast_data_store["forecast_data"])
+    if forecast_data_store is None:
+        return no_update
+
+    # The frames are only loaded when needed, the time axis is enough to move the window
+    forecast_times = pd.DatetimeIndex(
+        decode_store_frame(forecast_data_store.get("forecast_times", forecast_data_store["forecast_data"]))[
+            "from_datetime"
+        ]
+    )
     forecast_slider_datetime_min = forecast_slider[0]
     forecast_slider_datetime_max = forecast_slider[1]
-    forecast_data = forecast_data.iloc[forecast_slider_datetime_min:forecast_slider_datetime_max]
+    x_range = graphs.get_forecast_x_range(forecast_times, forecast_slider_datetime_min, forecast_slider_datetime_max)
     cell_id = forecast_data_store["cell_id"]
-    forecast_data = convert_json_to_df(forecast_data)
-    # Create base forecast chart
+
+    # If obs toggle is on and date is given, overlay obs data from store
+    show_obs = obs_toggle and date and obs_data is not None
+    if show_obs:
+        wind_obs_data_from_click = from_data_store(
+            obs_data,
+            session_id,
+            lambda: load_wind_obs_data_to_app(DMI_API_KEY_OBSERVATION, cell_id, date, use_mock_data=USE_MOCK_DATA),
+        )
+        obs_datetime = graphs.get_obs_datetime(date, time_picker)
+        obs_shift = graphs.get_obs_shift(
+            forecast_times, obs_datetime, obs_slider, forecast_slider_datetime_min, forecast_slider_datetime_max
+        )
+        obs_columns = dict(
+            col_wind_speed="mean_wind_speed",
+            col_wind_max_speed="max_wind_speed_3sec",
+            col_wind_direction="mean_wind_dir",
+            col_datetime="from_datetime",
+        )
+
+    # Slider and hour changes only move the visible range and the observations
+    if ctx.triggered_prop_ids and set(ctx.triggered_prop_ids.values()) <= CHART_PATCH_INPUTS:
+        patch = Patch()
+        patch["layout"]["xaxis"]["range"] = x_range
+        if show_obs:
+            graphs.patch_obs_overlay(patch, wind_obs_data_from_click, obs_datetime, obs_shift, **obs_columns)
+        return patch
+
+    # Create base forecast chart over the whole horizon, the sliders set the visible range
+    forecast_data = from_data_store(
+        forecast_data_store["forecast_data"],
+        session_id,
+        lambda: load_wind_forecast_data_to_app(
+            DMI_API_KEY_FORECAST,
+            forecast_data_store["lon"],
+            forecast_data_store["lat"],
+            "wind",
+            use_mock_data=USE_MOCK_DATA,
+        ),
+    )
     chart = graphs.create_forecast_chart(
         forecast_data=forecast_data,
         col_wind_speed="wind_speed",
@@ -450,37 +652,37 @@ def update_chart_with_obs(
         col_datetime="from_datetime",
         cell_id=cell_id,
     )
-    # If obs toggle is on and date is given, overlay obs data from store
-    if obs_toggle:
-        if date:
-            if obs_data is not None:
-                wind_obs_data_from_click = pd.DataFrame(obs_data)
-                wind_obs_data_from_click = convert_json_to_df(wind_obs_data_from_click)
-
-                chart = graphs.add_obs_data_to_forecast_chart(
-                    forecast_chart=chart,
-                    obs_data=wind_obs_data_from_click,
-                    obs_ref_position=obs_slider,
-                    col_wind_speed="mean_wind_speed",
-                    col_wind_max_speed="max_wind_speed_3sec",
-                    col_wind_direction="mean_wind_dir",
-                    col_datetime="from_datetime",
-                    cell_id=cell_id,
-                    obs_date=date,
-                    reference_hour=time_picker,
-                    start_hour=forecast_slider_datetime_min,
-                    end_hour=forecast_slider_datetime_max,
-                )
-                return chart
-            else:
-                return chart
-        else:
-            return chart
-    else:
-        return chart
+    chart.update_xaxes(range=x_range)
+
+    if show_obs:
+        chart = graphs.add_obs_data_to_forecast_chart(
+            forecast_chart=chart,
+            obs_data=wind_obs_data_from_click,
+            obs_datetime=obs_datetime,
+            obs_shift=obs_shift,
+            cell_id=cell_id,
+            **obs_columns,
+        )
+
+    return chart
+
+
+if CHART_WINDOWING == "clientside":
+    app.clientside_callback(
+        ClientsideFunction(namespace="forecast_chart", function_name="window_forecast_chart"),
+        Output("chart_forecast", "figure", allow_duplicate=True),
+        Input("range_slider_forecast", "value"),
+        Input("range_slider_obs", "value"),
+        Input("time_picker", "value"),
+        State("chart_forecast", "figure"),
+        State("forecast_data_store", "data"),
+    )
 
 
 ###########################################################
 
+# Time from the imports of this module until the app is ready to serve, reported per worker
+print(f"[app] App initialized in {time.perf_counter() - _worker_start:.2f} s (startup mode: {APP_STARTUP_MODE})")
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,105 @@
+// Clientside windowing of the forecast chart: the forecast slider sets the visible range and the
+// observation slider and time picker shift the observations, without a request to the server.
+// Mirrors get_forecast_x_range and get_obs_shift in app_graph_functions.py.
+
+const HOUR_MS = 3600 * 1000;
+
+// "sv-SE" formats as "YYYY-MM-DD HH:MM:SS", the local time format of the chart
+const chartTimeFormat = new Intl.DateTimeFormat("sv-SE", {
+    timeZone: "Europe/Copenhagen",
+    year: "numeric",
+    month: "2-digit",
+    day: "2-digit",
+    hour: "2-digit",
+    minute: "2-digit",
+    second: "2-digit",
+    hourCycle: "h23",
+});
+
+function formatChartTime(ms) {
+    return chartTimeFormat.format(new Date(ms));
+}
+
+// Epoch ms from an ISO string with offset or an epoch number (seconds or ms)
+function toEpochMs(value) {
+    if (typeof value === "number") {
+        return value < 1e11 ? value * 1000 : value;
+    }
+    return Date.parse(value);
+}
+
+// Values of a column of encode_frame_for_store, a JSON list or a base64-packed typed array
+function getStoreColumn(storeFrame, name) {
+    const column = storeFrame.columns[name];
+    if (typeof column.values !== "string") {
+        return column.values;
+    }
+    const bytes = Uint8Array.from(atob(column.values), (c) => c.charCodeAt(0));
+    const TypedArray = column.dtype === "<f8" ? Float64Array : Float32Array;
+    return Array.from(new TypedArray(bytes.buffer));
+}
+
+// With the server-side data store, forecast_data holds only a key and the time axis is sent separately
+function getForecastTimes(forecastStore) {
+    const timesFrame = forecastStore.forecast_times || forecastStore.forecast_data;
+    return getStoreColumn(timesFrame, "from_datetime").map(toEpochMs);
+}
+
+function windowForecastChart(forecastSlider, obsSlider, timePicker, figure, forecastStore) {
+    if (!figure || !forecastStore) {
+        return window.dash_clientside.no_update;
+    }
+
+    const times = getForecastTimes(forecastStore);
+    const [startHour, endHour] = forecastSlider;
+    const rangeStart = times[Math.min(startHour, times.length - 1)] - HOUR_MS / 2;
+    const rangeEnd = times[Math.min(endHour, times.length) - 1] + HOUR_MS / 2;
+
+    const newFigure = {
+        ...figure,
+        layout: {
+            ...figure.layout,
+            xaxis: {...figure.layout.xaxis, range: [formatChartTime(rangeStart), formatChartTime(rangeEnd)]},
+        },
+    };
+
+    const obsMeta = figure.layout.meta && figure.layout.meta.obs;
+    if (!obsMeta) {
+        return newFigure;
+    }
+
+    const referenceHour = parseInt(timePicker.split(":")[0], 10);
+    const obsDatetime = obsMeta.obs_datetime_ms + (referenceHour - obsMeta.reference_hour) * HOUR_MS;
+    const nHours = endHour - startHour;
+    const anchor = times[0] + (startHour + Math.ceil(nHours / 2) + obsSlider - 1) * HOUR_MS;
+    const shift = anchor - obsDatetime;
+
+    newFigure.data = figure.data.slice();
+    obsMeta.x_ms.forEach((xMs, i) => {
+        const trace = {...figure.data[obsMeta.trace_index + i]};
+        trace.x = xMs.map((ms) => (ms === null ? null : formatChartTime(ms + shift)));
+        if (trace.customdata) {
+            // Hour labels of the bars, as in create_wind_speed_chart
+            trace.customdata = trace.customdata.map((row, j) => [
+                row[0],
+                row[1],
+                parseInt(trace.x[j].slice(11, 13), 10) + ":00",
+            ]);
+        }
+        newFigure.data[obsMeta.trace_index + i] = trace;
+    });
+
+    newFigure.layout.shapes = figure.layout.shapes.slice();
+    obsMeta.shapes_ms.forEach((ms, i) => {
+        const x = formatChartTime(ms + (i === 0 ? shift + obsDatetime - obsMeta.obs_datetime_ms : shift));
+        newFigure.layout.shapes[i] = {...figure.layout.shapes[i], x0: x, x1: x};
+    });
+
+    return newFigure;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    forecast_chart: {
+        window_forecast_chart: windowForecastChart,
+    },
+});
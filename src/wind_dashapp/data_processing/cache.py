@@ -0,0 +1,449 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import Any, BinaryIO, Dict, Hashable, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows, only in-process de-duplication is available
+    fcntl = None
+
+LOCK_DIR_NAME = ".locks"
+N_LOCK_FILES = 64  # keys are striped over a fixed set of lock files, so they never have to be cleaned up
+
+INDEX_FILE_NAME = "index.sqlite"
+# "npz" keeps parsed DataFrames in a binary tier in front of the raw JSON responses,
+# "json" only keeps the raw responses (e.g. for debugging)
+CACHE_FORMAT = os.getenv("DMI_CACHE_FORMAT", "npz")
+MEMO_MAX_ENTRIES = int(os.getenv("DMI_MEMO_MAX_ENTRIES", 256))
+MEMO_MAX_BYTES = int(os.getenv("DMI_MEMO_MAX_BYTES", 64 * 1024**2))
+CACHE_MAX_BYTES = int(os.getenv("DMI_CACHE_MAX_BYTES", 512 * 1024**2))
+CACHE_TTL_SECONDS = {
+    "forecast": int(os.getenv("DMI_FORECAST_CACHE_TTL_SECONDS", 12 * 3600)),
+    # Historical observations do not change, so they can be kept much longer
+    "observation": int(os.getenv("DMI_OBSERVATION_CACHE_TTL_SECONDS", 365 * 24 * 3600)),
+    # Windows reaching into the last hours are still being filled in, so they are refreshed soon
+    "recent_observation": int(os.getenv("DMI_RECENT_OBSERVATION_CACHE_TTL_SECONDS", 3600)),
+}
+
+_key_locks_guard = threading.Lock()
+_key_locks: Dict[str, threading.Lock] = {}
+_key_lock_users: Dict[str, int] = {}
+
+
+def _get_key_lock(cache_key: str) -> threading.Lock:
+    with _key_locks_guard:
+        if cache_key not in _key_locks:
+            _key_locks[cache_key] = threading.Lock()
+            _key_lock_users[cache_key] = 0
+        _key_lock_users[cache_key] += 1
+
+        return _key_locks[cache_key]
+
+
+def _release_key_lock(cache_key: str):
+    with _key_locks_guard:
+        _key_lock_users[cache_key] -= 1
+        if _key_lock_users[cache_key] == 0:
+            del _key_locks[cache_key]
+            del _key_lock_users[cache_key]
+
+
+def _get_lock_file_path(cache_dir: str, cache_key: str) -> str:
+    lock_dir = os.path.join(cache_dir, LOCK_DIR_NAME)
+    os.makedirs(lock_dir, exist_ok=True)
+    stripe = int(hashlib.md5(cache_key.encode("utf-8")).hexdigest(), 16) % N_LOCK_FILES
+
+    return os.path.join(lock_dir, f"{stripe:02d}.lock")
+
+
+@contextmanager
+def single_flight(cache_dir: str, cache_key: str):
+    """
+    Serializes work on the same cache key. Threads of this process wait on an in-process
+    lock, and processes sharing the cache directory (e.g. gunicorn workers) wait on a file lock.
+    Callers should re-check the cache once inside, as another caller may have filled it.
+    """
+    key_lock = _get_key_lock(cache_key)
+    try:
+        with key_lock:
+            if fcntl is None:
+                yield
+                return
+
+            with open(_get_lock_file_path(cache_dir, cache_key), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        _release_key_lock(cache_key)
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "wb"):
+    """
+    Opens a temporary file next to `path` for writing and renames it into place on success,
+    so readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, data: Dict[str, Any]):
+    with atomic_open(path, "w") as f:
+        json.dump(data, f)
+
+
+def atomic_write_chunks(path: str, chunks: Iterable[bytes]):
+    with atomic_open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def _frame_to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    arrays = {}
+    timezones = {}
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            timezones[col] = str(series.dt.tz)
+            arrays[f"c{i}"] = series.dt.as_unit("ns").array.asi8
+        elif series.dtype == object:
+            arrays[f"c{i}"] = series.to_numpy(dtype=str)
+        else:
+            arrays[f"c{i}"] = series.to_numpy()
+
+    meta = {"columns": list(df.columns), "timezones": timezones}
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    return arrays
+
+
+def write_frame_npz(path: str, df: pd.DataFrame):
+    """
+    Writes a DataFrame column by column to an .npz file. Timezone-aware datetime columns are
+    stored as int64 nanoseconds since epoch with their timezone, so reading skips datetime parsing.
+    The index is not stored.
+    """
+    with atomic_open(path, "wb") as f:
+        np.savez(f, **_frame_to_arrays(df))
+
+
+def frame_to_npz_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Returns the contents of write_frame_npz as bytes, e.g. for an external cache.
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **_frame_to_arrays(df))
+
+    return buffer.getvalue()
+
+
+def read_frame_npz(path: Union[str, BinaryIO]) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(npz["meta"].item())
+        data = {}
+        for i, col in enumerate(meta["columns"]):
+            values = npz[f"c{i}"]
+            if col in meta["timezones"]:
+                data[col] = pd.to_datetime(values, unit="ns", utc=True).tz_convert(meta["timezones"][col])
+            else:
+                data[col] = values
+
+    return pd.DataFrame(data, columns=meta["columns"])
+
+
+class CacheIndex:
+    """
+    SQLite index over the files in a cache directory, holding creation time, size, kind
+    and last access of each entry. Entries older than the TTL of their kind are expired,
+    and the least recently used entries are evicted when the total size exceeds `max_bytes`.
+    The index is shared by all processes using the directory; the counters are per process.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_seconds: Optional[Dict[str, int]] = None,
+    ):
+        if ttl_seconds is None:
+            ttl_seconds = CACHE_TTL_SECONDS
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.index_path = os.path.join(cache_dir, INDEX_FILE_NAME)
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    file_name TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_kind_created_at ON entries (kind, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        with closing(sqlite3.connect(self.index_path, timeout=30)) as conn:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+
+    def _count(self, counter: str, n: int = 1):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def _is_expired(self, kind: str, created_at: float, now: float) -> bool:
+        ttl = self.ttl_seconds.get(kind)
+
+        return ttl is not None and now - created_at > ttl
+
+    def lookup(self, file_name: str) -> Optional[str]:
+        """
+        Returns the path of a fresh cache entry and marks it as used, or None on a miss.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT kind, created_at FROM entries WHERE file_name = ?", (file_name,)).fetchone()
+
+            if row is not None and self._is_expired(row[0], row[1], now):
+                self._remove(conn, [file_name])
+                self._count("evictions")
+                row = None
+
+            path = os.path.join(self.cache_dir, file_name)
+            if row is not None and not os.path.exists(path):
+                conn.execute("DELETE FROM entries WHERE file_name = ?", (file_name,))
+                row = None
+
+            if row is None:
+                self._count("misses")
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE file_name = ?", (now, file_name))
+
+        self._count("hits")
+        return path
+
+    def add(self, file_name: str, kind: str):
+        """
+        Registers a file written to the cache directory and evicts entries over budget.
+        """
+        now = time.time()
+        size = os.path.getsize(os.path.join(self.cache_dir, file_name))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (file_name, kind, created_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_name, kind, now, size, now),
+            )
+
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then least recently used entries until the cache fits the size budget.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            to_remove = []
+            for kind, ttl in self.ttl_seconds.items():
+                if ttl is not None:
+                    rows = conn.execute(
+                        "SELECT file_name FROM entries WHERE kind = ? AND created_at < ?", (kind, now - ttl)
+                    )
+                    to_remove += [file_name for (file_name,) in rows]
+            self._remove(conn, to_remove)
+
+            total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total_bytes > self.max_bytes:
+                lru_entries = []
+                for file_name, size in conn.execute("SELECT file_name, size FROM entries ORDER BY last_access"):
+                    if total_bytes <= self.max_bytes:
+                        break
+                    lru_entries.append(file_name)
+                    total_bytes -= size
+                self._remove(conn, lru_entries)
+                to_remove += lru_entries
+
+        self._count("evictions", len(to_remove))
+        return len(to_remove)
+
+    def _remove(self, conn: sqlite3.Connection, file_names):
+        conn.executemany("DELETE FROM entries WHERE file_name = ?", [(file_name,) for file_name in file_names])
+        for file_name in file_names:
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            n_entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": n_entries,
+            "total_bytes": total_bytes,
+        }
+
+
+_cache_indexes_lock = threading.Lock()
+_cache_indexes: Dict[str, CacheIndex] = {}
+
+
+def get_cache_index(cache_dir: str) -> CacheIndex:
+    """
+    Returns the index of a cache directory, shared within the process.
+    """
+    key = os.path.abspath(cache_dir)
+    with _cache_indexes_lock:
+        if key not in _cache_indexes:
+            _cache_indexes[key] = CacheIndex(cache_dir)
+
+        return _cache_indexes[key]
+
+
+def read_parsed_frame(cache_dir: str, cache_key: str) -> Optional[pd.DataFrame]:
+    """
+    Returns the parsed DataFrame cached for `cache_key`, or None on a miss or if the binary tier is disabled.
+    """
+    if CACHE_FORMAT != "npz":
+        return None
+
+    cache_path = get_cache_index(cache_dir).lookup(f"{cache_key}.npz")
+    if cache_path is None:
+        return None
+
+    try:
+        return read_frame_npz(cache_path)
+    except FileNotFoundError:  # evicted by another process in the meantime
+        return None
+
+
+def write_parsed_frame(cache_dir: str, cache_key: str, kind: str, df: pd.DataFrame):
+    if CACHE_FORMAT != "npz":
+        return
+
+    cache_index = get_cache_index(cache_dir)
+    file_name = f"{cache_key}.npz"
+    write_frame_npz(os.path.join(cache_dir, file_name), df)
+    cache_index.add(file_name, kind)
+
+
+class FrameLRUCache:
+    """
+    Thread-safe in-memory LRU cache of DataFrames, bounded by entry count and memory usage.
+    Entries put with `expires_at` (epoch seconds) are dropped once read after that time.
+    Frames are copied on read, so callers can modify the returned frames freely.
+    """
+
+    def __init__(self, max_entries: int = MEMO_MAX_ENTRIES, max_bytes: int = MEMO_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires_at: Dict[Hashable, float] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: Hashable):
+        del self._frames[key]
+        self.total_bytes -= self._sizes.pop(key)
+        self._expires_at.pop(key, None)
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None and key in self._expires_at and self._expires_at[key] <= time.time():
+                self._remove(key)
+                self.evictions += 1
+                df = None
+            if df is None:
+                self.misses += 1
+                return None
+
+            self._frames.move_to_end(key)
+            self.hits += 1
+
+        return df.copy()
+
+    def put(self, key: Hashable, df: pd.DataFrame, expires_at: Optional[float] = None):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._frames:
+                self._remove(key)
+
+            self._frames[key] = df.copy()
+            self._sizes[key] = size
+            if expires_at is not None:
+                self._expires_at[key] = expires_at
+            self.total_bytes += size
+
+            while len(self._frames) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._frames)))
+                self.evictions += 1
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            if key in self._frames:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._sizes.clear()
+            self._expires_at.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._frames),
+                "total_bytes": self.total_bytes,
+            }
@@ -0,0 +1,287 @@
+"""
+PostgreSQL storage of observations and forecasts. Rows are kept in long format
+(cell_id, from, parameter_id, value) in tables partitioned by month on `from`, loaded in
+large batches with COPY and upserted from a staging table, so reloading a period is idempotent.
+
+Usage:
+    python -m wind_dashapp.data_processing.db data/obs_chunks
+"""
+
+import argparse
+import glob
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from wind_dashapp.data_processing.cache import read_frame_npz
+from wind_dashapp.data_processing.dmi import OBSERVATIONAL_WIND_PARAMETERS
+from wind_dashapp.data_processing.timestamps import epoch_to_datetime, parse_dmi_timestamps
+
+DB_NAME = os.getenv("DB_NAME", "weather")
+DB_USER = os.getenv("DB_USER", "weather_user")
+DB_PASSWORD = os.getenv("DB_WEATHER_PASSWORD")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_POOL_MAXCONN = int(os.getenv("DB_POOL_MAXCONN", "10"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+# After a failed connection the database is not tried again for this long
+DB_RETRY_SECONDS = float(os.getenv("DB_RETRY_SECONDS", "60"))
+# Serve observation windows from the database before calling the climateData API
+DB_OBS_ENABLED = os.getenv("DB_OBS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# The daily extremes are never observed at hourly resolution
+HOURLY_OBS_PARAMETERS = [parameter for parameter in OBSERVATIONAL_WIND_PARAMETERS if "_daily_" not in parameter]
+
+COPY_BATCH_ROWS = 200_000
+OBS_TABLE = "observations"
+FORECAST_TABLE = "forecasts"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {OBS_TABLE} (
+    cell_id text NOT NULL,
+    "from" timestamptz NOT NULL,
+    parameter_id text NOT NULL,
+    value double precision
+) PARTITION BY RANGE ("from");
+CREATE UNIQUE INDEX IF NOT EXISTS {OBS_TABLE}_cell_from_idx ON {OBS_TABLE} (cell_id, "from", parameter_id);
+
+CREATE TABLE IF NOT EXISTS {FORECAST_TABLE} (
+    cell_id text NOT NULL,
+    model_run text NOT NULL,
+    "from" timestamptz NOT NULL,
+    parameter_id text NOT NULL,
+    value double precision
+) PARTITION BY RANGE ("from");
+CREATE UNIQUE INDEX IF NOT EXISTS {FORECAST_TABLE}_cell_from_idx
+    ON {FORECAST_TABLE} (cell_id, "from", model_run, parameter_id);
+"""
+
+TABLE_KEYS = {
+    OBS_TABLE: ["cell_id", "from", "parameter_id"],
+    FORECAST_TABLE: ["cell_id", "model_run", "from", "parameter_id"],
+}
+
+
+def create_db_pool(minconn: int = 1, maxconn: int = DB_POOL_MAXCONN, **connect_kwargs) -> ThreadedConnectionPool:
+    params = {
+        "dbname": DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASSWORD,
+        "host": DB_HOST,
+        "port": DB_PORT,
+        "connect_timeout": DB_CONNECT_TIMEOUT,
+    }
+    params.update(connect_kwargs)
+
+    return ThreadedConnectionPool(minconn, maxconn, **params)
+
+
+_db_pool_lock = threading.Lock()
+_db_pool: Optional[ThreadedConnectionPool] = None
+_db_retry_at = 0.0
+
+
+def get_db_pool() -> ThreadedConnectionPool:
+    """
+    Returns the connection pool of this process, created on first use. Raises
+    psycopg2.OperationalError without connecting for DB_RETRY_SECONDS after a failed connection.
+    """
+    global _db_pool, _db_retry_at
+    with _db_pool_lock:
+        if _db_pool is None:
+            if time.monotonic() < _db_retry_at:
+                retry_in = _db_retry_at - time.monotonic()
+                raise psycopg2.OperationalError(f"Database unavailable, retrying in {retry_in:.0f} s")
+            try:
+                _db_pool = create_db_pool()
+            except psycopg2.OperationalError:
+                _db_retry_at = time.monotonic() + DB_RETRY_SECONDS
+                raise
+
+        return _db_pool
+
+
+def _discard_db_pool(pool: ThreadedConnectionPool):
+    """
+    Closes the pool of this process after a connection failure, so it is rebuilt after DB_RETRY_SECONDS.
+    """
+    global _db_pool, _db_retry_at
+    with _db_pool_lock:
+        if _db_pool is pool:
+            _db_pool = None
+            _db_retry_at = time.monotonic() + DB_RETRY_SECONDS
+    pool.closeall()
+
+
+@contextmanager
+def db_connection(pool: Optional[ThreadedConnectionPool] = None) -> Iterator["psycopg2.extensions.connection"]:
+    """
+    Borrows a connection from the pool, committing on success and rolling back on errors.
+    """
+    is_process_pool = pool is None
+    if is_process_pool:
+        pool = get_db_pool()
+
+    try:
+        conn = pool.getconn()
+    except psycopg2.OperationalError:
+        if is_process_pool:
+            _discard_db_pool(pool)
+        raise
+
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        if not pool.closed:
+            pool.putconn(conn, close=bool(conn.closed))
+
+
+def create_schema(pool: Optional[ThreadedConnectionPool] = None):
+    with db_connection(pool) as conn, conn.cursor() as cursor:
+        cursor.execute(SCHEMA_SQL)
+
+
+def _ensure_partitions(cursor, table: str, months: List[pd.Period]):
+    for month in months:
+        start = month.start_time.tz_localize("UTC")
+        end = (month + 1).start_time.tz_localize("UTC")
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_{month.strftime('y%Ym%m')} PARTITION OF {table} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            (start.isoformat(), end.isoformat()),
+        )
+
+
+def _copy_frame(df: pd.DataFrame, table: str, pool: Optional[ThreadedConnectionPool] = None) -> int:
+    """
+    Loads a long frame with the columns of `table` and a UTC `from` column. Batches of
+    COPY_BATCH_ROWS rows are copied to a staging table and upserted (new values win).
+    """
+    keys = TABLE_KEYS[table]
+    columns = keys + ["value"]
+    df = df.drop_duplicates(subset=keys, keep="last")
+    months = sorted(df["from"].dt.tz_localize(None).dt.to_period("M").unique())
+
+    quoted_columns = ", ".join(f'"{col}"' for col in columns)
+    quoted_keys = ", ".join(f'"{col}"' for col in keys)
+    with db_connection(pool) as conn, conn.cursor() as cursor:
+        _ensure_partitions(cursor, table, months)
+        cursor.execute(f"CREATE TEMP TABLE {table}_staging (LIKE {table}) ON COMMIT DROP")
+
+        for i_start in range(0, len(df), COPY_BATCH_ROWS):
+            buffer = io.StringIO()
+            df.iloc[i_start : i_start + COPY_BATCH_ROWS][columns].to_csv(
+                buffer, index=False, header=False, date_format="%Y-%m-%dT%H:%M:%S%z"
+            )
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table}_staging ({quoted_columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        cursor.execute(
+            f"INSERT INTO {table} ({quoted_columns}) SELECT {quoted_columns} FROM {table}_staging "
+            f"ON CONFLICT ({quoted_keys}) DO UPDATE SET value = EXCLUDED.value"
+        )
+
+    print(f"[_copy_frame] Loaded {len(df)} rows into {table}")
+    return len(df)
+
+
+def load_observations(df: pd.DataFrame, pool: Optional[ThreadedConnectionPool] = None) -> int:
+    """
+    Loads parsed observations (parse_dmi_observational_data or archive chunks) into the database.
+    """
+    df = df.rename(columns={"cellId": "cell_id", "parameterId": "parameter_id"})
+    # Removes observations with microseconds, seems to be a bug in the DMI API
+    epoch_seconds, is_valid = parse_dmi_timestamps(df["from"].to_numpy())
+    df = pd.DataFrame(
+        {
+            "cell_id": df["cell_id"].to_numpy()[is_valid],
+            "from": epoch_to_datetime(epoch_seconds[is_valid], tz="UTC"),
+            "parameter_id": df["parameter_id"].to_numpy()[is_valid],
+            "value": df["value"].to_numpy()[is_valid],
+        }
+    )
+
+    return _copy_frame(df, OBS_TABLE, pool)
+
+
+def load_forecast(
+    df: pd.DataFrame,
+    cell_id: str,
+    model_run: Optional[str] = None,
+    pool: Optional[ThreadedConnectionPool] = None,
+) -> int:
+    """
+    Loads a parsed forecast (parse_dmi_forecast_data) of a cell into the database.
+    """
+    parameters = [col for col in df.columns if col not in ("from", "longitude", "latitude")]
+    df = df.melt(id_vars=["from"], value_vars=parameters, var_name="parameter_id", value_name="value")
+    df["from"] = epoch_to_datetime(parse_dmi_timestamps(df["from"].to_numpy())[0], tz="UTC")
+    df["cell_id"] = cell_id
+    df["model_run"] = model_run or ""
+
+    return _copy_frame(df, FORECAST_TABLE, pool)
+
+
+def load_obs_window(
+    cell_id: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    parameters: Optional[List[str]] = None,
+    pool: Optional[ThreadedConnectionPool] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Returns the hourly observations of a cell for [start, end) in the layout of the app loaders:
+    `from_datetime` in Copenhagen time and one column per parameter. Returns None unless every hour
+    of the window has every parameter, e.g. after a partial load, so the caller falls back to the API.
+    """
+    if parameters is None:
+        parameters = HOURLY_OBS_PARAMETERS
+
+    with db_connection(pool) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            f'SELECT "from", parameter_id, value FROM {OBS_TABLE} '
+            'WHERE cell_id = %s AND "from" >= %s AND "from" < %s AND parameter_id = ANY(%s) ORDER BY "from"',
+            (cell_id, start.isoformat(), end.isoformat(), list(parameters)),
+        )
+        rows = cursor.fetchall()
+
+    n_hours = int((end - start) / pd.Timedelta(hours=1))
+    if len(rows) < n_hours * len(parameters):
+        return None
+
+    df = pd.DataFrame(rows, columns=["from_datetime", "parameter_id", "value"])
+    df["from_datetime"] = pd.to_datetime(df["from_datetime"], utc=True).dt.tz_convert("Europe/Copenhagen")
+    df_wide = df.pivot(index="from_datetime", columns="parameter_id", values="value")
+    if len(df_wide) != n_hours or df_wide.columns.size != len(parameters):
+        return None
+
+    df_wide = df_wide[parameters].reset_index()
+    df_wide.columns.name = None
+
+    return df_wide
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load archive chunk files into the PostgreSQL database.")
+    parser.add_argument("chunk_dir", help="Directory with chunk files written by ingest_obs_archive")
+    args = parser.parse_args(argv)
+
+    create_schema()
+    for chunk_path in sorted(glob.glob(os.path.join(args.chunk_dir, "**", "*.npz"), recursive=True)):
+        load_observations(read_frame_npz(chunk_path))
+
+
+if __name__ == "__main__":
+    main()
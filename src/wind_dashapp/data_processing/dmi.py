@@ -1,15 +1,35 @@
+import codecs
 import datetime as dt
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from zipfile import ZipFile
 import hashlib
+import threading
+import time
+import numpy as np
 import pandas as pd
 import requests
-from typing import List, Optional, Dict, Any
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
+from wind_dashapp.data_processing.cache import atomic_write_chunks, get_cache_index, single_flight
+from wind_dashapp.data_processing.dmi_client import (
+    DMI_GATEWAY_URL,
+    DEFAULT_TIMEOUT,
+    DEFAULT_REQUESTS_PER_SECOND,
+    HostRateLimiter,
+    Timeout,
+    dmi_get,
+)
+
 CACHE_DIR = "cache"
+FORECAST_COLLECTIONS = {"wind": "harmonie_dini_sf", "waves": "wam_dw"}
+STREAM_CHUNK_SIZE = 64 * 1024
+MODEL_RUN_PROBE_INTERVAL = float(os.getenv("DMI_MODEL_RUN_PROBE_SECONDS", 300))
+OBSERVATION_SETTLE_SECONDS = float(os.getenv("DMI_OBSERVATION_SETTLE_SECONDS", 24 * 3600))
 FORECAST_WIND_PARAMETERS = ["wind-speed", "wind-dir", "gust-wind-speed-10m"]
+DEFAULT_BATCH_CONCURRENCY = 8
 OBSERVATIONAL_WIND_PARAMETERS = [
     "mean_temp",
     "mean_daily_max_temp",
@@ -21,6 +41,219 @@ OBSERVATIONAL_WIND_PARAMETERS = [
     "mean_pressure",
 ]
 
+_model_run_lock = threading.Lock()
+_latest_model_runs: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+_model_run_refreshes: Dict[Tuple[str, str], threading.Event] = {}
+
+
+def _open_cached_file(cache_index, file_name: str) -> Optional[BinaryIO]:
+    cache_path = cache_index.lookup(file_name)
+    if cache_path is None:
+        return None
+
+    try:
+        return open(cache_path, "rb")
+    except FileNotFoundError:  # evicted by another process in the meantime
+        return None
+
+
+def _open_or_fetch_response(
+    query_url: str,
+    cache_dir: str,
+    cache_key: str,
+    kind: str,
+    caller: str,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> BinaryIO:
+    """
+    Returns the cached raw response for `cache_key` opened for binary reading, fetching it from
+    the API on a miss. The response body is streamed to disk, so it is never held in memory as a whole.
+    Concurrent misses on the same key share a single upstream request.
+    The file is opened before it can be evicted, so an open handle stays readable.
+    """
+    cache_index = get_cache_index(cache_dir)
+    file_name = f"{cache_key}.json"
+
+    f = _open_cached_file(cache_index, file_name)
+    if f is not None:
+        print(f"[{caller}] Loading cached response from {f.name}")
+        return f
+
+    with single_flight(cache_dir, cache_key):
+        # Another request may have fetched the data while this one was waiting
+        f = _open_cached_file(cache_index, file_name)
+        if f is not None:
+            print(f"[{caller}] Loading response cached by concurrent request from {f.name}")
+            return f
+
+        cache_path = os.path.join(cache_dir, file_name)
+        try:
+            print(f"[{caller}] Fetching data from API: {query_url}")
+            if rate_limiter is not None:
+                rate_limiter.acquire(query_url)
+            with dmi_get(query_url, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+
+                print(f"[{caller}] Saving response to cache: {cache_path}")
+                atomic_write_chunks(cache_path, response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        except requests.exceptions.RequestException as errh:
+            raise ValueError(errh.args[0])
+
+        # Opened before registering, as adding may evict the file itself when it exceeds the budget
+        f = open(cache_path, "rb")
+        cache_index.add(file_name, kind)
+        return f
+
+
+def _load_or_fetch_json(
+    query_url: str,
+    cache_dir: str,
+    cache_key: str,
+    kind: str,
+    caller: str,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> Dict[str, Any]:
+    with _open_or_fetch_response(query_url, cache_dir, cache_key, kind, caller, timeout, rate_limiter) as f:
+        return json.load(f)
+
+
+def get_latest_model_run(
+    api_key: str,
+    collection_type: str,
+    gateway_url: str = DMI_GATEWAY_URL,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    probe_interval: float = MODEL_RUN_PROBE_INTERVAL,
+) -> Optional[str]:
+    """
+    Returns the id of the newest model run (EDR instance) of a forecast collection, or None
+    if it cannot be determined. The result is probed at most every `probe_interval` seconds
+    per collection and process, so a new run is picked up shortly after it is published.
+    While one caller probes, the others get the previous result, or wait for the first one.
+    """
+    api_type = _get_forecast_collection(collection_type)
+    probe_key = (gateway_url, api_type)
+
+    with _model_run_lock:
+        run_id, probed_at = _latest_model_runs.get(probe_key, (None, None))
+        if probed_at is not None and time.monotonic() - probed_at < probe_interval:
+            return run_id
+
+        refresh = _model_run_refreshes.get(probe_key)
+        is_refreshing = refresh is not None
+        if is_refreshing and probed_at is not None:
+            return run_id
+        if not is_refreshing:
+            refresh = _model_run_refreshes[probe_key] = threading.Event()
+
+    if is_refreshing:
+        refresh.wait()
+        with _model_run_lock:
+            return _latest_model_runs.get(probe_key, (None, None))[0]
+
+    probe_url = f"{gateway_url}/v1/forecastedr/collections/{api_type}/instances?api-key={api_key}"
+    try:
+        response = dmi_get(probe_url, timeout=timeout)
+        response.raise_for_status()
+        instance_ids = [instance["id"] for instance in response.json()["instances"]]
+        run_id = max(instance_ids)  # instance ids are ISO formatted run times
+    except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as err:
+        print(f"[get_latest_model_run] Could not determine latest model run for {api_type}: {err}")
+        run_id = None
+    finally:
+        with _model_run_lock:
+            _latest_model_runs[probe_key] = (run_id, time.monotonic())
+            del _model_run_refreshes[probe_key]
+        refresh.set()
+
+    return run_id
+
+
+def get_fallback_model_run() -> str:
+    """
+    Returns a stand-in for the model run id when it cannot be probed, changing every third hour.
+    """
+    now = dt.datetime.now()
+    # Floor hour to nearest lower multiple of 3
+    floored_hour = now.hour - (now.hour % 3)
+
+    return now.strftime(f"%Y%m%dT{floored_hour:02d}")
+
+
+def _get_forecast_collection(collection_type: str) -> str:
+    if collection_type not in FORECAST_COLLECTIONS.keys():
+        error_message = f"""Collection type has to be one of {list(FORECAST_COLLECTIONS.keys())}.
+        {collection_type} not valid.
+        """
+
+        raise ValueError(error_message)
+
+    return FORECAST_COLLECTIONS[collection_type]
+
+
+def _build_forecast_query_url(
+    api_key: str,
+    lon: float,
+    lat: float,
+    collection_type: str,
+    parameters: List[str],
+    gateway_url: str,
+    run_id: Optional[str] = None,
+) -> str:
+    base_url = f"{gateway_url}/v1/forecastedr/collections/"
+    api_type = _get_forecast_collection(collection_type)
+    parameters_text = ",".join(parameters)
+    # A known run is queried as its instance, so the data always matches the run in the cache key
+    instance_path = f"/instances/{run_id}" if run_id is not None else ""
+
+    return (
+        f"{base_url}{api_type}{instance_path}/position?coords=POINT({lon} {lat})"
+        f"&crs=crs84&parameter-name={parameters_text}&api-key={api_key}"
+    )
+
+
+def get_forecast_request(
+    api_key: str,
+    lon: float,
+    lat: float,
+    collection_type: str,
+    parameters: Optional[List[str]] = None,
+    gateway_url: str = DMI_GATEWAY_URL,
+) -> Tuple[str, str]:
+    """
+    Returns the query url and cache key of a forecast request, both for the newest model run.
+    If the run cannot be determined, the latest data of the collection is queried and the key
+    falls back to changing every third hour.
+    Callers that use the key themselves pass the request on to fetch_dmi_forecast_data,
+    so the key and the fetched data always belong to the same run.
+    """
+    if parameters is None:
+        parameters = FORECAST_WIND_PARAMETERS
+
+    run_id = get_latest_model_run(api_key, collection_type, gateway_url=gateway_url)
+    query_url = _build_forecast_query_url(api_key, lon, lat, collection_type, parameters, gateway_url, run_id)
+    if run_id is None:
+        run_id = get_fallback_model_run()
+
+    return query_url, hashlib.md5((query_url + run_id).encode("utf-8")).hexdigest()
+
+
+def get_forecast_cache_key(
+    api_key: str,
+    lon: float,
+    lat: float,
+    collection_type: str,
+    parameters: Optional[List[str]] = None,
+    gateway_url: str = DMI_GATEWAY_URL,
+) -> str:
+    """
+    Returns the cache key of a forecast request. The key follows the newest model run, so
+    cached data is reused until a new run is published. If the run cannot be determined,
+    the key falls back to changing every third hour.
+    """
+    return get_forecast_request(api_key, lon, lat, collection_type, parameters, gateway_url)[1]
+
 
 def fetch_dmi_forecast_data(
     api_key: str,
@@ -29,65 +262,74 @@ def fetch_dmi_forecast_data(
     collection_type: str,
     parameters: Optional[List[str]] = None,
     cache_dir: str = CACHE_DIR,
+    gateway_url: str = DMI_GATEWAY_URL,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    forecast_request: Optional[Tuple[str, str]] = None,
 ) -> Dict[str, Any]:
     """
     Fetches raw forecast data from the DMI API, with file-based caching.
     Returns the raw JSON response (does not extract values).
+    The rate limiter, if given, is only applied to requests that miss the cache.
+    `forecast_request` is the (query url, cache key) of get_forecast_request, if already resolved.
     """
+    if forecast_request is None:
+        forecast_request = get_forecast_request(api_key, lon, lat, collection_type, parameters, gateway_url)
+    query_url, cache_key = forecast_request
 
-    base_url = "https://dmigw.govcloud.dk/v1/forecastedr/collections/"
-    collections = {"wind": "harmonie_dini_sf", "waves": "wam_dw"}
-
-    if collection_type not in collections.keys():
-        error_message = f"""Collection type has to be one of {list(collections.keys())}.
-        {collection_type} not valid.
-        """
+    return _load_or_fetch_json(
+        query_url, cache_dir, cache_key, "forecast", "fetch_dmi_forecast_data", timeout, rate_limiter
+    )
 
-        raise ValueError(error_message)
 
+def fetch_dmi_forecast_data_batch(
+    api_key: str,
+    cells: List[Tuple[str, float, float]],
+    collection_type: str,
+    parameters: Optional[List[str]] = None,
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    cache_dir: str = CACHE_DIR,
+    gateway_url: str = DMI_GATEWAY_URL,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fetches and parses forecasts for many (cell_id, lon, lat) points concurrently.
+    At most `max_concurrency` requests are in flight and upstream requests are spaced by
+    `requests_per_second`; cells already in the file cache are served without an API call.
+    Returns the parsed DataFrames keyed by cell_id. Cells that fail are reported and left out.
+    """
     if parameters is None:
         parameters = FORECAST_WIND_PARAMETERS
 
-    api_type = collections[collection_type]
-    parameters_text = ",".join(parameters)
-    query_url = (
-        f"{base_url}{api_type}/position?coords=POINT({lon} {lat})"
-        f"&crs=crs84&parameter-name={parameters_text}&api-key={api_key}"
-    )
+    rate_limiter = HostRateLimiter(requests_per_second)
 
-    # --- Caching logic ---
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
+    def fetch_and_parse(lon, lat):
+        json_response = fetch_dmi_forecast_data(
+            api_key,
+            lon,
+            lat,
+            collection_type,
+            parameters=parameters,
+            cache_dir=cache_dir,
+            gateway_url=gateway_url,
+            rate_limiter=rate_limiter,
+        )
+        return parse_dmi_forecast_data(json_response, parameters)
 
-    # Make cache_key date and time sensitive (changes every third hour)
-    now = dt.datetime.now()
-    # Floor hour to nearest lower multiple of 3
-    floored_hour = now.hour - (now.hour % 3)
-    time_str = now.strftime(f"%Y%m%dT{floored_hour:02d}")
-    cache_key = hashlib.md5((query_url + time_str).encode("utf-8")).hexdigest()
-    cache_path = os.path.join(cache_dir, f"{cache_key}.json")
+    forecasts = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(fetch_and_parse, lon, lat): cell_id for cell_id, lon, lat in cells}
 
-    if os.path.exists(cache_path):
-        print(f"[fetch_dmi_forecast_data] Loading cached response from {cache_path}")
-        with open(cache_path, "r") as f:
-            return json.load(f)
+        for future in as_completed(futures):
+            cell_id = futures[future]
+            try:
+                forecasts[cell_id] = future.result()
+            except Exception as err:  # one failing cell must not drop the forecasts of the others
+                print(f"[fetch_dmi_forecast_data_batch] Failed to fetch forecast for {cell_id}: {err}")
 
-    # --- Fetch data from API ---
-    try:
-        print(f"[fetch_dmi_forecast_data] Fetching data from API: {query_url}")
-        response = requests.get(query_url)
-
-        response.raise_for_status()
-
-        json_response = response.json()
+    print(f"[fetch_dmi_forecast_data_batch] Fetched forecasts for {len(forecasts)} of {len(cells)} cells")
 
-        # Save to cache
-        print(f"[fetch_dmi_forecast_data] Saving response to cache: {cache_path}")
-        with open(cache_path, "w") as f:
-            json.dump(json_response, f)
-        return json_response
-    except requests.exceptions.RequestException as errh:
-        raise ValueError(errh.args[0])
+    return forecasts
 
 
 def parse_dmi_forecast_data(
@@ -118,46 +360,100 @@ def parse_dmi_forecast_data(
     return df
 
 
-def fetch_dmi_observational_data(api_key: str, cell_id: str, date_from: str, n_hours: int, cache_dir: str = CACHE_DIR):
-    base_url = "https://dmigw.govcloud.dk/v2/climateData/collections/10kmGridValue/items?"
-
+def _get_observational_start(date_from: str) -> dt.datetime:
     date_str = date_from + "T00:00:00"
     dt_from = dt.datetime.fromisoformat(date_str)  # naive datetime
     dt_from_dk = dt_from.replace(tzinfo=ZoneInfo("Europe/Copenhagen"))
-    dt_from_utc = dt_from_dk.astimezone(ZoneInfo("UTC"))
+
+    return dt_from_dk.astimezone(ZoneInfo("UTC"))
+
+
+def _build_observational_query_url(
+    api_key: str,
+    cell_id: str,
+    date_from: str,
+    n_hours: int,
+    gateway_url: str,
+) -> str:
+    base_url = f"{gateway_url}/v2/climateData/collections/10kmGridValue/items?"
+
+    dt_from_utc = _get_observational_start(date_from)
     dt_to_utc = dt_from_utc + dt.timedelta(hours=n_hours - 1)  # -1 because the API returns the data for the last hour
 
-    query_url = (
+    return (
         f"{base_url}cellId={cell_id}&datetime={dt_from_utc.replace(tzinfo=None).isoformat()}Z"
         f"/{dt_to_utc.replace(tzinfo=None).isoformat()}Z&api-key={api_key}"
     )
 
-    # --- Caching logic ---
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    # Use a hash of the query as the cache filename
-    cache_key = hashlib.md5(query_url.encode("utf-8")).hexdigest()
-    cache_path = os.path.join(cache_dir, f"{cache_key}.json")
 
-    if os.path.exists(cache_path):
-        print(f"[fetch_dmi_observational_data] Loading cached response from {cache_path}")
-        with open(cache_path, "r") as f:
-            return json.load(f)
+def get_observational_cache_key(
+    api_key: str,
+    cell_id: str,
+    date_from: str,
+    n_hours: int,
+    gateway_url: str = DMI_GATEWAY_URL,
+) -> str:
+    """
+    Returns the cache key of an observational data request, a hash of the query.
+    """
+    query_url = _build_observational_query_url(api_key, cell_id, date_from, n_hours, gateway_url)
 
-    try:
-        print(f"[fetch_dmi_observational_data] Fetching data from API: {query_url}")
-        response = requests.get(query_url)
+    return hashlib.md5(query_url.encode("utf-8")).hexdigest()
 
-        response.raise_for_status()
 
-        json_response = response.json()
+def get_observational_cache_kind(date_from: str, n_hours: int, now: Optional[dt.datetime] = None) -> str:
+    """
+    Returns the cache kind of an observational data request. Windows ending more than
+    OBSERVATION_SETTLE_SECONDS ago are complete and cached as "observation", windows reaching
+    closer to now may still miss hours and are cached as "recent_observation" with a short TTL.
+    """
+    if now is None:
+        now = dt.datetime.now(ZoneInfo("UTC"))
 
-        print(f"[fetch_dmi_observational_data] Saving response to cache: {cache_path}")
-        with open(cache_path, "w") as f:
-            json.dump(json_response, f)
-        return json_response
-    except requests.exceptions.RequestException as errh:
-        raise ValueError(errh.args[0])
+    dt_end_utc = _get_observational_start(date_from) + dt.timedelta(hours=n_hours)
+    if dt_end_utc + dt.timedelta(seconds=OBSERVATION_SETTLE_SECONDS) <= now:
+        return "observation"
+
+    return "recent_observation"
+
+
+def fetch_dmi_observational_data(
+    api_key: str,
+    cell_id: str,
+    date_from: str,
+    n_hours: int,
+    cache_dir: str = CACHE_DIR,
+    gateway_url: str = DMI_GATEWAY_URL,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    rate_limiter: Optional[HostRateLimiter] = None,
+):
+    with open_dmi_observational_data(
+        api_key, cell_id, date_from, n_hours, cache_dir, gateway_url, timeout, rate_limiter
+    ) as f:
+        return json.load(f)
+
+
+def open_dmi_observational_data(
+    api_key: str,
+    cell_id: str,
+    date_from: str,
+    n_hours: int,
+    cache_dir: str = CACHE_DIR,
+    gateway_url: str = DMI_GATEWAY_URL,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> BinaryIO:
+    """
+    Like fetch_dmi_observational_data, but returns the cached raw response opened for binary
+    reading instead of decoding it, for use with parse_dmi_observational_data_stream.
+    """
+    query_url = _build_observational_query_url(api_key, cell_id, date_from, n_hours, gateway_url)
+    cache_key = get_observational_cache_key(api_key, cell_id, date_from, n_hours, gateway_url=gateway_url)
+    kind = get_observational_cache_kind(date_from, n_hours)
+
+    return _open_or_fetch_response(
+        query_url, cache_dir, cache_key, kind, "fetch_dmi_observational_data", timeout, rate_limiter
+    )
 
 
 def parse_dmi_observational_data(
@@ -180,14 +476,141 @@ def parse_dmi_observational_data(
     return df
 
 
+class _JSONStream:
+    """
+    Minimal incremental JSON reader over a binary file object. Values are decoded one at
+    a time from a buffer that only holds the part of the document not consumed yet.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fp: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+
+        chunk = self.fp.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos :] + self.text_decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+
+        return not self.eof
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._read_more():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, got '{self.peek()}'")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read_more()
+
+
+def iter_geojson_features(fp: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the features of a GeoJSON FeatureCollection one at a time, without loading the document.
+    """
+    stream = _JSONStream(fp, chunk_size)
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.decode_value()
+        stream.expect(":")
+        if key == "features":
+            stream.expect("[")
+            while stream.peek() != "]":
+                yield stream.decode_value()
+                if stream.peek() == ",":
+                    stream.expect(",")
+            stream.expect("]")
+        else:
+            stream.decode_value()
+
+        if stream.peek() == ",":
+            stream.expect(",")
+
+
+def parse_dmi_observational_data_stream(
+    fp: BinaryIO,
+    parameters: Optional[List[str]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Streaming version of parse_dmi_observational_data. Only the needed properties of matching
+    features are kept, with repeated strings (cells, timestamps, parameters) stored as integer
+    codes and values in a float array, so memory grows with the output and not the response.
+    """
+    if parameters is None:
+        parameters = OBSERVATIONAL_WIND_PARAMETERS
+    parameters = set(parameters)
+
+    string_columns = ["cellId", "from", "to", "parameterId"]
+    categories = {col: {} for col in string_columns}
+    capacity = 1024
+    codes = np.empty((capacity, len(string_columns)), dtype=np.int32)
+    values = np.empty(capacity, dtype=np.float64)
+
+    n_rows = 0
+    for feature in iter_geojson_features(fp, chunk_size):
+        props = feature.get("properties", {})
+        if props["parameterId"] not in parameters:
+            continue
+
+        if n_rows == capacity:
+            capacity *= 2
+            codes = np.resize(codes, (capacity, len(string_columns)))
+            values = np.resize(values, capacity)
+
+        for i, col in enumerate(string_columns):
+            codes[n_rows, i] = categories[col].setdefault(props[col], len(categories[col]))
+        value = props["value"]
+        values[n_rows] = np.nan if value is None else value
+        n_rows += 1
+
+    data = {}
+    for i, col in enumerate(string_columns):
+        uniques = np.array(list(categories[col]), dtype=object)
+        data[col] = uniques[codes[:n_rows, i]] if n_rows else np.array([], dtype=object)
+    data["value"] = values[:n_rows]
+
+    df = pd.DataFrame(data)
+    df = df.rename(columns={"cellId": "cell_id", "parameterId": "parameter_id"})
+
+    return df
+
+
 def unzip_and_merge_dmi_obs_data(
     file_path,
     file_type,
-    n_files=50,
+    n_files=None,
 ):
     zip_file = ZipFile(file_path)
+    files_to_parse = zip_file.infolist()
     if n_files:
-        files_to_parse = zip_file.infolist()[:n_files]
+        files_to_parse = files_to_parse[:n_files]
 
     dfs = [read_file_in_zip(zip_file, file_) for file_ in files_to_parse if file_.filename.endswith(file_type)]
 
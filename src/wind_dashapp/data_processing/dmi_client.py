@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DMI_GATEWAY_URL = os.getenv("DMI_GATEWAY_URL", "https://dmigw.govcloud.dk")
+
+# (connect, read) timeout in seconds, so a hung gateway never blocks a Dash worker indefinitely
+DEFAULT_TIMEOUT = (
+    float(os.getenv("DMI_HTTP_CONNECT_TIMEOUT", 3.05)),
+    float(os.getenv("DMI_HTTP_READ_TIMEOUT", 30)),
+)
+DEFAULT_RETRIES = int(os.getenv("DMI_HTTP_RETRIES", 3))
+DEFAULT_BACKOFF_FACTOR = float(os.getenv("DMI_HTTP_BACKOFF_FACTOR", 0.5))
+DEFAULT_POOL_MAXSIZE = int(os.getenv("DMI_HTTP_POOL_MAXSIZE", 10))
+DEFAULT_REQUESTS_PER_SECOND = float(os.getenv("DMI_HTTP_REQUESTS_PER_SECOND", 10))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+Timeout = Union[float, Tuple[float, float]]
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+
+def create_dmi_session(
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+) -> requests.Session:
+    """
+    Creates a requests session with pooled keep-alive connections, gzip negotiation
+    and retry with exponential backoff on 429/5xx responses and connection errors.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False,  # the last response is returned so raise_for_status reports the real status
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+
+    return session
+
+
+def get_dmi_session() -> requests.Session:
+    """
+    Returns the shared session of this process. The session is recreated after a fork
+    (e.g. gunicorn workers), as pooled sockets must not be shared between processes.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = create_dmi_session()
+            _session_pid = os.getpid()
+
+        return _session
+
+
+def configure_dmi_session(
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+) -> requests.Session:
+    """
+    Replaces the shared session with one using the given settings.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = create_dmi_session(retries=retries, backoff_factor=backoff_factor, pool_maxsize=pool_maxsize)
+        _session_pid = os.getpid()
+
+        return _session
+
+
+def dmi_get(
+    url: str,
+    timeout: Optional[Timeout] = DEFAULT_TIMEOUT,
+    session: Optional[requests.Session] = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    Sends a GET request to the DMI gateway through the shared session.
+    """
+    if session is None:
+        session = get_dmi_session()
+
+    return session.get(url, timeout=timeout, **kwargs)
+
+
+class HostRateLimiter:
+    """
+    Thread-safe rate limiter spacing requests to the same host evenly at `requests_per_second`.
+    """
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND):
+        if requests_per_second <= 0:
+            raise ValueError(f"requests_per_second has to be positive, got {requests_per_second}")
+
+        self.interval = 1.0 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def acquire(self, url: str):
+        host = urlparse(url).netloc
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
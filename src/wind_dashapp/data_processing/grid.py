@@ -0,0 +1,140 @@
+"""
+Preprocessed 10 km grid of Denmark, bundled with the app so workers start without downloading
+and normalizing the GeoJSON. The bundle is an .npz of flat arrays (cell ids, names, centroids and
+polygon rings with rounded coordinates) with a format version and a hash of its contents.
+
+Usage (after changing the GeoJSON in assets):
+    python -m wind_dashapp.data_processing.grid
+    python -m wind_dashapp.data_processing.grid --check
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from wind_dashapp.data_processing.cache import atomic_open
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+GRID_GEOJSON_PATH = os.path.join(ASSETS_DIR, "DKN_10KM_epsg4326_filtered_wCent.geojson")
+GRID_BUNDLE_PATH = os.path.join(ASSETS_DIR, "DKN_10KM_grid.npz")
+GRID_BUNDLE_VERSION = 1
+# About 10 m, far below the size of a cell
+COORDINATE_DECIMALS = 4
+
+GRID_ARRAYS = ["cell_ids", "names", "cent_lon", "cent_lat", "ring_offsets", "coordinates"]
+
+
+def _hash_arrays(arrays: Dict[str, np.ndarray]) -> str:
+    digest = hashlib.sha256()
+    for name in GRID_ARRAYS:
+        digest.update(name.encode("utf-8"))
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+
+    return digest.hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_grid_bundle(geojson_path: str = GRID_GEOJSON_PATH, bundle_path: str = GRID_BUNDLE_PATH):
+    with open(geojson_path) as f:
+        features = json.load(f)["features"]
+
+    rings = [np.asarray(feature["geometry"]["coordinates"][0], dtype=np.float64) for feature in features]
+    arrays = {
+        "cell_ids": np.array([feature["properties"]["KN10kmDK"] for feature in features], dtype=str),
+        "names": np.array([feature["properties"]["Stednavn"] or "No name" for feature in features], dtype=str),
+        "cent_lon": np.array([feature["properties"]["cent_lon"] for feature in features], dtype=np.float64),
+        "cent_lat": np.array([feature["properties"]["cent_lat"] for feature in features], dtype=np.float64),
+        "ring_offsets": np.cumsum([0] + [len(ring) for ring in rings]).astype(np.int64),
+        "coordinates": np.round(np.concatenate(rings), COORDINATE_DECIMALS),
+    }
+
+    meta = {
+        "version": GRID_BUNDLE_VERSION,
+        "sha256": _hash_arrays(arrays),
+        "source_sha256": _hash_file(geojson_path),
+    }
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    with atomic_open(bundle_path, "wb") as f:
+        np.savez(f, **arrays)
+
+    print(f"[build_grid_bundle] Wrote {len(features)} cells to {bundle_path}")
+
+
+def load_grid_bundle(bundle_path: str = GRID_BUNDLE_PATH):
+    """
+    Returns the arrays of the bundle. Raises ValueError if the bundle has another format version
+    or its contents do not match its hash. The GeoJSON is not read, see check_grid_bundle_source.
+    """
+    with np.load(bundle_path, allow_pickle=False) as npz:
+        meta = json.loads(npz["meta"].item())
+        arrays = {name: npz[name] for name in GRID_ARRAYS}
+
+    if meta["version"] != GRID_BUNDLE_VERSION:
+        raise ValueError(f"Grid bundle {bundle_path} has version {meta['version']}, expected {GRID_BUNDLE_VERSION}")
+    if _hash_arrays(arrays) != meta["sha256"]:
+        raise ValueError(f"Grid bundle {bundle_path} does not match its hash")
+
+    return arrays
+
+
+def check_grid_bundle_source(bundle_path: str = GRID_BUNDLE_PATH, geojson_path: str = GRID_GEOJSON_PATH):
+    """
+    Raises ValueError if the bundle was built from another version of the GeoJSON.
+    """
+    with np.load(bundle_path, allow_pickle=False) as npz:
+        source_sha256 = json.loads(npz["meta"].item())["source_sha256"]
+
+    if _hash_file(geojson_path) != source_sha256:
+        raise ValueError(f"Grid bundle {bundle_path} is outdated, rebuild it with python -m {__name__}")
+
+
+def get_grid_bundle_hash(bundle_path: str = GRID_BUNDLE_PATH) -> str:
+    """
+    Returns the hash of the contents of the bundle, as recorded when it was built.
+    """
+    with np.load(bundle_path, allow_pickle=False) as npz:
+        return json.loads(npz["meta"].item())["sha256"]
+
+
+def grid_to_geojson(arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    coordinates = arrays["coordinates"].tolist()
+    offsets = arrays["ring_offsets"].tolist()
+
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"KN10kmDK": cell_id},
+                "geometry": {"type": "Polygon", "coordinates": [coordinates[offsets[i] : offsets[i + 1]]]},
+            }
+            for i, cell_id in enumerate(arrays["cell_ids"].tolist())
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the bundled grid from the GeoJSON in assets.")
+    parser.add_argument("--geojson-path", default=GRID_GEOJSON_PATH)
+    parser.add_argument("--bundle-path", default=GRID_BUNDLE_PATH)
+    parser.add_argument("--check", action="store_true", help="Only check that the bundle matches the GeoJSON")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check_grid_bundle_source(args.bundle_path, args.geojson_path)
+        print(f"[main] Grid bundle {args.bundle_path} matches {args.geojson_path}")
+    else:
+        build_grid_bundle(args.geojson_path, args.bundle_path)
+
+
+if __name__ == "__main__":
+    main()
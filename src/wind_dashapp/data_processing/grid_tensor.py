@@ -0,0 +1,288 @@
+"""
+Dense hourly values of the whole grid, a float32 array indexed [cell, hour, parameter] in a .npy
+file with the cells in the order of the bundled grid. Readers memory-map the file, so the workers
+of a host share one copy of the pages, a cell window is a slice and reductions over all cells
+(e.g. the maximum wind per cell) are single NumPy calls.
+
+The tensor is built from the local observation store or from the forecasts in the cache
+(e.g. after a run of the forecast pre-warmer).
+
+Usage:
+    python -m wind_dashapp.data_processing.grid_tensor obs --start 2023-01-01 --end 2024-01-01
+    python -m wind_dashapp.data_processing.grid_tensor forecast
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import read_parsed_frame
+from wind_dashapp.data_processing.dmi import (
+    CACHE_DIR,
+    FORECAST_WIND_PARAMETERS,
+    OBSERVATIONAL_WIND_PARAMETERS,
+    get_forecast_cache_key,
+)
+from wind_dashapp.data_processing.grid import GRID_BUNDLE_PATH, load_grid_bundle
+from wind_dashapp.data_processing.obs_store import OBS_STORE_DIR, ObsStore
+
+GRID_TENSOR_DIR = os.getenv("GRID_TENSOR_DIR", "data/grid_tensor")
+GRID_TENSOR_VERSION = 1
+FORECAST_TENSOR_PARAMETERS = [parameter.replace("-", "_") for parameter in FORECAST_WIND_PARAMETERS]
+
+
+def _create_tensor_dir(tensor_dir: str) -> str:
+    parent_dir = os.path.dirname(os.path.abspath(tensor_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+
+    return tempfile.mkdtemp(dir=parent_dir, prefix=".tmp-")
+
+
+def _open_values(tmp_dir: str, n_cells: int, n_hours: int, n_parameters: int) -> np.memmap:
+    # Written through a memory map, so building never holds the whole tensor in memory
+    values = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, "values.npy"), mode="w+", dtype=np.float32, shape=(n_cells, n_hours, n_parameters)
+    )
+    values[:] = np.nan
+
+    return values
+
+
+def _finish_tensor_dir(tmp_dir: str, tensor_dir: str, values: np.memmap, meta: Dict):
+    values.flush()
+    del values
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # Replaces the tensor atomically, readers still holding the old file keep their mapping
+    if os.path.exists(tensor_dir):
+        old_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(tensor_dir)), prefix=".old-")
+        os.replace(tensor_dir, os.path.join(old_dir, "tensor"))
+        os.replace(tmp_dir, tensor_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(tmp_dir, tensor_dir)
+
+
+def _grid_cell_ids(grid_bundle_path: str = GRID_BUNDLE_PATH) -> List[str]:
+    return load_grid_bundle(grid_bundle_path)["cell_ids"].tolist()
+
+
+def build_obs_tensor(
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    store_dir: str = OBS_STORE_DIR,
+    tensor_dir: str = GRID_TENSOR_DIR,
+    cell_ids: Optional[List[str]] = None,
+    parameters: Optional[List[str]] = None,
+):
+    """
+    Builds the tensor of the hours [start, end) from the observation store, one month partition
+    at a time. Hours and cells without observations are NaN.
+    """
+    if cell_ids is None:
+        cell_ids = _grid_cell_ids()
+    if parameters is None:
+        parameters = OBSERVATIONAL_WIND_PARAMETERS
+
+    start_s = int(start.timestamp())
+    n_hours = int((end - start) / pd.Timedelta(hours=1))
+    cell_index = pd.Index(cell_ids)
+
+    tmp_dir = _create_tensor_dir(tensor_dir)
+    values = _open_values(tmp_dir, len(cell_ids), n_hours, len(parameters))
+
+    for _, partition in ObsStore(store_dir).iter_partitions(start, end):
+        cell_rows = np.repeat(cell_index.get_indexer(partition["cell_ids"]), np.diff(partition["cell_offsets"]))
+        hours = (np.asarray(partition["from"]) - start_s) // 3600
+        is_in_tensor = (cell_rows >= 0) & (hours >= 0) & (hours < n_hours)
+        parameter_columns = pd.Index(partition["meta"]["parameters"]).get_indexer(parameters)
+
+        partition_values = np.asarray(partition["values"])[is_in_tensor]
+        for i_parameter, column in enumerate(parameter_columns):
+            if column >= 0:
+                values[cell_rows[is_in_tensor], hours[is_in_tensor], i_parameter] = partition_values[:, column]
+
+    meta = {
+        "version": GRID_TENSOR_VERSION,
+        "source": "observations",
+        "start": start_s,
+        "cell_ids": list(cell_ids),
+        "parameters": list(parameters),
+    }
+    _finish_tensor_dir(tmp_dir, tensor_dir, values, meta)
+
+    print(f"[build_obs_tensor] Wrote {len(cell_ids)} cells x {n_hours} hours x {len(parameters)} parameters")
+
+
+def build_forecast_tensor(
+    api_key: str,
+    cache_dir: str = CACHE_DIR,
+    tensor_dir: str = GRID_TENSOR_DIR,
+    grid_bundle_path: str = GRID_BUNDLE_PATH,
+    collection_type: str = "wind",
+):
+    """
+    Builds the tensor from the parsed forecasts of the current model run in the cache. Cells
+    without a cached forecast are NaN. Raises ValueError if no cell has a cached forecast.
+    """
+    grid = load_grid_bundle(grid_bundle_path)
+    cell_ids = grid["cell_ids"].tolist()
+
+    forecasts = {}
+    for i_cell, (lon, lat) in enumerate(zip(grid["cent_lon"].tolist(), grid["cent_lat"].tolist())):
+        df = read_parsed_frame(cache_dir, get_forecast_cache_key(api_key, lon, lat, collection_type))
+        if df is not None:
+            forecasts[i_cell] = df
+
+    if not forecasts:
+        raise ValueError(f"No forecasts of the current model run in {cache_dir}, run the forecast pre-warmer first")
+
+    from_seconds = {i_cell: df["from_datetime"].dt.as_unit("s").array.asi8 for i_cell, df in forecasts.items()}
+    start_s = int(min(seconds.min() for seconds in from_seconds.values()))
+    n_hours = int(max(seconds.max() for seconds in from_seconds.values()) - start_s) // 3600 + 1
+
+    tmp_dir = _create_tensor_dir(tensor_dir)
+    values = _open_values(tmp_dir, len(cell_ids), n_hours, len(FORECAST_TENSOR_PARAMETERS))
+    for i_cell, df in forecasts.items():
+        hours = (from_seconds[i_cell] - start_s) // 3600
+        values[i_cell, hours, :] = df[FORECAST_TENSOR_PARAMETERS].to_numpy(dtype=np.float32)
+
+    meta = {
+        "version": GRID_TENSOR_VERSION,
+        "source": "forecasts",
+        "start": start_s,
+        "cell_ids": cell_ids,
+        "parameters": FORECAST_TENSOR_PARAMETERS,
+    }
+    _finish_tensor_dir(tmp_dir, tensor_dir, values, meta)
+
+    print(f"[build_forecast_tensor] Wrote forecasts of {len(forecasts)} of {len(cell_ids)} cells x {n_hours} hours")
+
+
+class GridTensor:
+    """
+    Read access to a grid tensor. The values are memory-mapped read-only.
+    """
+
+    def __init__(self, tensor_dir: str = GRID_TENSOR_DIR):
+        with open(os.path.join(tensor_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != GRID_TENSOR_VERSION:
+            raise ValueError(f"Grid tensor {tensor_dir} has version {meta['version']}, expected {GRID_TENSOR_VERSION}")
+
+        self.values = np.load(os.path.join(tensor_dir, "values.npy"), mmap_mode="r")
+        self.source = meta["source"]
+        self.start = pd.Timestamp(meta["start"], unit="s", tz="UTC")
+        self.cell_ids = meta["cell_ids"]
+        self.parameters = meta["parameters"]
+        self.cell_rows = {cell_id: i for i, cell_id in enumerate(self.cell_ids)}
+        self.times = pd.date_range(self.start, periods=self.values.shape[1], freq="h").tz_convert("Europe/Copenhagen")
+
+    def hour_index(self, timestamp: pd.Timestamp) -> int:
+        return int((timestamp - self.start) / pd.Timedelta(hours=1))
+
+    def _hour_slice(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> slice:
+        n_hours = self.values.shape[1]
+        i_start = 0 if start is None else min(max(self.hour_index(start), 0), n_hours)
+        i_end = n_hours if end is None else min(max(self.hour_index(end), i_start), n_hours)
+
+        return slice(i_start, i_end)
+
+    def cell_window(
+        self, cell_id: str, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None
+    ) -> np.ndarray:
+        """
+        Returns the [hour, parameter] values of a cell for [start, end), a view into the mapped file.
+        Raises ValueError for cells not in the tensor.
+        """
+        if cell_id not in self.cell_rows:
+            raise ValueError(f"Cell {cell_id} is not in the grid tensor")
+
+        return self.values[self.cell_rows[cell_id], self._hour_slice(start, end)]
+
+    def window_frame(self, cell_id: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """
+        Returns the window of a cell in the layout of the app loaders: `from_datetime` in Copenhagen time
+        and one column per parameter.
+        """
+        hours = self._hour_slice(start, end)
+        df = pd.DataFrame(np.asarray(self.cell_window(cell_id, start, end), dtype=np.float64), columns=self.parameters)
+        df.insert(0, "from_datetime", self.times[hours])
+
+        return df
+
+    def reduce(
+        self,
+        parameter: str,
+        func=np.nanmax,
+        start: Optional[pd.Timestamp] = None,
+        end: Optional[pd.Timestamp] = None,
+    ) -> pd.Series:
+        """
+        Reduces a parameter over the hours of [start, end) for all cells at once, e.g. the maximum
+        wind speed per cell with np.nanmax. Returns a Series indexed by cell id.
+        """
+        i_parameter = self.parameters.index(parameter)
+        window = self.values[:, self._hour_slice(start, end), i_parameter]
+        with warnings.catch_warnings():
+            # Cells without values in the window reduce to NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            reduced = func(window, axis=1)
+
+        return pd.Series(reduced, index=self.cell_ids, name=parameter)
+
+
+_grid_tensors_lock = threading.Lock()
+_grid_tensors: Dict[str, tuple] = {}
+
+
+def get_grid_tensor(tensor_dir: str = GRID_TENSOR_DIR) -> Optional[GridTensor]:
+    """
+    Returns the tensor of this process for `tensor_dir`, reopened after a rebuild,
+    or None if no tensor has been built there.
+    """
+    meta_path = os.path.join(tensor_dir, "meta.json")
+    try:
+        modified_at = os.path.getmtime(meta_path)
+    except FileNotFoundError:
+        return None
+
+    key = os.path.abspath(tensor_dir)
+    with _grid_tensors_lock:
+        if key not in _grid_tensors or _grid_tensors[key][0] != modified_at:
+            _grid_tensors[key] = (modified_at, GridTensor(tensor_dir))
+
+        return _grid_tensors[key][1]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the dense hourly tensor of the whole grid.")
+    parser.add_argument("source", choices=["obs", "forecast"])
+    parser.add_argument("--start", help="First day, for obs (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", help="Day after the last day, for obs (YYYY-MM-DD, UTC)")
+    parser.add_argument("--store-dir", default=OBS_STORE_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--tensor-dir", default=GRID_TENSOR_DIR)
+    args = parser.parse_args(argv)
+
+    if args.source == "obs":
+        if not args.start or not args.end:
+            parser.error("obs requires --start and --end")
+        build_obs_tensor(
+            pd.Timestamp(args.start, tz="UTC"), pd.Timestamp(args.end, tz="UTC"), args.store_dir, args.tensor_dir
+        )
+    else:
+        build_forecast_tensor(os.getenv("DMI_API_KEY_FORECAST"), args.cache_dir, args.tensor_dir)
+
+
+if __name__ == "__main__":
+    main()
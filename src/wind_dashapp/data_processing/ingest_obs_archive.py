@@ -0,0 +1,234 @@
+"""
+Bulk ingestion of DMI climate data archives (yearly zips of daily files with one GeoJSON
+feature per line). Archive members are parsed in parallel on a process pool and the
+filtered rows are written to disk in chunks, so memory stays bounded for any number of years.
+A manifest in the output directory records every processed member (size, CRC, rows, chunks),
+so reruns only parse new or changed members and interrupted runs resume where they stopped.
+
+Usage:
+    python -m wind_dashapp.data_processing.ingest_obs_archive data/2023.zip --output-dir data/obs_chunks \
+        --store-dir data/obs_store
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import atomic_write_json, write_frame_npz
+from wind_dashapp.data_processing.dmi import OBSERVATIONAL_WIND_PARAMETERS
+from wind_dashapp.data_processing.obs_store import build_obs_store
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, the standard library decoder is used without it
+    _loads = json.loads
+
+ARCHIVE_COLUMNS = ["cellId", "from", "to", "parameterId", "value"]
+DEFAULT_CHUNK_ROWS = 500_000
+DEFAULT_OUTPUT_DIR = "data/obs_chunks"
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def get_chunk_dir(output_dir: str, zip_path: str) -> str:
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(zip_path))[0])
+
+
+def load_manifest(output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the manifest entries of processed archive members, keyed by "<zip name>/<member name>".
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+
+    with open(manifest_path) as f:
+        return json.load(f)["members"]
+
+
+def _write_manifest(output_dir: str, manifest: Dict[str, Dict[str, Any]]):
+    atomic_write_json(os.path.join(output_dir, MANIFEST_FILE_NAME), {"members": manifest})
+
+
+def _write_chunk(rows: Dict[str, list], chunk_dir: str, member_name: str, i_chunk: int) -> str:
+    df = pd.DataFrame({col: np.asarray(rows[col], dtype=str) for col in ARCHIVE_COLUMNS[:-1]})
+    df["value"] = np.asarray(rows["value"], dtype=np.float64)
+
+    # Members in directories of the archive (e.g. "2023/01/2023-01-01.txt") are flattened into the chunk directory
+    chunk_name = os.path.splitext(member_name)[0].replace("/", "_")
+    chunk_path = os.path.join(chunk_dir, f"{chunk_name}-{i_chunk:04d}.npz")
+    write_frame_npz(chunk_path, df)
+
+    return chunk_path
+
+
+def parse_archive_member(
+    zip_path: str,
+    member_name: str,
+    output_dir: str,
+    parameters: Optional[List[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Dict[str, Any]:
+    """
+    Parses one archive member, keeping hourly values of the given parameters, and writes the rows
+    to chunk files of at most `chunk_rows` rows. Lines are pre-filtered on their raw bytes, so only
+    candidate lines are decoded. Returns the number of lines, bytes and rows and the chunk paths.
+    """
+    if parameters is None:
+        parameters = OBSERVATIONAL_WIND_PARAMETERS
+    parameter_set = set(parameters)
+    parameter_bytes = [f'"{p}"'.encode("utf-8") for p in parameters]
+
+    chunk_dir = get_chunk_dir(output_dir, zip_path)
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    n_lines = 0
+    n_rows = 0
+    chunk_paths = []
+    rows = {col: [] for col in ARCHIVE_COLUMNS}
+
+    with ZipFile(zip_path) as zip_file:
+        n_bytes = zip_file.getinfo(member_name).file_size
+        with zip_file.open(member_name) as f:
+            for line in f:
+                n_lines += 1
+                if b'"hour"' not in line or not any(p in line for p in parameter_bytes):
+                    continue
+
+                line_content = _loads(line)["properties"]
+                if line_content["timeResolution"] != "hour" or line_content["parameterId"] not in parameter_set:
+                    continue
+
+                for col in ARCHIVE_COLUMNS:
+                    rows[col].append(line_content[col])
+
+                if len(rows["value"]) == chunk_rows:
+                    chunk_paths.append(_write_chunk(rows, chunk_dir, member_name, len(chunk_paths)))
+                    n_rows += chunk_rows
+                    rows = {col: [] for col in ARCHIVE_COLUMNS}
+
+    if rows["value"]:
+        chunk_paths.append(_write_chunk(rows, chunk_dir, member_name, len(chunk_paths)))
+        n_rows += len(rows["value"])
+
+    return {"member": member_name, "lines": n_lines, "bytes": n_bytes, "rows": n_rows, "chunks": chunk_paths}
+
+
+def ingest_obs_archives(
+    zip_paths: List[str],
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    n_workers: Optional[int] = None,
+    parameters: Optional[List[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    file_type: str = "txt",
+    store_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Parses the members of the given archives that are not in the manifest yet (or changed since)
+    on a pool of `n_workers` processes (all cores by default) and reports the throughput in lines/s
+    and MB/s. Each member is recorded in the manifest as soon as it is parsed. If `store_dir` is
+    given, the chunks not loaded into the observation store yet are appended to it.
+    """
+    start = time.perf_counter()
+    totals = {"members": 0, "skipped": 0, "lines": 0, "bytes": 0, "rows": 0, "chunks": []}
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {}
+        for zip_path in zip_paths:
+            with ZipFile(zip_path) as zip_file:
+                members = [info for info in zip_file.infolist() if info.filename.endswith(file_type)]
+
+            for info in members:
+                key = f"{os.path.basename(zip_path)}/{info.filename}"
+                entry = manifest.get(key)
+                if entry is not None and entry["size"] == info.file_size and entry["crc"] == info.CRC:
+                    totals["skipped"] += 1
+                    continue
+
+                future = executor.submit(
+                    parse_archive_member, zip_path, info.filename, output_dir, parameters, chunk_rows
+                )
+                futures[future] = (key, info)
+
+        for future in as_completed(futures):
+            key, info = futures[future]
+            result = future.result()
+
+            # Chunks of an earlier version of the member that were not overwritten
+            for chunk_path in set(manifest.get(key, {}).get("chunks", [])) - set(result["chunks"]):
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+
+            manifest[key] = {
+                "size": info.file_size,
+                "crc": info.CRC,
+                "rows": result["rows"],
+                "chunks": result["chunks"],
+                "stored": False,
+            }
+            _write_manifest(output_dir, manifest)
+
+            totals["members"] += 1
+            for counter in ("lines", "bytes", "rows"):
+                totals[counter] += result[counter]
+            totals["chunks"] += result["chunks"]
+            print(f"[ingest_obs_archives] Parsed {result['member']}: {result['rows']} rows")
+
+    elapsed = time.perf_counter() - start
+    totals["seconds"] = elapsed
+    totals["lines_per_second"] = totals["lines"] / elapsed
+    totals["mb_per_second"] = totals["bytes"] / 1024**2 / elapsed
+
+    print(
+        f"[ingest_obs_archives] Parsed {totals['members']} files ({totals['skipped']} already ingested), "
+        f"{totals['lines']} lines, {totals['rows']} rows in {elapsed:.1f} s "
+        f"({totals['lines_per_second']:.0f} lines/s, {totals['mb_per_second']:.1f} MB/s)"
+    )
+
+    if store_dir is not None:
+        unstored = [key for key, entry in manifest.items() if not entry["stored"]]
+        build_obs_store(
+            [chunk_path for key in unstored for chunk_path in manifest[key]["chunks"]],
+            store_dir=store_dir,
+            parameters=parameters,
+        )
+        for key in unstored:
+            manifest[key]["stored"] = True
+        _write_manifest(output_dir, manifest)
+
+    return totals
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingest yearly DMI observation archives into chunk files.")
+    parser.add_argument("zip_paths", nargs="+", help="Archive zip files, e.g. data/2023.zip")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--parameters", nargs="+", default=None)
+    parser.add_argument("--store-dir", default=None, help="Also load the parsed rows into this observation store")
+    args = parser.parse_args(argv)
+
+    ingest_obs_archives(
+        args.zip_paths,
+        output_dir=args.output_dir,
+        n_workers=args.workers,
+        parameters=args.parameters,
+        chunk_rows=args.chunk_rows,
+        store_dir=args.store_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
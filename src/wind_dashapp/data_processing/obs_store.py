@@ -0,0 +1,285 @@
+"""
+Local observation store, partitioned by month. Each partition holds the hourly values of all
+cells as plain .npy arrays sorted by cell and time, with a cell index of row offsets, so a cell
+window is found with two binary searches on memory-mapped arrays.
+
+Usage:
+    python -m wind_dashapp.data_processing.obs_store data/obs_chunks --store-dir data/obs_store
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import read_frame_npz
+from wind_dashapp.data_processing.dmi import OBSERVATIONAL_WIND_PARAMETERS
+from wind_dashapp.data_processing.reshape import long_to_wide
+from wind_dashapp.data_processing.timestamps import parse_dmi_timestamps
+
+OBS_STORE_DIR = os.getenv("DMI_OBS_STORE_DIR", "data/obs_store")
+PARTITION_FILES = ["cell_ids", "cell_offsets", "from", "values"]
+
+
+def _partition_name(month: pd.Period) -> str:
+    return month.strftime("%Y-%m")
+
+
+def _long_to_wide(df: pd.DataFrame, parameters: List[str]) -> pd.DataFrame:
+    """
+    Reshapes archive rows (cellId, from, parameterId, value) to one row per cell and hour,
+    with `from` as epoch seconds (UTC) and one column per parameter.
+    """
+    rows = np.flatnonzero(df["parameterId"].isin(parameters).to_numpy())
+    # Removes observations with microseconds, seems to be a bug in the DMI API
+    epoch_seconds, is_valid = parse_dmi_timestamps(df["from"].to_numpy()[rows])
+    rows = rows[is_valid]
+
+    (cell_ids, from_seconds), _, values = long_to_wide(
+        [df["cellId"].to_numpy()[rows], epoch_seconds[is_valid]],
+        df["parameterId"].to_numpy()[rows],
+        df["value"].to_numpy()[rows],
+        column_labels=parameters,
+    )
+
+    df_wide = pd.DataFrame(values, columns=parameters)
+    df_wide.insert(0, "cell_id", cell_ids)
+    df_wide.insert(1, "from", from_seconds)
+
+    return df_wide
+
+
+def _read_partition(partition_dir: str, mmap_mode: Optional[str] = "r") -> Dict[str, np.ndarray]:
+    arrays = {
+        name: np.load(os.path.join(partition_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in PARTITION_FILES
+    }
+    with open(os.path.join(partition_dir, "meta.json")) as f:
+        arrays["meta"] = json.load(f)
+
+    return arrays
+
+
+def _partition_to_frame(partition: Dict[str, np.ndarray]) -> pd.DataFrame:
+    counts = np.diff(partition["cell_offsets"])
+    df = pd.DataFrame(np.asarray(partition["values"]), columns=partition["meta"]["parameters"])
+    df.insert(0, "from", np.asarray(partition["from"]))
+    df.insert(0, "cell_id", np.repeat(partition["cell_ids"], counts))
+
+    return df
+
+
+def write_partition(store_dir: str, month: pd.Period, df_wide: pd.DataFrame, parameters: List[str]):
+    """
+    Writes the rows of one month to its partition, merging with rows already stored. The new rows
+    replace all stored rows of their cells and (UTC) days, so rows dropped from a changed archive
+    member do not remain. The partition directory is replaced atomically.
+    """
+    partition_dir = os.path.join(store_dir, _partition_name(month))
+
+    if os.path.exists(partition_dir):
+        df_existing = _partition_to_frame(_read_partition(partition_dir, mmap_mode=None))
+        new_cell_days = pd.MultiIndex.from_arrays([df_wide["cell_id"], df_wide["from"] // 86400])
+        is_replaced = pd.MultiIndex.from_arrays([df_existing["cell_id"], df_existing["from"] // 86400]).isin(
+            new_cell_days
+        )
+        df_wide = pd.concat(
+            [df_existing.loc[~is_replaced], df_wide.reindex(columns=df_existing.columns)], ignore_index=True
+        )
+
+    df_wide = df_wide.drop_duplicates(subset=["cell_id", "from"], keep="last")
+    df_wide = df_wide.sort_values(["cell_id", "from"], kind="stable").reset_index(drop=True)
+
+    cell_ids, cell_starts = np.unique(df_wide["cell_id"].to_numpy(dtype=str), return_index=True)
+    cell_offsets = np.append(cell_starts, len(df_wide)).astype(np.int64)
+    from_seconds = df_wide["from"].to_numpy(dtype=np.int64)
+    dates = np.unique(from_seconds // 86400 * 86400).astype("datetime64[s]").astype("datetime64[D]")
+
+    meta = {"parameters": parameters, "dates": [str(date) for date in dates]}
+
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=store_dir, prefix=".tmp-")
+    np.save(os.path.join(tmp_dir, "cell_ids.npy"), cell_ids)
+    np.save(os.path.join(tmp_dir, "cell_offsets.npy"), cell_offsets)
+    np.save(os.path.join(tmp_dir, "from.npy"), from_seconds)
+    np.save(os.path.join(tmp_dir, "values.npy"), df_wide[parameters].to_numpy(dtype=np.float64))
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    if os.path.exists(partition_dir):
+        old_dir = tempfile.mkdtemp(dir=store_dir, prefix=".old-")
+        os.replace(partition_dir, os.path.join(old_dir, "partition"))
+        os.replace(tmp_dir, partition_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(tmp_dir, partition_dir)
+
+    print(f"[write_partition] Wrote {len(df_wide)} rows for {len(cell_ids)} cells to {partition_dir}")
+
+
+def build_obs_store(
+    chunk_paths: Iterable[str],
+    store_dir: str = OBS_STORE_DIR,
+    parameters: Optional[List[str]] = None,
+):
+    """
+    Builds or extends the store from archive chunk files (see ingest_obs_archive). Chunks are
+    read in name order and written out month by month, so memory is bounded by one month of data.
+    """
+    if parameters is None:
+        parameters = OBSERVATIONAL_WIND_PARAMETERS
+
+    pending: Dict[pd.Period, List[pd.DataFrame]] = {}
+
+    def flush(months):
+        for month in months:
+            write_partition(store_dir, month, pd.concat(pending.pop(month), ignore_index=True), parameters)
+
+    for chunk_path in sorted(chunk_paths):
+        df_wide = _long_to_wide(read_frame_npz(chunk_path), parameters)
+        month = pd.to_datetime(df_wide["from"], unit="s").dt.to_period("M")
+        chunk_months = set(month.unique())
+
+        # Months not seen in this chunk are complete, as chunks are daily files in date order
+        flush([m for m in pending if m not in chunk_months])
+        for m in chunk_months:
+            pending.setdefault(m, []).append(df_wide.loc[month == m])
+
+    flush(list(pending))
+
+
+class ObsStore:
+    """
+    Read access to a local observation store. Partitions are memory-mapped on first use
+    and shared by all requests of the process.
+    """
+
+    def __init__(self, store_dir: str = OBS_STORE_DIR):
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._partitions: Dict[str, Tuple[float, Dict[str, np.ndarray]]] = {}
+
+    def _get_partition(self, name: str) -> Optional[Dict[str, np.ndarray]]:
+        meta_path = os.path.join(self.store_dir, name, "meta.json")
+        try:
+            modified_at = os.path.getmtime(meta_path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            # Partitions rewritten by an ingestion are reopened
+            if name not in self._partitions or self._partitions[name][0] != modified_at:
+                self._partitions[name] = (modified_at, _read_partition(os.path.join(self.store_dir, name)))
+
+            return self._partitions[name][1]
+
+    def iter_partitions(
+        self, start: pd.Timestamp, end: pd.Timestamp
+    ) -> Iterator[Tuple[pd.Period, Dict[str, np.ndarray]]]:
+        """
+        Yields the month and the memory-mapped arrays of each stored partition overlapping [start, end).
+        The arrays are "cell_ids", "cell_offsets", "from" and "values", and "meta" holds the parameters.
+        """
+        months = pd.period_range(
+            start.tz_convert("UTC").tz_localize(None).to_period("M"),
+            (end - pd.Timedelta(hours=1)).tz_convert("UTC").tz_localize(None).to_period("M"),
+        )
+        for month in months:
+            partition = self._get_partition(_partition_name(month))
+            if partition is not None:
+                yield month, partition
+
+    def covers(self, start: pd.Timestamp, end: pd.Timestamp) -> bool:
+        """
+        Returns True if every (UTC) day of the window [start, end) has been ingested.
+        """
+        start_utc = start.tz_convert("UTC").tz_localize(None)
+        end_utc = end.tz_convert("UTC").tz_localize(None) - pd.Timedelta(hours=1)
+        for date in pd.date_range(start_utc.normalize(), end_utc.normalize(), freq="D"):
+            partition = self._get_partition(_partition_name(date.to_period("M")))
+            if partition is None or date.strftime("%Y-%m-%d") not in partition["meta"]["dates"]:
+                return False
+
+        return True
+
+    def load_window(self, cell_id: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """
+        Returns the hourly observations of a cell for [start, end) in the layout of the app loaders:
+        `from_datetime` in Copenhagen time and one column per parameter.
+        """
+        start_s = int(start.timestamp())
+        end_s = int(end.timestamp())
+        months = pd.period_range(
+            start.tz_convert("UTC").tz_localize(None).to_period("M"),
+            end.tz_convert("UTC").tz_localize(None).to_period("M"),
+        )
+
+        parameters = None
+        from_parts = []
+        value_parts = []
+        for month in months:
+            partition = self._get_partition(_partition_name(month))
+            if partition is None:
+                continue
+            parameters = partition["meta"]["parameters"]
+
+            i_cell = np.searchsorted(partition["cell_ids"], cell_id)
+            if i_cell == len(partition["cell_ids"]) or partition["cell_ids"][i_cell] != cell_id:
+                continue
+
+            row_start, row_end = partition["cell_offsets"][i_cell], partition["cell_offsets"][i_cell + 1]
+            cell_from = partition["from"][row_start:row_end]
+            i_start = row_start + np.searchsorted(cell_from, start_s, side="left")
+            i_end = row_start + np.searchsorted(cell_from, end_s, side="left")
+
+            from_parts.append(np.asarray(partition["from"][i_start:i_end]))
+            value_parts.append(np.asarray(partition["values"][i_start:i_end]))
+
+        if parameters is None:
+            parameters = OBSERVATIONAL_WIND_PARAMETERS
+            from_parts, value_parts = [np.array([], dtype=np.int64)], [np.empty((0, len(parameters)))]
+
+        df = pd.DataFrame(np.concatenate(value_parts), columns=parameters)
+        from_datetime = pd.to_datetime(np.concatenate(from_parts), unit="s", utc=True).tz_convert("Europe/Copenhagen")
+        df.insert(0, "from_datetime", from_datetime)
+
+        return df
+
+
+_obs_stores_lock = threading.Lock()
+_obs_stores: Dict[str, ObsStore] = {}
+
+
+def get_obs_store(store_dir: str = OBS_STORE_DIR) -> Optional[ObsStore]:
+    """
+    Returns the store of this process for `store_dir`, or None if no store has been built there.
+    """
+    if not os.path.isdir(store_dir):
+        return None
+
+    key = os.path.abspath(store_dir)
+    with _obs_stores_lock:
+        if key not in _obs_stores:
+            _obs_stores[key] = ObsStore(store_dir)
+
+        return _obs_stores[key]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the local observation store from archive chunk files.")
+    parser.add_argument("chunk_dir", help="Directory with chunk files written by ingest_obs_archive")
+    parser.add_argument("--store-dir", default=OBS_STORE_DIR)
+    args = parser.parse_args(argv)
+
+    chunk_paths = glob.glob(os.path.join(args.chunk_dir, "**", "*.npz"), recursive=True)
+    build_obs_store(chunk_paths, store_dir=args.store_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Reshaping of long observation rows (keys, parameter, value) to wide arrays with one column per
+parameter. Keys and parameters are mapped to integer codes and the values are scattered into a
+preallocated 2-D array, instead of grouping and aggregating as pandas.pivot_table does.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def long_to_wide(
+    keys: Sequence[np.ndarray],
+    columns: np.ndarray,
+    values: np.ndarray,
+    column_labels: Optional[Sequence[str]] = None,
+) -> Tuple[List[np.ndarray], List[str], np.ndarray]:
+    """
+    Reshapes long rows to one row per unique combination of `keys` and one column per label.
+    Returns the key arrays of the rows (sorted by the keys in order), the column labels and a
+    float64 array of shape (rows, labels) with NaN where a value is missing.
+
+    The labels are the sorted unique `columns` unless `column_labels` is given; rows with other
+    labels are then left out. Raises ValueError if a combination of keys and label occurs twice.
+    """
+    if column_labels is None:
+        column_codes, labels = pd.factorize(columns, sort=True)
+        column_labels = list(labels)
+    else:
+        column_codes = pd.Index(column_labels).get_indexer(columns)
+        column_labels = list(column_labels)
+
+    is_kept = column_codes >= 0
+    column_codes = column_codes[is_kept]
+    values = np.asarray(values, dtype=np.float64)[is_kept]
+
+    # Codes of the combinations of keys, in the order of the keys
+    row_codes = np.zeros(len(column_codes), dtype=np.int64)
+    key_uniques = []
+    for key in keys:
+        codes, uniques = pd.factorize(np.asarray(key)[is_kept], sort=True)
+        row_codes = row_codes * len(uniques) + codes
+        key_uniques.append(np.asarray(uniques))
+    n_combinations = int(np.prod([len(uniques) for uniques in key_uniques]))
+    if n_combinations <= max(4 * len(row_codes), 1 << 20):
+        # Dense enough to number the combinations that occur with a mask instead of sorting
+        is_present = np.zeros(n_combinations, dtype=bool)
+        is_present[row_codes] = True
+        row_index = (np.cumsum(is_present) - 1)[row_codes]
+        row_codes = np.flatnonzero(is_present)
+    else:
+        row_codes, row_index = np.unique(row_codes, return_inverse=True)
+        row_index = row_index.reshape(-1)
+
+    n_rows = len(row_codes)
+    n_columns = len(column_labels)
+    cell_index = row_index * n_columns + column_codes
+
+    counts = np.bincount(cell_index, minlength=n_rows * n_columns)
+    if (counts > 1).any():
+        duplicate = int(np.argmax(counts > 1))
+        duplicate_codes = _split_row_code(row_codes[duplicate // n_columns], key_uniques)
+        duplicate_keys = [key[code] for key, code in zip(key_uniques, duplicate_codes)]
+        raise ValueError(
+            f"{int((counts > 1).sum())} duplicate values, e.g. {counts[duplicate]} values of "
+            f"{column_labels[duplicate % n_columns]} at {duplicate_keys}"
+        )
+
+    wide = np.full(n_rows * n_columns, np.nan)
+    wide[cell_index] = values
+
+    key_arrays = [key[code] for key, code in zip(key_uniques, _split_row_code(row_codes, key_uniques))]
+
+    return key_arrays, column_labels, wide.reshape(n_rows, n_columns)
+
+
+def _split_row_code(row_codes, key_uniques: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Splits combined row codes into the codes of each key.
+    """
+    codes = []
+    for uniques in reversed(key_uniques):
+        codes.append(row_codes % len(uniques))
+        row_codes = row_codes // len(uniques)
+
+    return codes[::-1]
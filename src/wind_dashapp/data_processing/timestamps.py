@@ -0,0 +1,140 @@
+"""
+Parsing of the timestamps of DMI responses and archives. The known formats are
+    2023-01-03T22:00:00+00:00         (observations)
+    2023-01-03T00:00:00.001000+01:00  (observations, the millisecond bug of the DMI API)
+    2025-07-24T06:00:00.000Z          (forecasts)
+and are parsed as fixed-width byte arrays with integer arithmetic instead of a datetime parser.
+Other formats fall back to pandas' ISO 8601 parser.
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DMI_TIMEZONE = "Europe/Copenhagen"
+
+# Offsets of the fields in "YYYY-MM-DDTHH:MM:SS"
+_DATE_SEPARATORS = {4: b"-", 7: b"-", 10: b"T", 13: b":", 16: b":"}
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """
+    Days since 1970-01-01 of proleptic Gregorian dates (H. Hinnant's days_from_civil).
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_fixed_format(chars: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Parses an (n, width) uint8 array of timestamps. Returns epoch seconds, whether the fraction
+    of a second is nonzero, and whether the row is in one of the known formats.
+    """
+    n, width = chars.shape
+    rows = np.arange(n)
+
+    def char_at(position) -> np.ndarray:
+        # A column slice when all rows have the same layout, otherwise one character per row
+        if np.isscalar(position):
+            return chars[:, position] if position < width else np.zeros(n, dtype=np.uint8)
+        return chars[rows, np.minimum(position, width - 1)] * (position < width)
+
+    digits = chars[:, _DIGIT_POSITIONS].astype(np.int32) - ord("0")
+    is_known = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    for position, separator in _DATE_SEPARATORS.items():
+        is_known &= chars[:, position] == ord(separator)
+
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    seconds_of_day = (
+        (digits[:, 8] * 10 + digits[:, 9]) * 3600
+        + (digits[:, 10] * 10 + digits[:, 11]) * 60
+        + digits[:, 12] * 10
+        + digits[:, 13]
+    )
+    is_leap_year = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_in_month = _DAYS_IN_MONTH[np.clip(month, 0, 12)] + ((month == 2) & is_leap_year)
+    # Invalid dates (e.g. February 30) go to the fallback parser, which raises
+    is_known &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+
+    # Fractions of 3 or 6 digits, then "Z" or "+HH:MM"/"-HH:MM"
+    has_fraction = chars[:, 19] == ord(".")
+    offset_position = np.full(n, 19)
+    has_nonzero_fraction = np.zeros(n, dtype=bool)
+    for n_digits in (3, 6):
+        end = 20 + n_digits
+        if end >= width:
+            break
+        after_fraction = chars[:, end]
+        is_length = (
+            has_fraction
+            & (offset_position == 19)
+            & ((after_fraction == ord("Z")) | (after_fraction == ord("+")) | (after_fraction == ord("-")))
+        )
+        offset_position[is_length] = end
+        has_nonzero_fraction |= is_length & (chars[:, 20:end] != ord("0")).any(axis=1)
+    is_known &= ~has_fraction | (offset_position != 19)
+    if (offset_position == offset_position[0]).all():
+        offset_position = int(offset_position[0])
+
+    sign = char_at(offset_position)
+    is_utc = sign == ord("Z")
+    offset_digits = [char_at(offset_position + i).astype(np.int32) - ord("0") for i in (1, 2, 4, 5)]
+    offset_seconds = (offset_digits[0] * 10 + offset_digits[1]) * 3600 + (offset_digits[2] * 10 + offset_digits[3]) * 60
+    offset_seconds = np.where(sign == ord("-"), -offset_seconds, offset_seconds)
+    offset_seconds[is_utc] = 0
+
+    has_offset = (sign == ord("+")) | (sign == ord("-"))
+    has_offset_digits = np.logical_and.reduce([(d >= 0) & (d <= 9) for d in offset_digits])
+    is_known &= is_utc | (has_offset & has_offset_digits)
+    # Nothing may follow the offset, shorter strings are padded with zero bytes
+    is_known &= np.where(is_utc, char_at(offset_position + 1), char_at(offset_position + 6)) == 0
+
+    epoch_seconds = _days_from_civil(year.astype(np.int64), month, day) * 86400 + seconds_of_day - offset_seconds
+
+    return epoch_seconds, has_nonzero_fraction, is_known
+
+
+def parse_dmi_timestamps(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the timestamps as int64 epoch seconds (UTC) and a mask of the valid rows. Timestamps with a
+    fraction of a second are invalid; they are duplicates from a bug in the DMI API (e.g. "00:00:00.001000").
+    Raises ValueError if a timestamp can not be parsed.
+    """
+    values = np.asarray(values, dtype=object)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+    # Fixed-width ASCII, shorter strings are padded with zero bytes
+    raw = values.astype(bytes)
+    chars = raw.view(np.uint8).reshape(len(raw), raw.itemsize)
+    if chars.shape[1] < 20:
+        epoch_seconds, has_nonzero_fraction, is_known = np.zeros(len(raw), np.int64), np.zeros(len(raw), bool), None
+    else:
+        epoch_seconds, has_nonzero_fraction, is_known = _parse_fixed_format(chars)
+
+    if is_known is None or not is_known.all():
+        # Other ISO 8601 timestamps, e.g. without seconds
+        is_other = np.ones(len(raw), dtype=bool) if is_known is None else ~is_known
+        other = pd.to_datetime(pd.Series(values[is_other]), format="ISO8601", utc=True)
+        epoch_seconds[is_other] = other.dt.as_unit("us").array.asi8 // 1_000_000
+        has_nonzero_fraction[is_other] = (other.dt.microsecond != 0).to_numpy()
+
+    return epoch_seconds, ~has_nonzero_fraction
+
+
+def epoch_to_datetime(epoch_seconds: np.ndarray, tz: str = DMI_TIMEZONE) -> pd.DatetimeIndex:
+    """
+    Returns epoch seconds as timezone-aware datetimes. The values stay UTC internally,
+    so the conversion to `tz` does not compute any offsets.
+    """
+    return pd.to_datetime(epoch_seconds, unit="s", utc=True).tz_convert(tz)
@@ -1,10 +1,4 @@
-from dmi_data import unzip_and_merge_dmi_obs_data
+from wind_dashapp.data_processing.ingest_obs_archive import ingest_obs_archives
 
-df = unzip_and_merge_dmi_obs_data("data/2023.zip", "txt", n_files=50)
-
-# df = read_file_in_zip(
-#     "data/2023.zip",
-#     "2023-01-01.txt"
-# )
-
-df.to_csv("data/parse_data_text.csv")
+# Only archive members not in the manifest of data/obs_chunks are parsed, so reruns are cheap
+ingest_obs_archives(["data/2023.zip"], output_dir="data/obs_chunks", store_dir="data/obs_store")
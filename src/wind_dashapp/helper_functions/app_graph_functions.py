@@ -37,8 +37,6 @@ def create_map_chart():
     dk_grid["Val"] = 1
     dk_grid["Col"] = add_transparency_to_color(layout_colors["primary"], 0.4)
 
-    dict_center = {"lon": 10.52, "lat": 55.89}
-
     fig_map = go.Figure(
         go.Choroplethmap(
             geojson=geoj_grid,
@@ -57,21 +55,27 @@ def create_map_chart():
                 bordercolor=layout_colors["transparent"],
             ),
         ),
-        layout=go.Layout(
-            map_style="carto-positron",
-            map_zoom=6,
-            map_center=dict_center,
-            autosize=True,
-            margin=dict(l=0, r=0, t=0, b=0),
-            plot_bgcolor=layout_colors["transparent"],
-            paper_bgcolor=layout_colors["transparent"],
-            clickmode="event+select",
-        ),
+        layout=create_map_layout(),
     )
 
     return fig_map
 
 
+def create_map_layout():
+    dict_center = {"lon": 10.52, "lat": 55.89}
+
+    return go.Layout(
+        map_style="carto-positron",
+        map_zoom=6,
+        map_center=dict_center,
+        autosize=True,
+        margin=dict(l=0, r=0, t=0, b=0),
+        plot_bgcolor=layout_colors["transparent"],
+        paper_bgcolor=layout_colors["transparent"],
+        clickmode="event+select",
+    )
+
+
 cardinal_directions = [
     "N",
     "NNE",
@@ -93,6 +97,10 @@ cardinal_directions = [
 
 
 def degrees_to_cardinal_directions(degrees):
+    # Hours without a direction in the observations
+    if pd.isna(degrees):
+        return ""
+
     # try:
     ix = round(degrees / (360.0 / len(cardinal_directions)))
     card_text = cardinal_directions[ix % len(cardinal_directions)]
@@ -105,13 +113,6 @@ def degrees_to_cardinal_directions(degrees):
     return card_text
 
 
-def get_angle_coordinate_from_degree(degree):
-    y_cord = -round(np.cos(np.deg2rad(degree)), 2)
-    x_cord = round(np.sin(np.deg2rad(degree)), 2)
-
-    return x_cord, y_cord
-
-
 def create_full_wind_chart(df, **kwargs):
     # Get mean wind chart
     chart = create_wind_speed_chart(df, **kwargs)
@@ -250,6 +251,17 @@ def add_background_vlines_to_chart(chart, data, opacity=0.1):
     return chart
 
 
+def create_placeholder_chart(text):
+    chart = go.Figure()
+    chart.update_layout(
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        annotations=[dict(text=text, showarrow=False, font=dict(color=layout_colors["dark_blue"], size=16))],
+    )
+
+    return chart
+
+
 def create_forecast_chart(
     forecast_data,
     cell_id=None,  # for later use
@@ -314,29 +326,40 @@ def add_direction_arrows(
     marker_opacity=1,
     **kwargs,
 ):
-    for i, row in df.iterrows():
-        x = row[col_datetime]
-        y = -1
-
-        x_diff, y_diff = get_angle_coordinate_from_degree(row[col_wind_direction])
-        x_diff = x_diff * x_scale
-        y_diff = y_diff * y_scale
+    # One trace for all arrows: tail and head of each arrow separated by None, with an arrow marker
+    # at the head oriented along the line from the tail
+    directions = df[col_wind_direction].to_numpy(dtype=np.float64)
+    has_direction = ~np.isnan(directions)
+    directions = directions[has_direction]
+    times = pd.DatetimeIndex(df[col_datetime])[has_direction]
+    y = -1
+
+    x_diff = np.round(np.sin(np.deg2rad(directions)), 2) * x_scale
+    y_diff = -np.round(np.cos(np.deg2rad(directions)), 2) * y_scale
+    time_diff = pd.to_timedelta(x_diff, unit="min")
+
+    n_arrows = len(directions)
+    x_arrows = np.full(3 * n_arrows, None, dtype=object)
+    x_arrows[0::3] = (times + time_diff).astype(object)
+    x_arrows[1::3] = (times - time_diff).astype(object)
+    y_arrows = np.full(3 * n_arrows, None, dtype=object)
+    y_arrows[0::3] = y - y_diff
+    y_arrows[1::3] = y + y_diff
+    marker_sizes = np.zeros(3 * n_arrows)
+    marker_sizes[1::3] = 8
 
-        chart.add_annotation(
-            x=x + pd.Timedelta(minutes=-x_diff),
-            y=y + y_diff,
-            ax=x + pd.Timedelta(minutes=x_diff),
-            axref="x",
-            ay=y - y_diff,
-            ayref="y",
-            arrowhead=2,
-            arrowsize=1.5,
-            arrowwidth=1.1,
-            arrowcolor=marker_color,
+    chart.add_trace(
+        go.Scatter(
+            x=x_arrows,
+            y=y_arrows,
+            mode="lines+markers",
+            line=dict(color=marker_color, width=1.1),
+            marker=dict(symbol="arrow", size=marker_sizes, angleref="previous", color=marker_color),
             opacity=marker_opacity,
-            xref="x",
-            yref="y",
+            hoverinfo="skip",
+            showlegend=False,
         )
+    )
 
     return chart
 
@@ -388,106 +411,135 @@ def create_forecast_chart_wind(
     return chart
 
 
-def filter_and_center_obs_data(
-    obs_data,
-    obs_datetime,
-    obs_ref_position,
-    start_hour,
-    end_hour,
-):
-    n_hours = end_hour - start_hour
-    n_rows_before = math.ceil(n_hours / 2) + obs_ref_position
-    n_rows_after = n_hours - n_rows_before
-
-    obs_data_before = obs_data.loc[
-        (obs_data["from_datetime"] > (obs_datetime - pd.Timedelta(hours=n_rows_before)))
-        & (obs_data["from_datetime"] <= (obs_datetime))
-    ]
-    obs_data_after = obs_data.loc[
-        (obs_data["from_datetime"] <= (obs_datetime + pd.Timedelta(hours=n_rows_after)))
-        & (obs_data["from_datetime"] > (obs_datetime))
-    ]
-
-    if not n_rows_before == len(obs_data_before):
-        pad_hours = len(obs_data_before) - n_rows_before
-        obs_data_before = pad_obs_data(obs_data_before, pad_hours, True)
-
-    if not n_rows_after == len(obs_data_after):
-        pad_hours = n_rows_after - len(obs_data_after)
-        obs_data_after = pad_obs_data(obs_data_after, pad_hours, False)
-
-    obs_data_concat = pd.concat([obs_data_before, obs_data_after]).reset_index(drop=True)
-
-    return obs_data_concat
-
-
 def move_obs_data_with_ref_position(obs_data, obs_ref_position):
     obs_data["from_datetime"] = obs_data["from_datetime"] + pd.Timedelta(hours=obs_ref_position)
 
     return obs_data
 
 
-def pad_obs_data(obs_data, n_hours, is_before_obs_datetime):
-    if is_before_obs_datetime:
-        edge_datetime = obs_data["from_datetime"].min()
-    else:
-        edge_datetime = obs_data["from_datetime"].max()
+# Traces of the forecast chart: forecast bars and arrows, then observation bars and arrows
+OBS_TRACE_INDEX = 2
 
-    padding = pd.DataFrame(index=range(n_hours), columns=obs_data.columns)
-    padding["from_datetime"] = pd.date_range(start=edge_datetime + pd.Timedelta(hours=1), periods=n_hours, freq="h")
-    padding["max_wind_speed_3sec"] = 0
-    padding["max_wind_speed_10min"] = 0
-    padding["mean_wind_speed"] = 0
-    padding["mean_wind_dir"] = 0
-    padding["mean_pressure"] = 0
-    padding["mean_temp"] = 0
 
-    obs_data = pd.concat([padding, obs_data], ignore_index=True)
+def format_chart_time(timestamp):
+    # Local time without offset, as plotly.js shows times
+    return timestamp.strftime("%Y-%m-%d %H:%M:%S")
 
-    obs_data = obs_data.sort_values(by="from_datetime")
 
-    return obs_data
+def get_forecast_x_range(forecast_times, start_hour, end_hour):
+    """
+    Visible x range for the forecast slider: rows start_hour to end_hour - 1, including the bar widths.
+    """
+    half_bar = pd.Timedelta(minutes=30)
+    start = forecast_times[min(start_hour, len(forecast_times) - 1)] - half_bar
+    end = forecast_times[min(end_hour, len(forecast_times)) - 1] + half_bar
 
+    return [format_chart_time(start), format_chart_time(end)]
 
-def add_obs_data_to_forecast_chart(
-    forecast_chart, obs_data, obs_ref_position, reference_hour, start_hour, end_hour, **kwargs
-):
+
+def get_obs_datetime(obs_date, reference_hour):
     reference_hour = int(reference_hour.split(":")[0])
-    forecast_hours = forecast_chart.data[0].x
 
-    obs_date = pd.to_datetime(kwargs["obs_date"])
-    obs_datetime = obs_date.replace(hour=reference_hour, minute=0, second=0, microsecond=0).tz_localize(
-        "Europe/Copenhagen"
-    )
+    return pd.Timestamp(obs_date).replace(hour=reference_hour).tz_localize("Europe/Copenhagen")
 
-    obs_data = filter_and_center_obs_data(obs_data, obs_datetime, obs_ref_position, start_hour, end_hour)
 
-    obs_data["map_forecast_time"] = forecast_hours
+def get_obs_shift(forecast_times, obs_datetime, obs_ref_position, start_hour, end_hour):
+    """
+    Time added to the observations to overlay them on the forecast. The reference hour is placed at
+    the middle of the visible forecast window, moved by `obs_ref_position` hours.
+    """
+    n_hours = end_hour - start_hour
+    anchor = forecast_times[0] + pd.Timedelta(hours=start_hour + math.ceil(n_hours / 2) + obs_ref_position - 1)
 
-    kwargs["col_datetime"] = "map_forecast_time"
+    return anchor - obs_datetime
 
-    chart = go.Figure(forecast_chart)  # needed to create a copy
+
+def create_obs_overlay(obs_data, obs_datetime, obs_shift, **kwargs):
+    """
+    Returns a figure with the observation traces and vertical lines (reference hour first, then
+    midnights), shifted by `obs_shift`. The number of lines only depends on the observations.
+    """
+    obs_data = obs_data.copy()
+    # In the timezone of the forecast, as plotly.js shows times without their offset
+    obs_data["map_forecast_time"] = (obs_data["from_datetime"] + obs_shift).dt.tz_convert("Europe/Copenhagen")
+    kwargs["col_datetime"] = "map_forecast_time"
 
     color = layout_colors["orange"]
 
-    chart = create_wind_speed_chart(obs_data, marker_opacity=0.4, marker_color=color, chart=chart, **kwargs)
+    chart = create_wind_speed_chart(obs_data, marker_opacity=0.4, marker_color=color, chart=go.Figure(), **kwargs)
 
     chart = add_direction_arrows(df=obs_data, chart=chart, marker_opacity=0.7, marker_color=color, **kwargs)
 
     # chart = add_max_wind_chart(df=obs_data, chart=chart, marker_opacity=0.5, marker_color=color, **kwargs)
 
+    chart = add_mapping_hour_line_to_chart(chart, obs_datetime + obs_shift, opacity=0.6)
+
     chart = add_background_vlines_to_chart(chart, obs_data, opacity=0.5)
 
-    chart = add_mapping_hour_line_to_chart(chart, obs_data, obs_datetime, opacity=0.6)
+    return chart
+
+
+def add_obs_data_to_forecast_chart(forecast_chart, obs_data, obs_datetime, obs_shift, **kwargs):
+    obs_overlay = create_obs_overlay(obs_data, obs_datetime, obs_shift, **kwargs)
+
+    chart = go.Figure(forecast_chart)  # needed to create a copy
+
+    chart.add_traces(obs_overlay.data)
+
+    # Observation lines first, so their indices do not depend on the forecast (see patch_obs_overlay)
+    chart.layout.shapes = obs_overlay.layout.shapes + chart.layout.shapes
 
-    chart.update_layout(barmode="overlay")
+    obs_meta = get_obs_overlay_meta(obs_overlay, obs_data, obs_datetime, obs_shift)
+    chart.update_layout(barmode="overlay", meta={"obs": obs_meta})
 
     return chart
 
 
-def add_mapping_hour_line_to_chart(chart, obs_data, obs_datetime, opacity=0.5):
-    obs_datetime_mapped = obs_data.loc[obs_data["from_datetime"] == obs_datetime]["map_forecast_time"].to_list()[0]
+def to_epoch_ms(timestamp):
+    return timestamp.value // 10**6
+
+
+def get_obs_overlay_meta(obs_overlay, obs_data, obs_datetime, obs_shift):
+    """
+    Unshifted times (epoch ms) of the observation traces and lines, used by the clientside
+    callback in assets/forecast_chart.js to move the observations without the server.
+    """
+    shift_ms = obs_shift // pd.Timedelta(milliseconds=1)
+    obs_arrows = obs_overlay.data[1]
+    is_hour_0 = obs_data["from_datetime"].dt.hour == 0
+
+    return {
+        "trace_index": OBS_TRACE_INDEX,
+        "reference_hour": obs_datetime.hour,
+        "obs_datetime_ms": to_epoch_ms(obs_datetime),
+        "x_ms": [
+            obs_data["from_datetime"].dt.as_unit("ms").array.asi8.tolist(),
+            [None if x is None else to_epoch_ms(x) - shift_ms for x in obs_arrows.x],
+        ],
+        "shapes_ms": [to_epoch_ms(obs_datetime)]
+        + obs_data.loc[is_hour_0, "from_datetime"].dt.as_unit("ms").array.asi8.tolist(),
+    }
+
+
+def patch_obs_overlay(patch, obs_data, obs_datetime, obs_shift, **kwargs):
+    """
+    Moves the observations of a chart made by add_obs_data_to_forecast_chart in a dash.Patch.
+    """
+    obs_overlay = create_obs_overlay(obs_data, obs_datetime, obs_shift, **kwargs)
+
+    obs_bars, obs_arrows = obs_overlay.data
+    patch["data"][OBS_TRACE_INDEX]["x"] = obs_bars.x
+    patch["data"][OBS_TRACE_INDEX]["customdata"] = obs_bars.customdata
+    patch["data"][OBS_TRACE_INDEX + 1]["x"] = obs_arrows.x
+
+    for i, shape in enumerate(obs_overlay.layout.shapes):
+        patch["layout"]["shapes"][i]["x0"] = shape.x0
+        patch["layout"]["shapes"][i]["x1"] = shape.x1
+
+    return patch
+
 
+def add_mapping_hour_line_to_chart(chart, obs_datetime_mapped, opacity=0.5):
     chart.add_vline(
         x=obs_datetime_mapped,
         fillcolor=layout_colors["orange"],
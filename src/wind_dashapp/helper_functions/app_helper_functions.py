@@ -1,43 +1,72 @@
+import base64
 import json
 import pandas as pd
-import requests
 import numpy as np
 import datetime as dt
+import time
+import psycopg2
+from typing import Optional
+from wind_dashapp.data_processing.cache import (
+    CACHE_TTL_SECONDS,
+    FrameLRUCache,
+    read_parsed_frame,
+    write_parsed_frame,
+)
+from wind_dashapp.data_processing.obs_store import OBS_STORE_DIR, get_obs_store
+from wind_dashapp.data_processing.db import DB_OBS_ENABLED, load_obs_window
+from wind_dashapp.data_processing.grid import GRID_BUNDLE_PATH, grid_to_geojson, load_grid_bundle
+from wind_dashapp.data_processing.reshape import long_to_wide
+from wind_dashapp.data_processing.timestamps import epoch_to_datetime, parse_dmi_timestamps
+from wind_dashapp.data_processing.dmi_client import HostRateLimiter
 from wind_dashapp.data_processing.dmi import (
     fetch_dmi_forecast_data,
+    get_forecast_request,
     parse_dmi_forecast_data,
-    fetch_dmi_observational_data,
+    open_dmi_observational_data,
+    get_observational_cache_key,
+    get_observational_cache_kind,
     parse_dmi_observational_data,
+    parse_dmi_observational_data_stream,
     CACHE_DIR,
 )
 
 DEFAULT_NUMBER_OF_HOURS_FETCH_FORECAST = 48
 DEFAULT_NUMBER_OF_HOURS_FETCH_OBS = 60
 DEFAULT_HOUR_OBS_DATA = 12
+# Hourly observations shown in the chart
+OBS_CHART_PARAMETERS = ["mean_wind_speed", "max_wind_speed_3sec", "mean_wind_dir"]
 
+STORE_FORMAT = "columnar-v1"
+# Values of the weather parameters are far less precise than this
+STORE_FLOAT_DECIMALS = 2
 
-def get_map(
-    dk_grid_url="https://raw.githubusercontent.com/MartinJHallberg/DMI_Wind_DashApp/version2/assets/DKN_10KM_epsg4326_filtered_wCent.geojson",
-):
-    geoj_grid = json.loads(requests.get(dk_grid_url).text)
-
-    shp_grid = pd.json_normalize(geoj_grid["features"])
-
-    shp_grid.rename(
-        columns={
-            "properties.KN10kmDK": "KN10kmDK",
-            "properties.Stednavn": "Stednavn",
-            "properties.cent_lon": "cent_lon",
-            "properties.cent_lat": "cent_lat",
-        },
-        inplace=True,
-    )
+# Parsed frames of recently served cells, so repeated callbacks in a worker skip disk and parsing
+frame_memo = FrameLRUCache()
 
-    # Rename None to 'No name'
-    shp_grid["Stednavn"].fillna("No name", inplace=True)
+
+def get_map(grid_bundle_path: str = GRID_BUNDLE_PATH):
+    """
+    Returns the grid GeoJSON, a frame of cell ids, names and centroids, and the hover data of the map,
+    loaded from the preprocessed grid bundled with the app.
+    """
+    grid = load_grid_bundle(grid_bundle_path)
+
+    geoj_grid = grid_to_geojson(grid)
+
+    shp_grid = pd.DataFrame(
+        {
+            "KN10kmDK": grid["cell_ids"],
+            "Stednavn": grid["names"],
+            "cent_lon": grid["cent_lon"],
+            "cent_lat": grid["cent_lat"],
+        }
+    )
 
     # Hover columns
-    hover_data_map = np.stack((shp_grid["Stednavn"], shp_grid["cent_lon"], shp_grid["cent_lat"]), axis=1)
+    hover_data_map = np.empty((len(shp_grid), 3), dtype=object)
+    hover_data_map[:, 0] = grid["names"]
+    hover_data_map[:, 1] = grid["cent_lon"]
+    hover_data_map[:, 2] = grid["cent_lat"]
 
     return geoj_grid, shp_grid, hover_data_map
 
@@ -45,9 +74,16 @@ def get_map(
 def filter_dmi_obs_data(dmi_obs, cell_id, obs_date, n_extra_days=1, **kwargs):
     dmi_obs = dmi_obs.loc[dmi_obs["cellId"] == cell_id]
 
-    dmi_obs = pd.pivot_table(dmi_obs, values="value", index="from", columns="parameterId").reset_index()
+    (from_values,), parameters, values = long_to_wide(
+        [dmi_obs["from"].to_numpy()], dmi_obs["parameterId"].to_numpy(), dmi_obs["value"].to_numpy()
+    )
+    dmi_obs = pd.DataFrame(values, columns=parameters)
+    dmi_obs.insert(0, "from", from_values)
 
-    dmi_obs["from"] = pd.to_datetime(dmi_obs["from"].str.replace("\+00:00", "", regex=False))
+    epoch_seconds, is_valid = parse_dmi_timestamps(dmi_obs["from"].to_numpy())
+    # Remove observations with microseconds, seems to be a bug in the DMI API
+    dmi_obs = dmi_obs.loc[is_valid].reset_index(drop=True)
+    dmi_obs["from"] = epoch_to_datetime(epoch_seconds[is_valid], tz="UTC")
     dmi_obs["date"] = dmi_obs["from"].dt.date
 
     obs_date = dt.datetime.strptime(obs_date, "%Y-%m-%d").date()
@@ -60,7 +96,9 @@ def filter_dmi_obs_data(dmi_obs, cell_id, obs_date, n_extra_days=1, **kwargs):
 
 
 def parse_dmi_forecast_data_wind(df):
-    df["timestamp"] = pd.to_datetime(df["timestamp"].str.replace("\+00:00", "", regex=False))
+    epoch_seconds, is_valid = parse_dmi_timestamps(df["timestamp"].to_numpy())
+    df = df.loc[is_valid].reset_index(drop=True)
+    df["timestamp"] = epoch_to_datetime(epoch_seconds[is_valid], tz="UTC")
 
     new_col_names = {col: col.replace("-", "_") for col in df.columns}
 
@@ -79,12 +117,44 @@ def load_wind_forecast_data_to_app(
     n_hours: int = DEFAULT_NUMBER_OF_HOURS_FETCH_FORECAST,
     cache_dir: str = CACHE_DIR,
     use_mock_data: bool = True,
+    rate_limiter: Optional[HostRateLimiter] = None,
 ):
     if use_mock_data:
         json_response = json.load(open("wind_dashapp/mock_data/dmi_wind_forecast_data_mock1.json"))
         print("Using mock data for forecast data")
+        df = parse_forecast_response(json_response)
     else:
-        json_response = fetch_dmi_forecast_data(api_key, lon, lat, collection_type, cache_dir=cache_dir)
+        # Parsed frames are cached under the same key as the raw response
+        # The key covers the position, parameters and model run, which is resolved once for the key and the fetch
+        forecast_request = get_forecast_request(api_key, lon, lat, collection_type)
+        cache_key = forecast_request[1]
+        memo_key = ("forecast", cache_dir, cache_key)
+        df = frame_memo.get(memo_key)
+        if df is None:
+            df = read_parsed_frame(cache_dir, cache_key)
+            if df is None:
+                json_response = fetch_dmi_forecast_data(
+                    api_key,
+                    lon,
+                    lat,
+                    collection_type,
+                    cache_dir=cache_dir,
+                    rate_limiter=rate_limiter,
+                    forecast_request=forecast_request,
+                )
+                df = parse_forecast_response(json_response)
+                write_parsed_frame(cache_dir, cache_key, "forecast", df)
+            frame_memo.put(memo_key, df)
+
+    df = df.head(n_hours)  # forecast for last 48 hours
+
+    if use_mock_data:
+        df["wind_speed"] = df["wind_speed"].apply(lambda x: x * np.random.uniform(0.5, 1.5))
+
+    return df
+
+
+def parse_forecast_response(json_response: dict):
     df = parse_dmi_forecast_data(json_response)
 
     df = parse_and_filter_dates(df)
@@ -93,12 +163,7 @@ def load_wind_forecast_data_to_app(
 
     df = df.rename(new_col_names, axis="columns")
 
-    df = df.sort_values(by="from_datetime")
-
-    df = df.head(n_hours)  # forecast for last 48 hours
-
-    if use_mock_data:
-        df["wind_speed"] = df["wind_speed"].apply(lambda x: x * np.random.uniform(0.5, 1.5))
+    df = df.sort_values(by="from_datetime").reset_index(drop=True)
 
     return df
 
@@ -115,14 +180,29 @@ def load_wind_obs_data_to_app(
     if use_mock_data:
         json_response = json.load(open("wind_dashapp/mock_data/dmi_wind_obs_data_mock6.json"))
         print("Using mock data for observational data")
+        df_pivot = pivot_obs_data(parse_dmi_observational_data(json_response))
     else:
         date_before_string = date_before.date().isoformat()
-        json_response = fetch_dmi_observational_data(api_key, cell_id, date_before_string, n_hours, cache_dir=cache_dir)
-    df = parse_dmi_observational_data(json_response)
-
-    df = parse_and_filter_dates(df)
-
-    df_pivot = pd.pivot_table(df, values="value", index="from_datetime", columns="parameter_id").reset_index()
+        # Parsed frames are cached under the same key as the raw response
+        cache_key = get_observational_cache_key(api_key, cell_id, date_before_string, n_hours)
+        cache_kind = get_observational_cache_kind(date_before_string, n_hours)
+        memo_key = ("observation", cache_dir, cache_key)
+        df_pivot = frame_memo.get(memo_key)
+        if df_pivot is None:
+            df_pivot = load_obs_data_from_store(cell_id, date_before_string, n_hours)
+            if df_pivot is None and DB_OBS_ENABLED:
+                df_pivot = load_obs_data_from_db(cell_id, date_before_string, n_hours)
+            if df_pivot is None:
+                df_pivot = read_parsed_frame(cache_dir, cache_key)
+            if df_pivot is None:
+                with open_dmi_observational_data(
+                    api_key, cell_id, date_before_string, n_hours, cache_dir=cache_dir
+                ) as fp:
+                    df_pivot = pivot_obs_data(parse_dmi_observational_data_stream(fp))
+                write_parsed_frame(cache_dir, cache_key, cache_kind, df_pivot)
+            # Windows still being filled in are reloaded once their cache entries expire
+            expires_at = time.time() + CACHE_TTL_SECONDS[cache_kind] if cache_kind == "recent_observation" else None
+            frame_memo.put(memo_key, df_pivot, expires_at=expires_at)
 
     if use_mock_data:
         df_pivot["mean_wind_speed"] = df_pivot["mean_wind_speed"].apply(lambda x: x * np.random.uniform(0.5, 1.5))
@@ -134,32 +214,128 @@ def load_wind_obs_data_to_app(
     return df_pivot
 
 
-def parse_and_filter_dates(df: pd.DataFrame):
-    # Remove observations with microseconds, seems to be a bug in the DMI API
-    df["has_microseconds"] = df["from"].str.contains("00:00:00.001000")
-    df_filtered = df[~df["has_microseconds"]].copy()
+def load_obs_data_from_store(cell_id: str, date_from: str, n_hours: int, store_dir: str = OBS_STORE_DIR):
+    """
+    Returns the observations from the local store if it covers the whole window, otherwise None.
+    """
+    obs_store = get_obs_store(store_dir)
+    if obs_store is None:
+        return None
 
-    df_filtered["from_datetime"] = pd.to_datetime(df_filtered["from"], format="ISO8601")
-    # df_filtered['to_datetime'] = pd.to_datetime(df_filtered['to'], format='ISO8601')
+    start = pd.Timestamp(date_from, tz="Europe/Copenhagen")
+    end = start + pd.Timedelta(hours=n_hours)
+    if not obs_store.covers(start, end):
+        return None
 
-    # Check if timestamps are parsed correctly
-    if df_filtered["from_datetime"].dtype != "datetime64[ns, UTC]":
-        raise ValueError("Timestamps could not be parsed correctly from API response")
+    print(f"[load_obs_data_from_store] Loading observations for {cell_id} from {store_dir}")
+    return obs_store.load_window(cell_id, start, end)
 
-    # Convert to Copenhagen time
-    df_filtered["from_datetime"] = df_filtered["from_datetime"].dt.tz_convert("Europe/Copenhagen")
-    # df_filtered['to_datetime'] = df_filtered['to_datetime'].dt.tz_convert('Europe/Copenhagen')
 
-    df_filtered = df_filtered.drop(columns=["from", "to", "has_microseconds"], errors="ignore")
+def load_obs_data_from_db(cell_id: str, date_from: str, n_hours: int):
+    """
+    Returns the observations of the chart from the database, or None if it does not have the whole
+    window or cannot be reached.
+    """
+    start = pd.Timestamp(date_from, tz="Europe/Copenhagen")
+    try:
+        return load_obs_window(cell_id, start, start + pd.Timedelta(hours=n_hours), OBS_CHART_PARAMETERS)
+    except psycopg2.Error as e:
+        print(f"[load_obs_data_from_db] Database not available, falling back to the API: {e}")
+        return None
 
-    return df_filtered
 
+def pivot_obs_data(df: pd.DataFrame):
+    df = parse_and_filter_dates(df)
 
-def convert_json_to_df(stored_json: dict):
-    df = pd.DataFrame(stored_json)
-    df["from_datetime"] = pd.to_datetime(df["from_datetime"])
+    from_datetime = df["from_datetime"]
+    (from_ns,), parameters, values = long_to_wide(
+        [from_datetime.array.asi8], df["parameter_id"].to_numpy(), df["value"].to_numpy()
+    )
 
-    return df
+    df_pivot = pd.DataFrame(values, columns=parameters)
+    df_pivot.insert(0, "from_datetime", pd.to_datetime(from_ns, utc=True).tz_convert(from_datetime.dt.tz))
+
+    return df_pivot
+
+
+def parse_and_filter_dates(df: pd.DataFrame):
+    # Raises ValueError if the timestamps can not be parsed
+    epoch_seconds, is_valid = parse_dmi_timestamps(df["from"].to_numpy())
+
+    # Remove observations with microseconds, seems to be a bug in the DMI API
+    df_filtered = df.loc[is_valid].drop(columns=["from", "to"], errors="ignore")
+
+    # Copenhagen time
+    df_filtered["from_datetime"] = epoch_to_datetime(epoch_seconds[is_valid])
+
+    return df_filtered
+
+
+def _pack_array(values: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode("ascii")
+
+
+def _unpack_array(packed: str, dtype: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(packed), dtype=dtype)
+
+
+def encode_frame_for_store(df: pd.DataFrame, pack_arrays: bool = False) -> dict:
+    """
+    Encodes a frame for a dcc.Store as one array per column instead of one dict per row.
+    Timestamps become epoch seconds with the timezone stored once, and floats are rounded to
+    STORE_FLOAT_DECIMALS. With pack_arrays, numeric columns are base64 strings of little-endian
+    typed arrays (float32 values, float64 epoch seconds) that the browser reads without parsing numbers.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            epoch_seconds = ((series - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+            column = {"type": "datetime", "tz": str(series.dt.tz)}
+            if pack_arrays:
+                column.update(dtype="<f8", values=_pack_array(epoch_seconds.astype("<f8")))
+            else:
+                column["values"] = epoch_seconds.tolist()
+        elif pd.api.types.is_float_dtype(series.dtype):
+            rounded = series.to_numpy(np.float64).round(STORE_FLOAT_DECIMALS)
+            column = {"type": "float"}
+            if pack_arrays:
+                column.update(dtype="<f4", values=_pack_array(rounded.astype("<f4")))
+            else:
+                # NaN is not valid JSON
+                column["values"] = [None if np.isnan(value) else value for value in rounded.tolist()]
+        elif pd.api.types.is_integer_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            column = {"type": str(series.dtype), "values": series.tolist()}
+        else:
+            column = {"type": "object", "values": series.astype(object).where(series.notna(), None).tolist()}
+        columns[col] = column
+
+    return {"format": STORE_FORMAT, "length": len(df), "columns": columns}
+
+
+def decode_store_frame(payload: dict) -> pd.DataFrame:
+    """
+    Decodes a payload of encode_frame_for_store. Float columns come back as float64.
+    """
+    if payload.get("format") != STORE_FORMAT:
+        raise ValueError(f"Unknown store format {payload.get('format')}, expected {STORE_FORMAT}")
+
+    data = {}
+    for col, column in payload["columns"].items():
+        values = column["values"]
+        if isinstance(values, str):
+            values = _unpack_array(values, column["dtype"])
+
+        if column["type"] == "datetime":
+            data[col] = pd.to_datetime(np.asarray(values, dtype=np.int64), unit="s", utc=True).tz_convert(column["tz"])
+        elif column["type"] == "float":
+            data[col] = np.asarray(values, dtype=np.float64)
+        elif column["type"] == "object":
+            data[col] = pd.Series(values, dtype=object)
+        else:
+            data[col] = np.asarray(values, dtype=column["type"])
+
+    return pd.DataFrame(data, index=pd.RangeIndex(payload["length"]))
 
 
 def map_slider_to_date(df):
@@ -0,0 +1,81 @@
+"""
+Managers for running the data loading callbacks as Dash background callbacks, so a slow DMI
+response occupies a fetch worker instead of a web worker. A job superseded by a newer click is
+terminated by Dash when the new job starts.
+
+Modes (APP_BACKGROUND_CALLBACKS):
+    "off"        callbacks run in the web workers
+    "diskcache"  each job runs in a separate process, results are kept in BACKGROUND_CACHE_DIR
+                 (requires the diskcache and multiprocess packages, e.g. for local development)
+    "celery"     jobs run in BACKGROUND_WORKERS celery workers, with Redis as broker and result backend
+                 (requires the celery and redis packages)
+
+Usage (celery mode, next to the web workers):
+    cd src
+    celery -A wind_dashapp.app:celery_app worker
+"""
+
+import os
+from typing import Optional
+
+from dash import CeleryManager, DiskcacheManager
+
+try:
+    import diskcache
+except ImportError:  # diskcache is optional, only needed for the diskcache mode
+    diskcache = None
+
+try:
+    import celery
+except ImportError:  # celery is optional, only needed for the celery mode
+    celery = None
+
+APP_BACKGROUND_CALLBACKS = os.getenv("APP_BACKGROUND_CALLBACKS", "off").lower()
+BACKGROUND_CACHE_DIR = os.getenv("BACKGROUND_CACHE_DIR", "cache/background_callbacks")
+BACKGROUND_BROKER_URL = os.getenv("BACKGROUND_BROKER_URL", "redis://localhost:6379/1")
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 4))
+# Results of jobs nobody collected, e.g. after the page was closed, are dropped after this time
+BACKGROUND_RESULT_EXPIRE_SECONDS = int(os.getenv("BACKGROUND_RESULT_EXPIRE_SECONDS", 600))
+
+
+def create_celery_app(broker_url: str = BACKGROUND_BROKER_URL, n_workers: int = BACKGROUND_WORKERS):
+    if celery is None:
+        raise ValueError("The celery background callback mode requires the celery package")
+
+    celery_app = celery.Celery("wind_dashapp", broker=broker_url, backend=broker_url)
+    celery_app.conf.update(
+        worker_concurrency=n_workers,
+        # A fetch blocks on the network, so workers should not reserve jobs they can not start yet
+        worker_prefetch_multiplier=1,
+        result_expires=BACKGROUND_RESULT_EXPIRE_SECONDS,
+    )
+
+    return celery_app
+
+
+def create_background_callback_manager(mode: str = APP_BACKGROUND_CALLBACKS):
+    """
+    Returns the background callback manager of `mode`, or None if background callbacks are off.
+    """
+    if mode == "off":
+        return None
+
+    if mode == "diskcache":
+        if diskcache is None:
+            raise ValueError("The diskcache background callback mode requires the diskcache package")
+        return DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_DIR), expire=BACKGROUND_RESULT_EXPIRE_SECONDS)
+
+    if mode == "celery":
+        return CeleryManager(create_celery_app(), expire=BACKGROUND_RESULT_EXPIRE_SECONDS)
+
+    raise ValueError(f"Unknown background callback mode {mode}, expected off, diskcache or celery")
+
+
+def get_celery_app(manager) -> Optional["celery.Celery"]:
+    """
+    Returns the celery app of a manager, for the `celery -A` command of the workers.
+    """
+    if isinstance(manager, CeleryManager):
+        return manager.handle
+
+    return None
@@ -0,0 +1,260 @@
+"""
+Pre-warmer of the forecast cache. A separate process waits for each new forecast model run and
+loads the forecasts of a set of cells into the cache the app reads, so map clicks are cache hits.
+The cells are the most requested ones (counted by the app), a fixed list, or the whole grid.
+Every warm-up appends its duration and coverage as a JSON line to PREWARM_LOG_PATH.
+
+Usage:
+    cd src
+    python -m wind_dashapp.helper_functions.forecast_prewarm --cells popular --top-n 100
+    python -m wind_dashapp.helper_functions.forecast_prewarm --cells all --once
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from wind_dashapp.data_processing.dmi import (
+    CACHE_DIR,
+    DEFAULT_BATCH_CONCURRENCY,
+    MODEL_RUN_PROBE_INTERVAL,
+    get_fallback_model_run,
+    get_latest_model_run,
+)
+from wind_dashapp.data_processing.dmi_client import DEFAULT_REQUESTS_PER_SECOND, HostRateLimiter
+from wind_dashapp.data_processing.grid import GRID_BUNDLE_PATH, load_grid_bundle
+from wind_dashapp.helper_functions.app_helper_functions import load_wind_forecast_data_to_app
+
+PREWARM_CELLS = os.getenv("PREWARM_CELLS", "popular")
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", 100))
+PREWARM_CELL_IDS = [cell_id for cell_id in os.getenv("PREWARM_CELL_IDS", "").split(",") if cell_id]
+PREWARM_LOG_PATH = os.getenv("PREWARM_LOG_PATH", os.path.join(CACHE_DIR, "prewarm_runs.jsonl"))
+CELL_REQUESTS_FILE_NAME = "cell_requests.sqlite"
+# Requests are counted in memory and written to the shared counts at most this often per process
+CELL_REQUESTS_FLUSH_SECONDS = float(os.getenv("CELL_REQUESTS_FLUSH_SECONDS", 60))
+COLLECTION_TYPE = "wind"
+
+
+def _connect_cell_requests(cache_dir: str) -> sqlite3.Connection:
+    os.makedirs(cache_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(cache_dir, CELL_REQUESTS_FILE_NAME), timeout=5)
+    conn.execute("CREATE TABLE IF NOT EXISTS cell_requests (cell_id TEXT PRIMARY KEY, n_requests INTEGER NOT NULL)")
+
+    return conn
+
+
+_cell_requests_lock = threading.Lock()
+_pending_cell_requests: Dict[str, Counter] = {}
+_cell_requests_flushed_at = time.monotonic()
+
+
+def record_cell_request(cell_id: str, cache_dir: str = CACHE_DIR):
+    """
+    Counts a forecast request of a cell, for pre-warming the most requested cells. The count is
+    kept in memory and written with the other pending counts every CELL_REQUESTS_FLUSH_SECONDS.
+    """
+    with _cell_requests_lock:
+        _pending_cell_requests.setdefault(cache_dir, Counter())[cell_id] += 1
+        is_due = time.monotonic() - _cell_requests_flushed_at >= CELL_REQUESTS_FLUSH_SECONDS
+
+    if is_due:
+        flush_cell_requests()
+
+
+def flush_cell_requests():
+    """
+    Adds the counts recorded in this process to the counts shared through the cache directory.
+    """
+    global _cell_requests_flushed_at
+    with _cell_requests_lock:
+        pending = dict(_pending_cell_requests)
+        _pending_cell_requests.clear()
+        _cell_requests_flushed_at = time.monotonic()
+
+    for cache_dir, counts in pending.items():
+        try:
+            with closing(_connect_cell_requests(cache_dir)) as conn, conn:
+                conn.executemany(
+                    "INSERT INTO cell_requests (cell_id, n_requests) VALUES (?, ?) "
+                    "ON CONFLICT (cell_id) DO UPDATE SET n_requests = n_requests + excluded.n_requests",
+                    list(counts.items()),
+                )
+        except sqlite3.Error as e:
+            print(f"[flush_cell_requests] Could not record {sum(counts.values())} requests in {cache_dir}: {e}")
+
+
+atexit.register(flush_cell_requests)
+
+
+def get_popular_cells(n: int, cache_dir: str = CACHE_DIR) -> List[str]:
+    flush_cell_requests()
+    with closing(_connect_cell_requests(cache_dir)) as conn:
+        rows = conn.execute("SELECT cell_id FROM cell_requests ORDER BY n_requests DESC, cell_id LIMIT ?", (n,))
+        return [cell_id for (cell_id,) in rows]
+
+
+def select_cells(
+    mode: str,
+    top_n: int = PREWARM_TOP_N,
+    cell_ids: Optional[List[str]] = None,
+    cache_dir: str = CACHE_DIR,
+    grid_bundle_path: str = GRID_BUNDLE_PATH,
+) -> List[Tuple[str, float, float]]:
+    """
+    Returns the (cell_id, lon, lat) of the cells to warm. The centroids are the ones of the map,
+    so the cache keys match the ones of map clicks.
+    """
+    grid = load_grid_bundle(grid_bundle_path)
+    centroids: Dict[str, Tuple[float, float]] = {
+        cell_id: (lon, lat)
+        for cell_id, lon, lat in zip(grid["cell_ids"].tolist(), grid["cent_lon"].tolist(), grid["cent_lat"].tolist())
+    }
+
+    if mode == "all":
+        cell_ids = list(centroids)
+    elif mode == "popular":
+        cell_ids = get_popular_cells(top_n, cache_dir)
+    elif mode == "list":
+        cell_ids = cell_ids or []
+    else:
+        raise ValueError(f"Unknown cell selection {mode}, expected popular, list or all")
+
+    unknown = [cell_id for cell_id in cell_ids if cell_id not in centroids]
+    if unknown:
+        print(f"[select_cells] Skipping cells not in the grid: {unknown}")
+
+    return [(cell_id, *centroids[cell_id]) for cell_id in cell_ids if cell_id in centroids]
+
+
+class _FetchCounter:
+    """
+    Passed as the rate limiter of one cell, counting the upstream requests made for it.
+    Only requests that miss every cache tier acquire the rate limiter.
+    """
+
+    def __init__(self, rate_limiter: HostRateLimiter):
+        self.rate_limiter = rate_limiter
+        self.n_fetches = 0
+
+    def acquire(self, url: str):
+        self.n_fetches += 1
+        self.rate_limiter.acquire(url)
+
+
+def warm_forecasts(
+    api_key: str,
+    cells: List[Tuple[str, float, float]],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    cache_dir: str = CACHE_DIR,
+) -> Dict[str, int]:
+    """
+    Loads the forecasts of the cells into the cache through the loader of the app, with at most
+    `max_concurrency` loads in flight and upstream requests spaced by `requests_per_second`.
+    Returns the number of cells already cached, fetched and failed.
+    """
+    rate_limiter = HostRateLimiter(requests_per_second)
+
+    def warm(lon, lat):
+        fetch_counter = _FetchCounter(rate_limiter)
+        load_wind_forecast_data_to_app(
+            api_key, lon, lat, COLLECTION_TYPE, cache_dir=cache_dir, use_mock_data=False, rate_limiter=fetch_counter
+        )
+        return "fetched" if fetch_counter.n_fetches else "cached"
+
+    totals = {"cached": 0, "fetched": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(warm, lon, lat): cell_id for cell_id, lon, lat in cells}
+
+        for future in as_completed(futures):
+            try:
+                totals[future.result()] += 1
+            except (ValueError, KeyError) as err:
+                print(f"[warm_forecasts] Failed to warm forecast for {futures[future]}: {err}")
+                totals["failed"] += 1
+
+    return totals
+
+
+def log_prewarm_run(record: Dict, log_path: str = PREWARM_LOG_PATH):
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with open(log_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def prewarm_model_run(
+    api_key: str,
+    model_run: str,
+    cells: List[Tuple[str, float, float]],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    cache_dir: str = CACHE_DIR,
+    log_path: str = PREWARM_LOG_PATH,
+) -> Dict:
+    start = time.perf_counter()
+    totals = warm_forecasts(api_key, cells, max_concurrency, requests_per_second, cache_dir)
+
+    n_warm = totals["cached"] + totals["fetched"]
+    record = {
+        "model_run": model_run,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "duration_s": round(time.perf_counter() - start, 2),
+        "cells": len(cells),
+        **totals,
+        "coverage": round(n_warm / len(cells), 4) if cells else 1.0,
+    }
+    log_prewarm_run(record, log_path)
+    print(f"[prewarm_model_run] {record}")
+
+    return record
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Warm the forecast cache on each new forecast model run.")
+    parser.add_argument("--cells", choices=["popular", "list", "all"], default=PREWARM_CELLS)
+    parser.add_argument("--top-n", type=int, default=PREWARM_TOP_N, help="Number of cells for --cells popular")
+    parser.add_argument("--cell-ids", default=",".join(PREWARM_CELL_IDS), help="Comma separated, for --cells list")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY)
+    parser.add_argument("--requests-per-second", type=float, default=DEFAULT_REQUESTS_PER_SECOND)
+    parser.add_argument("--probe-seconds", type=float, default=MODEL_RUN_PROBE_INTERVAL)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--log-path", default=PREWARM_LOG_PATH)
+    parser.add_argument("--once", action="store_true", help="Warm the current model run and exit")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("DMI_API_KEY_FORECAST")
+    cell_ids = [cell_id for cell_id in args.cell_ids.split(",") if cell_id]
+
+    warmed_run = None
+    while True:
+        model_run = get_latest_model_run(api_key, COLLECTION_TYPE, probe_interval=args.probe_seconds)
+        if model_run is None:
+            model_run = get_fallback_model_run()
+
+        if model_run != warmed_run:
+            # Popular cells are selected again for every run
+            cells = select_cells(args.cells, args.top_n, cell_ids, args.cache_dir)
+            prewarm_model_run(
+                api_key, model_run, cells, args.concurrency, args.requests_per_second, args.cache_dir, args.log_path
+            )
+            warmed_run = model_run
+
+        if args.once:
+            return
+
+        time.sleep(args.probe_seconds)
+
+
+if __name__ == "__main__":
+    main()
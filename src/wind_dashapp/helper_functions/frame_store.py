@@ -0,0 +1,127 @@
+"""
+Server-side store of the frames behind the dcc.Store components. Callbacks keep the forecast and
+observation frames of a session here and send only a key through the browser. Entries expire after
+FRAME_STORE_TTL_SECONDS; callbacks reload a frame from the data caches if its entry has expired
+or the store cannot be reached.
+
+Backends: "memory" keeps frames in the worker process, "redis" shares them between workers
+(requires the redis package and a server at FRAME_STORE_REDIS_URL).
+"""
+
+import io
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import FrameLRUCache, frame_to_npz_bytes, read_frame_npz
+
+try:
+    import redis
+except ImportError:  # redis is optional, only the in-process backend is available without it
+    redis = None
+
+FRAME_STORE_BACKEND = os.getenv("FRAME_STORE_BACKEND", "memory").lower()
+FRAME_STORE_TTL_SECONDS = int(os.getenv("FRAME_STORE_TTL_SECONDS", 3600))
+FRAME_STORE_MAX_ENTRIES = int(os.getenv("FRAME_STORE_MAX_ENTRIES", 1024))
+FRAME_STORE_MAX_BYTES = int(os.getenv("FRAME_STORE_MAX_BYTES", 256 * 1024**2))
+FRAME_STORE_REDIS_URL = os.getenv("FRAME_STORE_REDIS_URL", "redis://localhost:6379/0")
+FRAME_STORE_KEY_PREFIX = "wind_dashapp:frame:"
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def make_frame_key(session_id: str, kind: str) -> str:
+    """
+    Returns a new key for a frame of a session. Every write gets its own key, so a slow
+    callback can not overwrite the frame a newer response points to.
+    """
+    return f"{session_id}:{kind}:{uuid.uuid4().hex}"
+
+
+def is_session_key(frame_key: str, session_id: str) -> bool:
+    return frame_key.startswith(f"{session_id}:")
+
+
+class MemoryFrameStore:
+    """
+    In-process frame store: an LRU of frames bounded by entry count and memory, with expiry.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = FRAME_STORE_TTL_SECONDS,
+        max_entries: int = FRAME_STORE_MAX_ENTRIES,
+        max_bytes: int = FRAME_STORE_MAX_BYTES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        # Expired frames are dropped when read, the others make room in LRU order
+        self.frames = FrameLRUCache(max_entries, max_bytes)
+
+    def put(self, key: str, df: pd.DataFrame):
+        self.frames.put(key, df, expires_at=time.time() + self.ttl_seconds)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        return self.frames.get(key)
+
+
+class RedisFrameStore:
+    """
+    Frame store shared by all workers, with frames serialized as .npz bytes and expired by Redis.
+    """
+
+    def __init__(self, url: str = FRAME_STORE_REDIS_URL, ttl_seconds: int = FRAME_STORE_TTL_SECONDS):
+        if redis is None:
+            raise ValueError("The redis frame store backend requires the redis package")
+
+        self.ttl_seconds = ttl_seconds
+        self.client = redis.Redis.from_url(url)
+
+    def put(self, key: str, df: pd.DataFrame):
+        """
+        Raises ValueError if Redis cannot be reached.
+        """
+        try:
+            self.client.setex(FRAME_STORE_KEY_PREFIX + key, self.ttl_seconds, frame_to_npz_bytes(df))
+        except redis.exceptions.RedisError as e:
+            raise ValueError(f"Frame store not available: {e}")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Returns None if the frame has expired, or if Redis cannot be reached.
+        """
+        try:
+            payload = self.client.get(FRAME_STORE_KEY_PREFIX + key)
+        except redis.exceptions.RedisError as e:
+            print(f"[RedisFrameStore.get] Frame store not available: {e}")
+            return None
+        if payload is None:
+            return None
+
+        return read_frame_npz(io.BytesIO(payload))
+
+
+_frame_store_lock = threading.Lock()
+_frame_store = None
+
+
+def get_frame_store():
+    """
+    Returns the frame store of this process for FRAME_STORE_BACKEND, created on first use.
+    """
+    global _frame_store
+    with _frame_store_lock:
+        if _frame_store is None:
+            if FRAME_STORE_BACKEND == "redis":
+                _frame_store = RedisFrameStore()
+            elif FRAME_STORE_BACKEND == "memory":
+                _frame_store = MemoryFrameStore()
+            else:
+                raise ValueError(f"Unknown frame store backend {FRAME_STORE_BACKEND}, expected memory or redis")
+
+        return _frame_store
@@ -0,0 +1,112 @@
+"""
+Prebuilt map figure. The choropleth of the grid is serialized once to a gzipped JSON file named
+by a hash of its inputs (the grid bundle and MAP_FIGURE_VERSION), and served from a route of the
+Flask server with immutable caching, so workers hold only the compressed bytes and browsers
+download the geometry once across visits. A figure is built when none matches the inputs.
+
+Usage (after changing the map or the grid):
+    python -m wind_dashapp.helper_functions.map_figure
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+import dash
+import flask
+import plotly.graph_objects as go
+
+from wind_dashapp.data_processing.cache import atomic_open
+from wind_dashapp.data_processing.grid import GRID_BUNDLE_PATH, get_grid_bundle_hash
+from wind_dashapp.helper_functions.app_graph_functions import create_map_chart
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Relative paths are taken from the package, so every worker finds the same files whatever its working directory
+MAP_FIGURE_DIR = os.path.join(PACKAGE_DIR, os.getenv("MAP_FIGURE_DIR", "build"))
+# Bump after changing create_map_chart or create_map_layout, so browsers get the new figure
+MAP_FIGURE_VERSION = 1
+MAP_FIGURE_ROUTE = "map-figure/"
+MAP_FIGURE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def get_map_figure_hash(grid_bundle_path: str = GRID_BUNDLE_PATH) -> str:
+    """
+    Returns the hash of the inputs of the map figure: the grid bundle and the figure version.
+    """
+    inputs = f"{get_grid_bundle_hash(grid_bundle_path)}:{MAP_FIGURE_VERSION}"
+
+    return hashlib.sha256(inputs.encode("utf-8")).hexdigest()[:16]
+
+
+def serialize_map_figure(fig: go.Figure) -> bytes:
+    """
+    Returns the gzipped JSON of a figure. The gzip header has no timestamp,
+    so the same figure always gives the same bytes.
+    """
+    return gzip.compress(fig.to_json().encode("utf-8"), mtime=0)
+
+
+def _map_figure_path(output_dir: str, figure_hash: str) -> str:
+    return os.path.join(output_dir, f"map_figure-{figure_hash}.json.gz")
+
+
+def build_map_figure(output_dir: str = MAP_FIGURE_DIR) -> str:
+    # Files of earlier builds are left for workers still serving them
+    path = _map_figure_path(output_dir, get_map_figure_hash())
+    payload = serialize_map_figure(create_map_chart())
+
+    os.makedirs(output_dir, exist_ok=True)
+    with atomic_open(path, "wb") as f:
+        f.write(payload)
+
+    print(f"[build_map_figure] Map figure written to {path} ({len(payload) / 1024:.0f} kB)")
+    return path
+
+
+def load_map_figure(output_dir: str = MAP_FIGURE_DIR) -> Tuple[str, bytes]:
+    """
+    Returns the hash and gzipped JSON of the map figure of the current inputs, building it if there is none.
+    """
+    figure_hash = get_map_figure_hash()
+    path = _map_figure_path(output_dir, figure_hash)
+    if not os.path.exists(path):
+        build_map_figure(output_dir)
+
+    with open(path, "rb") as f:
+        payload = f.read()
+
+    return figure_hash, payload
+
+
+def register_map_figure_route(app: dash.Dash, figure_hash: str, payload: bytes) -> str:
+    """
+    Serves the map figure at a path containing its hash, next to the routes of the Dash app, and
+    returns the path for the browser (with the requests prefix of the app). The figure is sent
+    gzipped, or decompressed to clients that do not accept gzip.
+    """
+    path = f"{MAP_FIGURE_ROUTE}{figure_hash}.json"
+
+    @app.server.route(f"{app.config.routes_pathname_prefix}{path}")
+    def serve_map_figure():
+        headers = {"Cache-Control": MAP_FIGURE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if flask.request.accept_encodings["gzip"]:
+            headers["Content-Encoding"] = "gzip"
+            return flask.Response(payload, mimetype="application/json", headers=headers)
+
+        return flask.Response(gzip.decompress(payload), mimetype="application/json", headers=headers)
+
+    return app.get_relative_path(f"/{path}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the serialized map figure served by the app.")
+    parser.add_argument("--output-dir", default=MAP_FIGURE_DIR)
+    args = parser.parse_args(argv)
+
+    build_map_figure(args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
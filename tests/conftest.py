@@ -0,0 +1,114 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from wind_dashapp.data_processing import dmi
+from wind_dashapp.data_processing.cache import write_frame_npz
+
+OBS_PARAMETERS = ["mean_wind_speed", "mean_wind_dir"]
+
+
+class DMIStandInServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the DMI gateway. Paths containing a key of `routes` are answered with
+    its body. Other responses are taken from `responses` in order (status, body) and fall back
+    to `default_body` with status 200.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.routes = {"/instances?": {"instances": [{"id": "2025-07-24T060000Z"}]}}
+        self.responses = []
+        self.default_body = {}
+        self.delay = 0.0
+        self.use_gzip = False
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class DMIStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            routes = [body for route, body in server.routes.items() if route in self.path]
+            if routes:
+                status, body = 200, routes[0]
+            else:
+                server.requests.append(
+                    {"path": self.path, "headers": dict(self.headers), "client": self.client_address}
+                )
+                status, body = server.responses.pop(0) if server.responses else (200, server.default_body)
+
+        if server.delay:
+            threading.Event().wait(server.delay)
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if server.use_gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def dmi_stand_in():
+    server = DMIStandInServer(("127.0.0.1", 0), DMIStandInHandler)
+    dmi._latest_model_runs.clear()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    dmi._latest_model_runs.clear()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def obs_parameters():
+    return list(OBS_PARAMETERS)
+
+
+@pytest.fixture
+def write_obs_chunk():
+    """
+    Writes an archive chunk file of hourly rows for the cells, with the value i + 100 * j
+    for hour i and parameter j of OBS_PARAMETERS.
+    """
+
+    def write(path, cell_ids, start, n_hours):
+        rows = []
+        for cell_id in cell_ids:
+            for i, timestamp in enumerate(pd.date_range(start, periods=n_hours, freq="h", tz="UTC")):
+                for j, parameter_id in enumerate(OBS_PARAMETERS):
+                    rows.append(
+                        {
+                            "cellId": cell_id,
+                            "from": timestamp.isoformat(),
+                            "to": (timestamp + pd.Timedelta(hours=1)).isoformat(),
+                            "parameterId": parameter_id,
+                            "value": float(i + 100 * j),
+                        }
+                    )
+        write_frame_npz(path, pd.DataFrame(rows))
+
+    return write
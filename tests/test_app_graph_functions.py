@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from dash import Patch
+from plotly.io.json import to_json_plotly
+
+from wind_dashapp.helper_functions import app_graph_functions as graphs
+from wind_dashapp.helper_functions.app_graph_functions import add_direction_arrows
+from wind_dashapp.helper_functions.app_helper_functions import (
+    parse_dmi_observational_data,
+    parse_forecast_response,
+    pivot_obs_data,
+)
+
+MOCK_DATA_DIR = Path(__file__).parents[1] / "src" / "wind_dashapp" / "mock_data"
+OBS_COLUMNS = dict(
+    col_wind_speed="mean_wind_speed",
+    col_wind_max_speed="max_wind_speed_3sec",
+    col_wind_direction="mean_wind_dir",
+    col_datetime="from_datetime",
+)
+
+
+def test_add_direction_arrows_draws_one_trace():
+    df = pd.DataFrame(
+        {
+            "from_datetime": pd.date_range("2025-07-24 06:00", periods=3, freq="h", tz="Europe/Copenhagen"),
+            "wind_dir": [0.0, 90.0, np.nan],
+        }
+    )
+
+    chart = add_direction_arrows(df, go.Figure(), col_wind_direction="wind_dir", col_datetime="from_datetime")
+
+    assert len(chart.data) == 1
+    assert len(chart.layout.annotations) == 0
+    arrows = chart.data[0]
+    # Wind from the north points south, wind from the east points west; hours without direction are skipped
+    assert list(arrows.x) == [
+        df["from_datetime"][0],
+        df["from_datetime"][0],
+        None,
+        df["from_datetime"][1] + pd.Timedelta(minutes=25),
+        df["from_datetime"][1] - pd.Timedelta(minutes=25),
+        None,
+    ]
+    assert np.allclose(np.array(arrows.y, dtype=float), [-0.35, -1.65, np.nan, -1, -1, np.nan], equal_nan=True)
+    assert list(arrows.marker.size) == [0, 8, 0, 0, 8, 0]
+
+
+def apply_patch(figure, patch):
+    for operation in json.loads(to_json_plotly(patch.to_plotly_json()))["operations"]:
+        assert operation["operation"] == "Assign"
+        *path, key = operation["location"]
+        target = figure
+        for location in path:
+            target = target[location]
+        target[key] = operation["params"]["value"]
+    return figure
+
+
+def test_patched_obs_overlay_matches_rebuilt_chart():
+    with open(MOCK_DATA_DIR / "dmi_wind_forecast_data_mock1.json") as f:
+        forecast_data = parse_forecast_response(json.load(f))
+    with open(MOCK_DATA_DIR / "dmi_wind_obs_data_mock6.json") as f:
+        obs_data = pivot_obs_data(parse_dmi_observational_data(json.load(f)))
+    forecast_times = pd.DatetimeIndex(forecast_data["from_datetime"])
+    obs_datetime = graphs.get_obs_datetime(obs_data["from_datetime"].dt.date.iloc[30], "12:00")
+
+    def create_chart(obs_ref_position, start_hour, end_hour):
+        obs_shift = graphs.get_obs_shift(forecast_times, obs_datetime, obs_ref_position, start_hour, end_hour)
+        chart = graphs.create_forecast_chart(forecast_data)
+        return graphs.add_obs_data_to_forecast_chart(chart, obs_data, obs_datetime, obs_shift, **OBS_COLUMNS)
+
+    chart = create_chart(0, 1, 48)
+    # The reference hour is placed at the middle of the visible forecast
+    assert pd.Timestamp(chart.layout.shapes[0].x0) == forecast_times[24]
+
+    obs_shift = graphs.get_obs_shift(forecast_times, obs_datetime, 3, 5, 30)
+    patch = graphs.patch_obs_overlay(Patch(), obs_data, obs_datetime, obs_shift, **OBS_COLUMNS)
+    patched = apply_patch(json.loads(chart.to_json()), patch)
+    expected = json.loads(create_chart(3, 5, 30).to_json())
+
+    assert patched["data"] == expected["data"]
+    assert patched["layout"]["shapes"] == expected["layout"]["shapes"]
+
+    # Unshifted times for the clientside callback
+    obs_meta = chart.layout.meta["obs"]
+    shift_ms = graphs.get_obs_shift(forecast_times, obs_datetime, 0, 1, 48) // pd.Timedelta(milliseconds=1)
+    bar_times = pd.to_datetime(np.array(obs_meta["x_ms"][0]) + shift_ms, unit="ms", utc=True)
+    assert (bar_times.tz_convert("Europe/Copenhagen").tz_localize(None) == pd.DatetimeIndex(chart.data[2].x)).all()
+    assert obs_meta["shapes_ms"][0] + shift_ms == pd.Timestamp(chart.layout.shapes[0].x0).value // 10**6
@@ -1,13 +1,17 @@
+import json
 import pytest
 import pandas as pd
 from dotenv import load_dotenv
 import os
+from pathlib import Path
+from wind_dashapp.data_processing.cache import FrameLRUCache, read_frame_npz, write_frame_npz
 from wind_dashapp.helper_functions import app_helper_functions as f
 
 load_dotenv()
 
 DMI_API_KEY_OBSERVATION = os.getenv("DMI_API_KEY_OBSERVATION")
 DMI_API_KEY_FORECAST = os.getenv("DMI_API_KEY_FORECAST")
+MOCK_DATA_DIR = Path(__file__).parents[1] / "src" / "wind_dashapp" / "mock_data"
 
 
 @pytest.mark.api_call()
@@ -37,4 +41,92 @@ def test_load_dmi_forecast_data(tmp_path):
     columns = ["wind_speed", "wind_dir", "from_datetime", "longitude", "latitude"]
     assert isinstance(df, pd.DataFrame)
     for col in columns:
-        assert col in df.columns 
\ No newline at end of file
+        assert col in df.columns
+
+
+def test_load_forecast_data_is_served_from_parsed_cache(monkeypatch, tmp_path):
+    with open(MOCK_DATA_DIR / "dmi_wind_forecast_data_mock1.json") as mock_file:
+        json_response = json.load(mock_file)
+    calls = []
+
+    def fetch_mock(*args, **kwargs):
+        calls.append(kwargs["forecast_request"])
+        return json_response
+
+    # The fetch is given the request of the key, so both belong to the same model run
+    monkeypatch.setattr(f, "get_forecast_request", lambda *args, **kwargs: ("forecast_url", "forecast_key"))
+    monkeypatch.setattr(f, "fetch_dmi_forecast_data", fetch_mock)
+
+    df_fetched = f.load_wind_forecast_data_to_app("key", 12.1, 56.0, "wind", cache_dir=tmp_path, use_mock_data=False)
+    df_cached = f.load_wind_forecast_data_to_app("key", 12.1, 56.0, "wind", cache_dir=tmp_path, use_mock_data=False)
+
+    assert calls == [("forecast_url", "forecast_key")]
+    assert (tmp_path / "forecast_key.npz").exists()
+    pd.testing.assert_frame_equal(df_fetched, df_cached)
+    assert str(df_cached["from_datetime"].dt.tz) == "Europe/Copenhagen"
+
+
+def test_load_obs_data_is_memoized_once(monkeypatch, tmp_path):
+    df = pd.DataFrame(
+        {
+            "from_datetime": pd.date_range("2025-07-04", periods=3, freq="h", tz="Europe/Copenhagen"),
+            "mean_wind_speed": [1.5, 2.5, 3.5],
+        }
+    )
+    frame_memo = FrameLRUCache()
+    put = frame_memo.put
+    puts = []
+
+    def put_and_count(key, df, **kwargs):
+        puts.append(key)
+        put(key, df, **kwargs)
+
+    monkeypatch.setattr(frame_memo, "put", put_and_count)
+    monkeypatch.setattr(f, "frame_memo", frame_memo)
+    monkeypatch.setattr(f, "load_obs_data_from_store", lambda *args, **kwargs: df)
+
+    for _ in range(3):
+        df_loaded = f.load_wind_obs_data_to_app(
+            "key", "10km_622_71", "2025-07-05", 3, cache_dir=tmp_path, use_mock_data=False
+        )
+
+    pd.testing.assert_frame_equal(df_loaded, df)
+    assert len(puts) == 1
+    assert frame_memo.stats()["hits"] == 2
+
+
+def test_frame_npz_round_trip(tmp_path):
+    df = pd.DataFrame(
+        {
+            "from_datetime": pd.date_range("2025-07-24", periods=3, freq="h", tz="Europe/Copenhagen"),
+            "cell_id": ["10km_622_71"] * 3,
+            "wind_speed": [1.5, 2.5, float("nan")],
+            "n": [1, 2, 3],
+        }
+    )
+
+    write_frame_npz(tmp_path / "frame.npz", df)
+
+    pd.testing.assert_frame_equal(read_frame_npz(tmp_path / "frame.npz"), df)
+
+
+@pytest.mark.parametrize("pack_arrays", [False, True])
+def test_store_frame_round_trip(pack_arrays):
+    df = pd.DataFrame(
+        {
+            "from_datetime": pd.date_range("2025-03-29 22:00", periods=6, freq="h", tz="UTC").tz_convert(
+                "Europe/Copenhagen"
+            ),
+            "wind_speed": [3.14159, 5.0, float("nan"), 7.25, 0.0, 12.3456],
+            "cell_id": ["10km_622_71"] * 6,
+        }
+    )
+
+    payload = json.loads(json.dumps(f.encode_frame_for_store(df, pack_arrays=pack_arrays)))
+    decoded = f.decode_store_frame(payload)
+
+    assert list(decoded.columns) == list(df.columns)
+    # Across the change to summer time
+    pd.testing.assert_series_equal(decoded["from_datetime"], df["from_datetime"])
+    pd.testing.assert_series_equal(decoded["wind_speed"], df["wind_speed"], atol=0.005, check_exact=False)
+    assert decoded["cell_id"].tolist() == df["cell_id"].tolist()
@@ -0,0 +1,19 @@
+import pytest
+
+from wind_dashapp.helper_functions import background_callbacks
+
+
+def test_background_callbacks_are_off_by_default():
+    assert background_callbacks.create_background_callback_manager("off") is None
+    assert background_callbacks.get_celery_app(None) is None
+
+
+def test_unknown_background_callback_mode_raises():
+    with pytest.raises(ValueError):
+        background_callbacks.create_background_callback_manager("threads")
+
+
+@pytest.mark.skipif(background_callbacks.diskcache is not None, reason="diskcache is installed")
+def test_diskcache_mode_requires_diskcache():
+    with pytest.raises(ValueError):
+        background_callbacks.create_background_callback_manager("diskcache")
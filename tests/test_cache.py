@@ -0,0 +1,209 @@
+import datetime as dt
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import (
+    CACHE_TTL_SECONDS,
+    CacheIndex,
+    FrameLRUCache,
+    atomic_write_json,
+    get_cache_index,
+    single_flight,
+)
+from wind_dashapp.data_processing.dmi import (
+    fetch_dmi_observational_data,
+    get_observational_cache_kind,
+    open_dmi_observational_data,
+)
+
+
+def test_concurrent_cache_misses_share_one_upstream_request(dmi_stand_in, tmp_path):
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+    dmi_stand_in.delay = 0.2
+
+    def fetch(_):
+        return fetch_dmi_observational_data(
+            "key", "10km_622_71", "2025-07-05", 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(fetch, range(8)))
+
+    assert len(dmi_stand_in.requests) == 1
+    assert all(response == dmi_stand_in.default_body for response in responses)
+
+
+def test_single_flight_serializes_same_key(tmp_path):
+    events = []
+
+    def work(i):
+        with single_flight(str(tmp_path), "key"):
+            events.append(("enter", i))
+            events.append(("exit", i))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(work, range(4)))
+
+    # Every enter is directly followed by its own exit
+    assert all(events[i][1] == events[i + 1][1] for i in range(0, len(events), 2))
+
+
+def test_atomic_write_json_leaves_no_temporary_files(tmp_path):
+    path = os.path.join(tmp_path, "data.json")
+
+    atomic_write_json(path, {"a": 1})
+    atomic_write_json(path, {"a": 2})
+
+    with open(path) as f:
+        assert json.load(f) == {"a": 2}
+    assert os.listdir(tmp_path) == ["data.json"]
+
+
+def write_cache_file(cache_dir, file_name, n_bytes):
+    with open(os.path.join(cache_dir, file_name), "wb") as f:
+        f.write(b"x" * n_bytes)
+
+
+def test_cache_index_counts_hits_and_misses(tmp_path):
+    cache_index = CacheIndex(str(tmp_path))
+    write_cache_file(tmp_path, "a.json", 10)
+    cache_index.add("a.json", "forecast")
+
+    assert cache_index.lookup("a.json") == os.path.join(tmp_path, "a.json")
+    assert cache_index.lookup("b.json") is None
+    assert cache_index.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "total_bytes": 10}
+
+
+def test_cache_index_expires_entries_per_kind(tmp_path):
+    cache_index = CacheIndex(str(tmp_path), ttl_seconds={"forecast": 0, "observation": None})
+    write_cache_file(tmp_path, "forecast.json", 10)
+    write_cache_file(tmp_path, "observation.json", 10)
+    cache_index.add("forecast.json", "forecast")
+    cache_index.add("observation.json", "observation")
+    time.sleep(0.01)
+
+    assert cache_index.lookup("forecast.json") is None
+    assert cache_index.lookup("observation.json") is not None
+    assert not os.path.exists(os.path.join(tmp_path, "forecast.json"))
+
+
+def test_cache_index_evicts_least_recently_used_over_budget(tmp_path):
+    cache_index = CacheIndex(str(tmp_path), max_bytes=25)
+    for file_name in ("a.json", "b.json"):
+        write_cache_file(tmp_path, file_name, 10)
+        cache_index.add(file_name, "observation")
+    cache_index.lookup("a.json")  # b.json is now least recently used
+
+    write_cache_file(tmp_path, "c.json", 10)
+    cache_index.add("c.json", "observation")
+
+    assert cache_index.lookup("b.json") is None
+    assert cache_index.lookup("a.json") is not None
+    assert cache_index.stats()["evictions"] == 1
+    assert cache_index.stats()["total_bytes"] == 20
+
+
+def test_fetch_uses_cache_index(dmi_stand_in, tmp_path):
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+
+    for _ in range(2):
+        fetch_dmi_observational_data(
+            "key", "10km_622_71", "2025-07-05", 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+        )
+
+    stats = get_cache_index(str(tmp_path)).stats()
+    assert len(dmi_stand_in.requests) == 1
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+
+
+def test_observation_windows_are_kept_long_only_once_complete():
+    now = dt.datetime(2025, 7, 10, 12, tzinfo=ZoneInfo("UTC"))
+
+    assert get_observational_cache_kind("2025-07-05", 48, now=now) == "observation"
+    assert get_observational_cache_kind("2025-07-09", 48, now=now) == "recent_observation"
+    assert get_observational_cache_kind("2025-07-10", 24, now=now) == "recent_observation"
+
+
+def test_fetch_refreshes_recent_observation_windows(dmi_stand_in, tmp_path, monkeypatch):
+    monkeypatch.setitem(CACHE_TTL_SECONDS, "recent_observation", 0)
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+    today = dt.date.today().isoformat()
+
+    for date_from in ("2025-07-05", "2025-07-05", today, today):
+        fetch_dmi_observational_data(
+            "key", "10km_622_71", date_from, 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+        )
+
+    # The historical window is served from the cache, the open one is fetched again
+    assert len(dmi_stand_in.requests) == 3
+
+
+def test_fetch_refetches_file_evicted_between_lookup_and_read(dmi_stand_in, tmp_path, monkeypatch):
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+    fetch_dmi_observational_data(
+        "key", "10km_622_71", "2025-07-05", 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    lookup = CacheIndex.lookup
+
+    def lookup_then_evict(self, file_name):
+        # Another process evicts the file right after the lookup
+        path = lookup(self, file_name)
+        if path is not None:
+            os.remove(path)
+        return path
+
+    monkeypatch.setattr(CacheIndex, "lookup", lookup_then_evict)
+    response = fetch_dmi_observational_data(
+        "key", "10km_622_71", "2025-07-05", 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    assert response == dmi_stand_in.default_body
+    assert len(dmi_stand_in.requests) == 2
+
+
+def test_fetch_reads_response_larger_than_cache_budget(dmi_stand_in, tmp_path):
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+    get_cache_index(str(tmp_path)).max_bytes = 1
+
+    with open_dmi_observational_data(
+        "key", "10km_622_71", "2025-07-05", 48, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    ) as fp:
+        assert json.load(fp) == dmi_stand_in.default_body
+
+    assert get_cache_index(str(tmp_path)).stats()["entries"] == 0
+
+
+def test_frame_lru_cache_copies_on_read():
+    frame_cache = FrameLRUCache(max_entries=2)
+    frame_cache.put("a", pd.DataFrame({"x": [1, 2]}))
+
+    df = frame_cache.get("a")
+    df["x"] = 0
+
+    assert frame_cache.get("a")["x"].tolist() == [1, 2]
+    assert frame_cache.get("b") is None
+    assert frame_cache.stats()["hits"] == 2
+    assert frame_cache.stats()["misses"] == 1
+
+
+def test_frame_lru_cache_is_bounded_by_entries_and_memory():
+    df = pd.DataFrame({"x": range(100)})
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    frame_cache = FrameLRUCache(max_entries=3, max_bytes=2 * size)
+
+    for key in ("a", "b", "c"):
+        frame_cache.put(key, df)
+        frame_cache.get("a")  # keep a as most recently used
+
+    assert frame_cache.get("a") is not None
+    assert frame_cache.get("b") is None
+    assert frame_cache.get("c") is not None
+    assert frame_cache.stats()["evictions"] == 1
+    assert frame_cache.stats()["total_bytes"] == 2 * size
@@ -0,0 +1,121 @@
+import uuid
+
+import pandas as pd
+import psycopg2
+import pytest
+
+from wind_dashapp.data_processing import db
+from wind_dashapp.helper_functions.app_helper_functions import OBS_CHART_PARAMETERS, load_obs_data_from_db
+
+PARAMETERS = ["mean_wind_speed", "mean_wind_dir"]
+
+
+@pytest.fixture
+def db_pool():
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    try:
+        conn = psycopg2.connect(
+            dbname=db.DB_NAME, user=db.DB_USER, password=db.DB_PASSWORD, host=db.DB_HOST, port=db.DB_PORT
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+
+    pool = db.create_db_pool(maxconn=2, options=f"-c search_path={schema}")
+    db.create_schema(pool)
+
+    yield pool
+
+    pool.closeall()
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+    conn.close()
+
+
+def obs_frame(cell_id, start, n_hours, offset=0.0, parameters=PARAMETERS):
+    rows = []
+    for i, timestamp in enumerate(pd.date_range(start, periods=n_hours, freq="h", tz="UTC")):
+        for parameter_id in parameters:
+            rows.append(
+                {"cell_id": cell_id, "from": timestamp.isoformat(), "parameter_id": parameter_id, "value": i + offset}
+            )
+    return pd.DataFrame(rows)
+
+
+def test_load_observations_and_read_window_across_partitions(db_pool):
+    db.load_observations(obs_frame("10km_622_71", "2023-01-31 12:00", 24), pool=db_pool)
+    db.load_observations(obs_frame("10km_622_72", "2023-01-31 12:00", 24), pool=db_pool)
+    # Reloading a period replaces its values
+    db.load_observations(obs_frame("10km_622_71", "2023-02-01 00:00", 12, offset=100), pool=db_pool)
+
+    start = pd.Timestamp("2023-01-31 12:00", tz="UTC")
+    end = start + pd.Timedelta(hours=24)
+    df = db.load_obs_window("10km_622_71", start, end, PARAMETERS, pool=db_pool)
+
+    assert list(df.columns) == ["from_datetime"] + PARAMETERS
+    assert str(df["from_datetime"].dt.tz) == "Europe/Copenhagen"
+    assert df["mean_wind_speed"].tolist() == list(range(12)) + list(range(100, 112))
+    assert db.load_obs_window("10km_622_99", start, end, PARAMETERS, pool=db_pool) is None
+
+
+def test_load_obs_window_requires_every_hour_and_parameter(db_pool):
+    db.load_observations(obs_frame("10km_622_71", "2023-01-31 12:00", 12), pool=db_pool)
+    start = pd.Timestamp("2023-01-31 12:00", tz="UTC")
+    end = start + pd.Timedelta(hours=12)
+
+    assert db.load_obs_window("10km_622_71", start, end, PARAMETERS, pool=db_pool) is not None
+    # Missing hours, and missing parameters
+    assert db.load_obs_window("10km_622_71", start, end + pd.Timedelta(hours=12), PARAMETERS, pool=db_pool) is None
+    assert db.load_obs_window("10km_622_71", start, end, PARAMETERS + ["max_wind_speed_3sec"], pool=db_pool) is None
+
+
+def test_load_obs_data_from_db_serves_full_window(db_pool, monkeypatch):
+    monkeypatch.setattr(db, "_db_pool", db_pool)
+    # Midnight in Copenhagen
+    df_obs = obs_frame("10km_622_71", "2023-01-30 23:00", 24, parameters=OBS_CHART_PARAMETERS)
+    db.load_observations(df_obs, pool=db_pool)
+
+    df = load_obs_data_from_db("10km_622_71", "2023-01-31", 24)
+
+    assert list(df.columns) == ["from_datetime"] + OBS_CHART_PARAMETERS
+    assert df["from_datetime"].iloc[0] == pd.Timestamp("2023-01-31", tz="Europe/Copenhagen")
+    assert df["max_wind_speed_3sec"].tolist() == list(range(24))
+
+
+def test_get_db_pool_backs_off_after_connection_failure(monkeypatch):
+    attempts = []
+
+    def create_db_pool():
+        attempts.append(1)
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(db, "create_db_pool", create_db_pool)
+    monkeypatch.setattr(db, "_db_pool", None)
+    monkeypatch.setattr(db, "_db_retry_at", 0.0)
+
+    for _ in range(3):
+        with pytest.raises(psycopg2.OperationalError):
+            db.get_db_pool()
+
+    assert len(attempts) == 1
+
+
+def test_load_forecast(db_pool):
+    df = pd.DataFrame(
+        {
+            "wind_speed": [5.0, 6.0],
+            "wind_dir": [180.0, 190.0],
+            "from": ["2025-07-24T06:00:00Z", "2025-07-24T07:00:00Z"],
+            "longitude": 12.1,
+            "latitude": 56.0,
+        }
+    )
+
+    assert db.load_forecast(df, "10km_622_71", "2025-07-24T060000Z", pool=db_pool) == 4
+    assert db.load_forecast(df, "10km_622_71", "2025-07-24T060000Z", pool=db_pool) == 4
+
+    with db.db_connection(db_pool) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM forecasts")
+        assert cursor.fetchone()[0] == 4
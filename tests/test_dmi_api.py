@@ -5,8 +5,12 @@ from wind_dashapp.data_processing.dmi import (
     parse_dmi_forecast_data,
     fetch_dmi_observational_data,
     parse_dmi_observational_data,
+    parse_dmi_observational_data_stream,
 )
+import io
+import json
 import pandas as pd
+from pathlib import Path
 from dotenv import load_dotenv
 import os
 
@@ -14,6 +18,7 @@ load_dotenv()
 
 DMI_API_KEY_OBSERVATION = os.getenv("DMI_API_KEY_OBSERVATION")
 DMI_API_KEY_FORECAST = os.getenv("DMI_API_KEY_FORECAST")
+MOCK_DATA_DIR = Path(__file__).parents[1] / "src" / "wind_dashapp" / "mock_data"
 
 @pytest.mark.api_call()
 def test_get_dmi_forecast_data():
@@ -89,4 +94,34 @@ def test_get_dmi_observational_data_integration_with_mock_data():
 
     json_response = fetch_dmi_observational_data(DMI_API_KEY_OBSERVATION, cell_id, date_from, n_hours=130)
 
-    assert json_response is not None
\ No newline at end of file
+    assert json_response is not None
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64 * 1024])
+def test_parse_observational_data_stream_matches_full_parse(chunk_size):
+    mock_path = MOCK_DATA_DIR / "dmi_wind_obs_data_mock6.json"
+    with open(mock_path) as f:
+        expected = parse_dmi_observational_data(json.load(f))
+
+    with open(mock_path, "rb") as fp:
+        df = parse_dmi_observational_data_stream(fp, chunk_size=chunk_size)
+
+    pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+
+def test_parse_observational_data_stream_handles_any_key_order():
+    response = {
+        "numberReturned": 123456,
+        "features": [
+            {"properties": {"cellId": "c", "from": "f", "to": "t", "parameterId": "mean_wind_speed", "value": 1.5}},
+            {"properties": {"cellId": "c", "from": "f", "to": "t", "parameterId": "leaf_moisture", "value": 2}},
+        ],
+        "type": "FeatureCollection",
+    }
+    fp = io.BytesIO(json.dumps(response, indent=2).encode("utf-8"))
+
+    df = parse_dmi_observational_data_stream(fp, chunk_size=3)
+
+    assert df.to_dict("records") == [
+        {"cell_id": "c", "from": "f", "to": "t", "parameter_id": "mean_wind_speed", "value": 1.5}
+    ]
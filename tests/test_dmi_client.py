@@ -0,0 +1,200 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from wind_dashapp.data_processing import dmi, dmi_client
+from wind_dashapp.data_processing.dmi import (
+    fetch_dmi_forecast_data,
+    fetch_dmi_forecast_data_batch,
+    fetch_dmi_observational_data,
+)
+
+MOCK_DATA_DIR = Path(__file__).parents[1] / "src" / "wind_dashapp" / "mock_data"
+
+
+@pytest.fixture
+def forecast_json():
+    with open(MOCK_DATA_DIR / "dmi_wind_forecast_data_mock1.json") as f:
+        return json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries():
+    dmi_client.configure_dmi_session(retries=2, backoff_factor=0)
+    yield
+    dmi_client.configure_dmi_session()
+
+
+def test_fetch_forecast_reuses_pooled_connection(dmi_stand_in, forecast_json, tmp_path):
+    dmi_stand_in.default_body = forecast_json
+
+    for lon in (12.1, 12.2):
+        json_response = fetch_dmi_forecast_data(
+            "key", lon, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+        )
+        assert json_response["domain"] == forecast_json["domain"]
+
+    assert len(dmi_stand_in.requests) == 2
+    # Same client port for both requests means the connection was kept alive
+    assert dmi_stand_in.requests[0]["client"] == dmi_stand_in.requests[1]["client"]
+    assert "gzip" in dmi_stand_in.requests[0]["headers"]["Accept-Encoding"]
+
+
+def test_fetch_forecast_decodes_gzip(dmi_stand_in, forecast_json, tmp_path):
+    dmi_stand_in.default_body = forecast_json
+    dmi_stand_in.use_gzip = True
+
+    json_response = fetch_dmi_forecast_data("key", 12.1, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url)
+
+    assert json_response["ranges"] == forecast_json["ranges"]
+
+
+def test_fetch_observations_retries_on_server_errors(dmi_stand_in, tmp_path):
+    dmi_stand_in.responses = [(503, {}), (429, {})]
+    dmi_stand_in.default_body = {"type": "FeatureCollection", "features": []}
+
+    json_response = fetch_dmi_observational_data(
+        "key", "10km_622_71", "2025-07-05", 2, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    assert json_response["features"] == []
+    assert len(dmi_stand_in.requests) == 3
+
+
+def test_fetch_raises_when_retries_are_exhausted(dmi_stand_in, tmp_path):
+    dmi_stand_in.responses = [(500, {})] * 3
+
+    with pytest.raises(ValueError):
+        fetch_dmi_forecast_data("key", 12.1, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url)
+
+
+def test_fetch_times_out_on_hung_gateway(dmi_stand_in, tmp_path):
+    dmi_client.configure_dmi_session(retries=0)
+    dmi_stand_in.delay = 1.0
+
+    with pytest.raises(ValueError):
+        fetch_dmi_forecast_data(
+            "key", 12.1, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url, timeout=0.2
+        )
+
+
+def test_fetch_forecast_batch_skips_cached_cells(dmi_stand_in, forecast_json, tmp_path):
+    dmi_stand_in.default_body = forecast_json
+    cells = [(f"10km_622_{i}", 12.0 + i / 10, 56.0) for i in range(5)]
+    fetch_dmi_forecast_data("key", cells[0][1], cells[0][2], "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url)
+
+    forecasts = fetch_dmi_forecast_data_batch(
+        "key", cells, "wind", max_concurrency=3, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    assert sorted(forecasts) == sorted(cell_id for cell_id, _, _ in cells)
+    assert all(len(df) == len(forecast_json["domain"]["axes"]["t"]["values"]) for df in forecasts.values())
+    assert len(dmi_stand_in.requests) == len(cells)
+
+
+def test_fetch_forecast_batch_leaves_out_failed_cells(dmi_stand_in, forecast_json, tmp_path):
+    dmi_client.configure_dmi_session(retries=0)
+    dmi_stand_in.responses = [(404, {})]
+    dmi_stand_in.default_body = forecast_json
+    cells = [("10km_622_1", 12.1, 56.0), ("10km_622_2", 12.2, 56.0)]
+
+    forecasts = fetch_dmi_forecast_data_batch(
+        "key", cells, "wind", max_concurrency=1, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    assert list(forecasts) == ["10km_622_2"]
+
+
+def test_fetch_forecast_batch_continues_after_unexpected_errors(dmi_stand_in, forecast_json, tmp_path, monkeypatch):
+    dmi_stand_in.default_body = forecast_json
+    fetch_forecast = dmi.fetch_dmi_forecast_data
+
+    def fetch_or_fail(api_key, lon, lat, *args, **kwargs):
+        if lon == 12.1:
+            raise OSError("No space left on device")
+        return fetch_forecast(api_key, lon, lat, *args, **kwargs)
+
+    monkeypatch.setattr(dmi, "fetch_dmi_forecast_data", fetch_or_fail)
+    cells = [("10km_622_1", 12.1, 56.0), ("10km_622_2", 12.2, 56.0)]
+
+    forecasts = fetch_dmi_forecast_data_batch(
+        "key", cells, "wind", max_concurrency=1, cache_dir=tmp_path, gateway_url=dmi_stand_in.url
+    )
+
+    assert list(forecasts) == ["10km_622_2"]
+
+
+def test_host_rate_limiter_spaces_requests():
+    rate_limiter = dmi_client.HostRateLimiter(requests_per_second=50)
+
+    start = time.monotonic()
+    for _ in range(6):
+        rate_limiter.acquire("https://dmigw.govcloud.dk/v1/forecastedr")
+    rate_limiter.acquire("https://other.host/")
+
+    assert time.monotonic() - start >= 5 / 50
+
+
+def test_forecast_cache_follows_latest_model_run(dmi_stand_in, forecast_json, tmp_path):
+    dmi_stand_in.default_body = forecast_json
+    dmi_stand_in.routes = {"/instances?": {"instances": [{"id": "2025-07-24T030000Z"}, {"id": "2025-07-24T060000Z"}]}}
+
+    for _ in range(2):
+        fetch_dmi_forecast_data("key", 12.1, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url)
+    assert len(dmi_stand_in.requests) == 1
+
+    # A new run is published and picked up at the next probe
+    dmi_stand_in.routes["/instances?"]["instances"].append({"id": "2025-07-24T090000Z"})
+    dmi._latest_model_runs.clear()
+    fetch_dmi_forecast_data("key", 12.1, 56.0, "wind", cache_dir=tmp_path, gateway_url=dmi_stand_in.url)
+
+    # The data is fetched from the instance of the run in the cache key
+    paths = [request["path"] for request in dmi_stand_in.requests]
+    assert len(paths) == 2
+    assert "/harmonie_dini_sf/instances/2025-07-24T060000Z/position?" in paths[0]
+    assert "/harmonie_dini_sf/instances/2025-07-24T090000Z/position?" in paths[1]
+
+
+def test_latest_model_run_is_probed_once_per_interval(dmi_stand_in):
+    dmi_stand_in.routes = {"/instances?": {"instances": [{"id": "2025-07-24T060000Z"}]}}
+
+    run_id = dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url)
+    dmi_stand_in.routes["/instances?"] = {"instances": [{"id": "2025-07-24T090000Z"}]}
+
+    assert run_id == "2025-07-24T060000Z"
+    assert dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url) == run_id
+    assert dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url, probe_interval=0) == (
+        "2025-07-24T090000Z"
+    )
+
+
+def test_latest_model_run_is_probed_through_shared_session(dmi_stand_in):
+    session = dmi_client.configure_dmi_session(retries=0)
+    response_urls = []
+    session.hooks["response"].append(lambda response, *args, **kwargs: response_urls.append(response.url))
+
+    run_id = dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url)
+
+    assert run_id == "2025-07-24T060000Z"
+    assert response_urls == [f"{dmi_stand_in.url}/v1/forecastedr/collections/harmonie_dini_sf/instances?api-key=key"]
+
+
+def test_latest_model_run_serves_previous_run_while_probing(dmi_stand_in):
+    dmi_stand_in.routes = {"/instances?": {"instances": [{"id": "2025-07-24T060000Z"}]}}
+    dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url)
+
+    dmi_stand_in.routes["/instances?"] = {"instances": [{"id": "2025-07-24T090000Z"}]}
+    dmi_stand_in.delay = 1.0
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        probe = executor.submit(dmi.get_latest_model_run, "key", "wind", gateway_url=dmi_stand_in.url, probe_interval=0)
+        time.sleep(0.2)
+
+        start = time.monotonic()
+        run_id = dmi.get_latest_model_run("key", "wind", gateway_url=dmi_stand_in.url, probe_interval=0)
+
+        assert time.monotonic() - start < 0.5
+        assert run_id == "2025-07-24T060000Z"
+        assert probe.result() == "2025-07-24T090000Z"
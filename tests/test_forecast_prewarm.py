@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from wind_dashapp.helper_functions import forecast_prewarm
+
+
+def test_popular_cells_are_ordered_by_requests(tmp_path):
+    for cell_id in ["10km_622_71", "10km_620_44", "10km_622_71"]:
+        forecast_prewarm.record_cell_request(cell_id, cache_dir=tmp_path)
+
+    assert forecast_prewarm.get_popular_cells(1, cache_dir=tmp_path) == ["10km_622_71"]
+    assert forecast_prewarm.get_popular_cells(5, cache_dir=tmp_path) == ["10km_622_71", "10km_620_44"]
+
+
+def test_cell_requests_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast_prewarm, "CELL_REQUESTS_FLUSH_SECONDS", 3600)
+    forecast_prewarm.flush_cell_requests()
+
+    for _ in range(3):
+        forecast_prewarm.record_cell_request("10km_622_71", cache_dir=tmp_path)
+    assert not (tmp_path / forecast_prewarm.CELL_REQUESTS_FILE_NAME).exists()
+
+    forecast_prewarm.flush_cell_requests()
+    forecast_prewarm.record_cell_request("10km_620_44", cache_dir=tmp_path)
+
+    assert forecast_prewarm.get_popular_cells(5, cache_dir=tmp_path) == ["10km_622_71", "10km_620_44"]
+
+
+def test_select_cells_uses_grid_centroids():
+    cells = forecast_prewarm.select_cells("list", cell_ids=["10km_622_71", "not_a_cell"])
+
+    assert [cell_id for cell_id, _, _ in cells] == ["10km_622_71"]
+    assert len(forecast_prewarm.select_cells("all")) > 100
+
+    with pytest.raises(ValueError):
+        forecast_prewarm.select_cells("nearby")
+
+
+def test_prewarm_model_run_logs_coverage(monkeypatch, tmp_path):
+    cells = [("a", 10.0, 55.0), ("b", 11.0, 55.0), ("c", 12.0, 55.0)]
+
+    def load(api_key, lon, lat, collection_type, rate_limiter, **kwargs):
+        # Cell a is fetched, b is served from a cache and c fails
+        if lon == 12.0:
+            raise ValueError("502 Server Error")
+        if lon == 10.0:
+            rate_limiter.acquire("https://dmigw.govcloud.dk/v1/forecastedr")
+
+    monkeypatch.setattr(forecast_prewarm, "load_wind_forecast_data_to_app", load)
+    log_path = tmp_path / "prewarm_runs.jsonl"
+
+    record = forecast_prewarm.prewarm_model_run(
+        "key", "2025-07-24T06:00:00Z", cells, requests_per_second=100, cache_dir=str(tmp_path), log_path=str(log_path)
+    )
+
+    assert record["fetched"] == 1
+    assert record["cached"] == 1
+    assert record["failed"] == 1
+    assert record["coverage"] == pytest.approx(2 / 3, abs=1e-4)
+    assert json.loads(log_path.read_text().splitlines()[0])["model_run"] == "2025-07-24T06:00:00Z"
@@ -0,0 +1,64 @@
+import io
+
+import pandas as pd
+import pytest
+
+from wind_dashapp.data_processing.cache import frame_to_npz_bytes, read_frame_npz
+from wind_dashapp.helper_functions import frame_store
+
+
+def make_frame(n_rows=4):
+    return pd.DataFrame(
+        {
+            "from_datetime": pd.date_range("2025-07-24", periods=n_rows, freq="h", tz="Europe/Copenhagen"),
+            "wind_speed": [float(i) for i in range(n_rows)],
+        }
+    )
+
+
+def test_memory_frame_store_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(frame_store.time, "time", lambda: now[0])
+    store = frame_store.MemoryFrameStore(ttl_seconds=60)
+    df = make_frame()
+
+    key = frame_store.make_frame_key("session", "forecast")
+    store.put(key, df)
+    pd.testing.assert_frame_equal(store.get(key), df)
+
+    now[0] += 61
+    assert store.get(key) is None
+    assert store.frames.stats()["entries"] == 0
+
+
+def test_memory_frame_store_forgets_evicted_entries():
+    store = frame_store.MemoryFrameStore(ttl_seconds=60, max_entries=2)
+
+    for _ in range(5):
+        store.put(frame_store.make_frame_key("session", "forecast"), make_frame())
+
+    assert store.frames.stats()["entries"] == 2
+    assert len(store.frames._expires_at) == 2
+
+
+def test_redis_frame_store_treats_unreachable_server_as_miss():
+    pytest.importorskip("redis")
+    store = frame_store.RedisFrameStore(url="redis://127.0.0.1:1/0")
+
+    assert store.get("session:forecast:key") is None
+    with pytest.raises(ValueError):
+        store.put("session:forecast:key", make_frame())
+
+
+def test_frame_keys_are_scoped_by_session():
+    key = frame_store.make_frame_key("session-a", "obs")
+
+    assert key != frame_store.make_frame_key("session-a", "obs")
+    assert frame_store.is_session_key(key, "session-a")
+    assert not frame_store.is_session_key(key, "session-b")
+
+
+def test_frame_npz_bytes_round_trip():
+    df = make_frame()
+
+    pd.testing.assert_frame_equal(read_frame_npz(io.BytesIO(frame_to_npz_bytes(df))), df)
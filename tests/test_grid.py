@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+from wind_dashapp.data_processing.grid import (
+    GRID_GEOJSON_PATH,
+    build_grid_bundle,
+    check_grid_bundle_source,
+    load_grid_bundle,
+)
+from wind_dashapp.helper_functions.app_helper_functions import get_map
+
+
+def test_bundled_grid_matches_geojson():
+    with open(GRID_GEOJSON_PATH) as f:
+        features = json.load(f)["features"]
+
+    geoj_grid, shp_grid, hover_data_map = get_map()
+
+    assert shp_grid["KN10kmDK"].tolist() == [feature["properties"]["KN10kmDK"] for feature in features]
+    assert [feature["properties"]["KN10kmDK"] for feature in geoj_grid["features"]] == shp_grid["KN10kmDK"].tolist()
+    assert np.allclose(
+        geoj_grid["features"][0]["geometry"]["coordinates"], features[0]["geometry"]["coordinates"], atol=1e-4
+    )
+    assert hover_data_map.shape == (len(features), 3)
+    assert hover_data_map[0].tolist() == [
+        features[0]["properties"]["Stednavn"] or "No name",
+        features[0]["properties"]["cent_lon"],
+        features[0]["properties"]["cent_lat"],
+    ]
+
+
+def test_grid_bundle_is_verified(tmp_path):
+    bundle_path = tmp_path / "grid.npz"
+    build_grid_bundle(GRID_GEOJSON_PATH, bundle_path)
+
+    with np.load(bundle_path) as npz:
+        arrays = dict(npz)
+    arrays["cent_lon"] = arrays["cent_lon"] + 1
+    np.savez(bundle_path, **arrays)
+
+    with pytest.raises(ValueError, match="hash"):
+        load_grid_bundle(bundle_path)
+
+
+def test_grid_bundle_is_built_from_current_geojson(tmp_path):
+    # The bundled grid has to be rebuilt whenever the GeoJSON in assets changes
+    check_grid_bundle_source()
+
+    bundle_path = tmp_path / "grid.npz"
+    source_path = tmp_path / "grid.geojson"
+    source_path.write_text(open(GRID_GEOJSON_PATH).read().replace("55.54", "55.55"))
+    build_grid_bundle(GRID_GEOJSON_PATH, bundle_path)
+
+    with pytest.raises(ValueError, match="outdated"):
+        check_grid_bundle_source(bundle_path, source_path)
+    # Workers load the bundle without the GeoJSON
+    assert len(load_grid_bundle(bundle_path)["cell_ids"]) > 0
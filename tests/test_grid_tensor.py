@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_dashapp.data_processing.grid_tensor import GridTensor, build_obs_tensor, get_grid_tensor
+from wind_dashapp.data_processing.obs_store import ObsStore, build_obs_store
+
+CELL_IDS = ["10km_622_71", "10km_622_72", "10km_622_73"]
+
+
+@pytest.fixture
+def obs_store_dir(tmp_path, write_obs_chunk, obs_parameters):
+    write_obs_chunk(tmp_path / "2023-01-31.npz", CELL_IDS[:2], "2023-01-31", 24)
+    write_obs_chunk(tmp_path / "2023-02-01.npz", CELL_IDS[1:], "2023-02-01", 24)
+    store_dir = tmp_path / "store"
+    build_obs_store([tmp_path / "2023-01-31.npz", tmp_path / "2023-02-01.npz"], store_dir, obs_parameters)
+
+    return store_dir
+
+
+def test_grid_tensor_windows_match_obs_store(tmp_path, obs_store_dir, obs_parameters):
+    start = pd.Timestamp("2023-01-31", tz="UTC")
+    tensor_dir = tmp_path / "tensor"
+    build_obs_tensor(
+        start, start + pd.Timedelta(hours=48), str(obs_store_dir), str(tensor_dir), CELL_IDS, obs_parameters
+    )
+
+    grid_tensor = GridTensor(str(tensor_dir))
+    window_start = pd.Timestamp("2023-01-31 12:00", tz="UTC")
+    window_end = window_start + pd.Timedelta(hours=24)
+
+    assert isinstance(grid_tensor.values, np.memmap)
+    assert grid_tensor.values.shape == (3, 48, 2)
+    assert grid_tensor.cell_window("10km_622_72", window_start, window_end).shape == (24, 2)
+
+    df = grid_tensor.window_frame("10km_622_72", window_start, window_end)
+    df_store = ObsStore(str(obs_store_dir)).load_window("10km_622_72", window_start, window_end)
+    pd.testing.assert_frame_equal(df, df_store, check_freq=False)
+
+    # Cells without observations on a day are NaN
+    assert np.isnan(grid_tensor.cell_window("10km_622_71", start + pd.Timedelta(hours=24))).all()
+    assert np.isnan(grid_tensor.cell_window("10km_622_73", start, start + pd.Timedelta(hours=24))).all()
+    with pytest.raises(ValueError):
+        grid_tensor.cell_window("10km_0_0")
+
+
+def test_grid_tensor_reduces_across_cells(tmp_path, obs_store_dir, obs_parameters):
+    start = pd.Timestamp("2023-01-31", tz="UTC")
+    tensor_dir = tmp_path / "tensor"
+    build_obs_tensor(
+        start, start + pd.Timedelta(hours=48), str(obs_store_dir), str(tensor_dir), CELL_IDS, obs_parameters
+    )
+
+    grid_tensor = get_grid_tensor(str(tensor_dir))
+    max_wind_dir = grid_tensor.reduce("mean_wind_dir")
+    mean_wind_speed = grid_tensor.reduce("mean_wind_speed", np.nanmean, start, start + pd.Timedelta(hours=12))
+
+    assert max_wind_dir.to_dict() == {"10km_622_71": 123.0, "10km_622_72": 123.0, "10km_622_73": 123.0}
+    assert mean_wind_speed["10km_622_71"] == 5.5
+    assert np.isnan(mean_wind_speed["10km_622_73"])
+    assert get_grid_tensor(str(tensor_dir)) is grid_tensor
+    assert get_grid_tensor(str(tmp_path / "missing")) is None
@@ -0,0 +1,128 @@
+import json
+import os
+from zipfile import ZipFile
+
+import pandas as pd
+
+from wind_dashapp.data_processing.cache import read_frame_npz
+from wind_dashapp.data_processing.ingest_obs_archive import ingest_obs_archives, load_manifest
+from wind_dashapp.data_processing.obs_store import ObsStore
+
+
+def archive_line(cell_id, hour, parameter_id, value, time_resolution="hour", date="2023-01-01"):
+    properties = {
+        "cellId": cell_id,
+        "from": f"{date}T{hour:02d}:00:00+00:00",
+        "to": f"{date}T{hour + 1:02d}:00:00+00:00",
+        "parameterId": parameter_id,
+        "timeResolution": time_resolution,
+        "value": value,
+    }
+    return json.dumps({"type": "Feature", "properties": properties})
+
+
+def write_archive(path, members):
+    with ZipFile(path, "w") as zip_file:
+        for member_name, lines in members.items():
+            zip_file.writestr(member_name, "\n".join(lines) + "\n")
+
+
+def test_ingest_obs_archives_filters_and_chunks_rows(tmp_path):
+    zip_path = tmp_path / "2023.zip"
+    write_archive(
+        zip_path,
+        {
+            "2023-01-01.txt": [
+                archive_line("10km_622_71", 0, "mean_wind_speed", 5.1),
+                archive_line("10km_622_71", 0, "leaf_moisture", 1.0),
+                archive_line("10km_622_71", 0, "mean_wind_speed", 4.0, time_resolution="day"),
+                archive_line("10km_622_71", 1, "mean_wind_dir", 270.0),
+                archive_line("10km_622_72", 1, "mean_wind_dir", 180.0),
+            ],
+            "2023-01-02.txt": [archive_line("10km_622_71", 2, "mean_temp", -1.5)],
+            "readme.pdf": [],
+        },
+    )
+
+    totals = ingest_obs_archives([str(zip_path)], output_dir=str(tmp_path / "chunks"), n_workers=2, chunk_rows=2)
+
+    assert totals["members"] == 2
+    assert totals["lines"] == 6
+    assert totals["rows"] == 4
+    assert len(totals["chunks"]) == 3
+
+    df = pd.concat([read_frame_npz(path) for path in sorted(totals["chunks"])], ignore_index=True)
+    assert list(df.columns) == ["cellId", "from", "to", "parameterId", "value"]
+    assert df["parameterId"].tolist() == ["mean_wind_speed", "mean_wind_dir", "mean_wind_dir", "mean_temp"]
+    assert df["value"].tolist() == [5.1, 270.0, 180.0, -1.5]
+
+
+def test_ingest_obs_archives_flattens_members_in_directories(tmp_path):
+    zip_path = tmp_path / "2023.zip"
+    write_archive(zip_path, {"2023/01/2023-01-01.txt": [archive_line("10km_622_71", 0, "mean_wind_speed", 5.1)]})
+
+    totals = ingest_obs_archives([str(zip_path)], output_dir=str(tmp_path / "chunks"), n_workers=1)
+
+    assert [os.path.basename(path) for path in totals["chunks"]] == ["2023_01_2023-01-01-0000.npz"]
+    assert read_frame_npz(totals["chunks"][0])["value"].tolist() == [5.1]
+
+
+def test_ingest_obs_archives_resumes_from_manifest(tmp_path):
+    zip_path = tmp_path / "2023.zip"
+    members = {
+        f"2023-01-0{day}.txt": [archive_line("10km_622_71", 0, "mean_wind_speed", float(day), date=f"2023-01-0{day}")]
+        for day in (1, 2)
+    }
+    write_archive(zip_path, members)
+    output_dir = str(tmp_path / "chunks")
+    store_dir = str(tmp_path / "store")
+
+    # Parsed without a store, as if the run was interrupted before loading the store
+    assert ingest_obs_archives([str(zip_path)], output_dir=output_dir, n_workers=1)["members"] == 2
+
+    members["2023-01-03.txt"] = [archive_line("10km_622_71", 0, "mean_wind_speed", 3.0, date="2023-01-03")]
+    write_archive(zip_path, members)
+    totals = ingest_obs_archives([str(zip_path)], output_dir=output_dir, n_workers=1, store_dir=store_dir)
+
+    assert totals["members"] == 1
+    assert totals["skipped"] == 2
+    manifest = load_manifest(output_dir)
+    assert sorted(manifest) == [f"2023.zip/2023-01-0{day}.txt" for day in (1, 2, 3)]
+    assert all(entry["stored"] and entry["rows"] == 1 for entry in manifest.values())
+
+    start = pd.Timestamp("2023-01-01", tz="UTC")
+    df = ObsStore(store_dir).load_window("10km_622_71", start, start + pd.Timedelta(days=3))
+    assert df["mean_wind_speed"].tolist() == [1.0, 2.0, 3.0]
+
+    assert ingest_obs_archives([str(zip_path)], output_dir=output_dir, n_workers=1, store_dir=store_dir)["members"] == 0
+
+
+def test_ingest_obs_archives_replaces_rows_of_changed_members(tmp_path):
+    zip_path = tmp_path / "2023.zip"
+    output_dir = str(tmp_path / "chunks")
+    store_dir = str(tmp_path / "store")
+    other_member = [archive_line("10km_622_71", 0, "mean_wind_speed", 9.0, date="2023-01-02")]
+    write_archive(
+        zip_path,
+        {
+            "2023-01-01.txt": [archive_line("10km_622_71", hour, "mean_wind_speed", float(hour)) for hour in (0, 1)],
+            "2023-01-02.txt": other_member,
+        },
+    )
+    ingest_obs_archives([str(zip_path)], output_dir=output_dir, n_workers=1, store_dir=store_dir)
+
+    # The member is republished with hour 1 removed, a corrected hour 0 and a new hour 2
+    write_archive(
+        zip_path,
+        {
+            "2023-01-01.txt": [archive_line("10km_622_71", hour, "mean_wind_speed", hour + 0.5) for hour in (0, 2)],
+            "2023-01-02.txt": other_member,
+        },
+    )
+    totals = ingest_obs_archives([str(zip_path)], output_dir=output_dir, n_workers=1, store_dir=store_dir)
+
+    start = pd.Timestamp("2023-01-01", tz="UTC")
+    df = ObsStore(store_dir).load_window("10km_622_71", start, start + pd.Timedelta(days=2))
+    assert totals["members"] == 1
+    assert df["from_datetime"].dt.tz_convert("UTC").dt.hour.tolist() == [0, 2, 0]
+    assert df["mean_wind_speed"].tolist() == [0.5, 2.5, 9.0]
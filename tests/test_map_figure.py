@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+
+import dash
+import pytest
+from dash import html
+
+from wind_dashapp.helper_functions import map_figure
+from wind_dashapp.helper_functions.map_figure import load_map_figure, register_map_figure_route
+
+
+def create_app(**kwargs):
+    app = dash.Dash(__name__, **kwargs)
+    app.layout = html.Div()
+
+    return app
+
+
+def test_map_figure_is_built_once_and_served_compressed(tmp_path):
+    figure_hash, payload = load_map_figure(str(tmp_path))
+    assert load_map_figure(str(tmp_path)) == (figure_hash, payload)
+    assert os.listdir(tmp_path) == [f"map_figure-{figure_hash}.json.gz"]
+
+    app = create_app()
+    url = register_map_figure_route(app, figure_hash, payload)
+    response = app.server.test_client().get(url, headers={"Accept-Encoding": "gzip, deflate"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert "immutable" in response.headers["Cache-Control"]
+    figure = json.loads(gzip.decompress(response.data))
+    assert figure["data"][0]["type"] == "choroplethmap"
+    assert len(figure["data"][0]["geojson"]["features"]) == len(figure["data"][0]["locations"])
+
+    # Clients without gzip get the plain JSON
+    response = app.server.test_client().get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data) == figure
+
+
+@pytest.mark.parametrize(
+    "prefixes, route",
+    [
+        ({"url_base_pathname": "/wind/"}, "/wind/map-figure/"),
+        # Behind a proxy stripping the prefix, the app routes stay at the root
+        ({"requests_pathname_prefix": "/wind/", "routes_pathname_prefix": "/"}, "/map-figure/"),
+    ],
+)
+def test_map_figure_route_follows_app_prefixes(tmp_path, prefixes, route):
+    figure_hash, payload = load_map_figure(str(tmp_path))
+    app = create_app(**prefixes)
+
+    url = register_map_figure_route(app, figure_hash, payload)
+
+    assert url == f"/wind/map-figure/{figure_hash}.json"
+    assert app.server.test_client().get(f"{route}{figure_hash}.json").status_code == 200
+
+
+def test_map_figure_is_rebuilt_when_its_inputs_change(tmp_path, monkeypatch):
+    figure_hash, _ = load_map_figure(str(tmp_path))
+
+    monkeypatch.setattr(map_figure, "MAP_FIGURE_VERSION", map_figure.MAP_FIGURE_VERSION + 1)
+    new_figure_hash, _ = load_map_figure(str(tmp_path))
+
+    assert new_figure_hash != figure_hash
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [f"map_figure-{figure_hash}.json.gz", f"map_figure-{new_figure_hash}.json.gz"]
+    )
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from wind_dashapp.data_processing.obs_store import ObsStore, build_obs_store
+from wind_dashapp.helper_functions.app_helper_functions import load_obs_data_from_store
+
+
+def test_obs_store_serves_cell_windows_across_partitions(tmp_path, write_obs_chunk, obs_parameters):
+    write_obs_chunk(tmp_path / "2023-01-31.npz", ["10km_622_71", "10km_622_72"], "2023-01-31", 24)
+    write_obs_chunk(tmp_path / "2023-02-01.npz", ["10km_622_71", "10km_622_72"], "2023-02-01", 24)
+    store_dir = tmp_path / "store"
+
+    build_obs_store([tmp_path / "2023-01-31.npz", tmp_path / "2023-02-01.npz"], store_dir, obs_parameters)
+    obs_store = ObsStore(str(store_dir))
+
+    start = pd.Timestamp("2023-01-31 12:00", tz="UTC")
+    df = obs_store.load_window("10km_622_72", start, start + pd.Timedelta(hours=24))
+
+    assert sorted(p.name for p in store_dir.iterdir()) == ["2023-01", "2023-02"]
+    assert list(df.columns) == ["from_datetime"] + obs_parameters
+    assert len(df) == 24
+    assert df["from_datetime"].iloc[0] == start
+    assert str(df["from_datetime"].dt.tz) == "Europe/Copenhagen"
+    assert df["mean_wind_speed"].tolist() == list(range(12, 24)) + list(range(12))
+    assert obs_store.covers(start, start + pd.Timedelta(hours=24))
+    assert not obs_store.covers(start, start + pd.Timedelta(hours=48))
+
+
+def test_obs_store_merges_new_rows_into_existing_partition(tmp_path, write_obs_chunk, obs_parameters):
+    store_dir = tmp_path / "store"
+    write_obs_chunk(tmp_path / "a.npz", ["10km_622_71"], "2023-01-01", 24)
+    build_obs_store([tmp_path / "a.npz"], store_dir, obs_parameters)
+    obs_store = ObsStore(str(store_dir))
+    assert not obs_store.covers(pd.Timestamp("2023-01-02", tz="UTC"), pd.Timestamp("2023-01-03", tz="UTC"))
+
+    write_obs_chunk(tmp_path / "b.npz", ["10km_622_71", "10km_622_73"], "2023-01-02", 24)
+    build_obs_store([tmp_path / "b.npz"], store_dir, obs_parameters)
+
+    start = pd.Timestamp("2023-01-01", tz="UTC")
+    assert obs_store.covers(start, start + pd.Timedelta(hours=48))
+    assert len(obs_store.load_window("10km_622_71", start, start + pd.Timedelta(hours=48))) == 48
+    assert len(obs_store.load_window("10km_622_73", start, start + pd.Timedelta(hours=48))) == 24
+
+
+def test_load_obs_data_from_store_falls_back_outside_coverage(tmp_path, write_obs_chunk, obs_parameters):
+    store_dir = tmp_path / "store"
+    for day in ("2022-12-31", "2023-01-01", "2023-01-02"):
+        write_obs_chunk(tmp_path / f"{day}.npz", ["10km_622_71"], day, 24)
+    build_obs_store(sorted(tmp_path.glob("*.npz")), store_dir, obs_parameters)
+
+    df = load_obs_data_from_store("10km_622_71", "2023-01-01", 24, store_dir=str(store_dir))
+
+    assert len(df) == 24
+    assert df["from_datetime"].iloc[0] == pd.Timestamp("2023-01-01", tz="Europe/Copenhagen")
+    assert load_obs_data_from_store("10km_622_71", "2023-01-02", 48, store_dir=str(store_dir)) is None
+    assert load_obs_data_from_store("10km_622_71", "2023-01-01", 24, store_dir=str(tmp_path / "none")) is None
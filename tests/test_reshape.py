@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_dashapp.data_processing.reshape import long_to_wide
+
+
+def make_long_rows():
+    return pd.DataFrame(
+        {
+            "cell_id": ["b", "a", "a", "b", "a", "a"],
+            "from": [3600, 0, 3600, 0, 0, 7200],
+            "parameter_id": ["speed", "speed", "dir", "dir", "dir", "gust"],
+            "value": [4.0, 2.0, 180.0, 90.0, 170.0, 9.0],
+        }
+    )
+
+
+def test_long_to_wide_matches_pivot_table():
+    df = make_long_rows()
+
+    (cell_ids, from_seconds), labels, values = long_to_wide(
+        [df["cell_id"].to_numpy(), df["from"].to_numpy()], df["parameter_id"].to_numpy(), df["value"].to_numpy()
+    )
+
+    expected = pd.pivot_table(df, values="value", index=["cell_id", "from"], columns="parameter_id").reset_index()
+    assert cell_ids.tolist() == expected["cell_id"].tolist()
+    assert from_seconds.tolist() == expected["from"].tolist()
+    assert labels == ["dir", "gust", "speed"]
+    np.testing.assert_array_equal(values, expected[labels].to_numpy())
+
+
+def test_long_to_wide_keeps_given_column_labels():
+    df = make_long_rows()
+
+    _, labels, values = long_to_wide(
+        [df["from"].to_numpy()],
+        df["parameter_id"].to_numpy(),
+        df["value"].to_numpy(),
+        column_labels=["speed", "pressure"],
+    )
+
+    assert labels == ["speed", "pressure"]
+    np.testing.assert_array_equal(values, [[2.0, np.nan], [4.0, np.nan]])
+
+
+def test_long_to_wide_raises_on_duplicates():
+    df = make_long_rows()
+
+    with pytest.raises(ValueError, match="duplicate"):
+        long_to_wide([df["from"].to_numpy()], df["parameter_id"].to_numpy(), df["value"].to_numpy())
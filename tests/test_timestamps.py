@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wind_dashapp.data_processing.timestamps import epoch_to_datetime, parse_dmi_timestamps
+from wind_dashapp.helper_functions.app_helper_functions import filter_dmi_obs_data
+
+
+def test_parse_dmi_timestamps_matches_iso_parser():
+    values = [
+        "2023-01-03T22:00:00+00:00",
+        "2023-01-03T00:00:00.001000+01:00",
+        "2025-07-24T06:00:00.000Z",
+        "2024-02-29T23:00:00-02:30",
+        # Formats outside the fast path
+        "2023-01-03T22:00+00:00",
+        "2023-01-03T22:00:00",
+    ]
+
+    epoch_seconds, is_valid = parse_dmi_timestamps(values)
+
+    expected = pd.to_datetime(pd.Series(values), format="ISO8601", utc=True)
+    np.testing.assert_array_equal(epoch_seconds, expected.dt.as_unit("s").array.asi8)
+    np.testing.assert_array_equal(is_valid, [True, False, True, True, True, True])
+
+
+def test_parse_dmi_timestamps_raises_on_invalid_timestamps():
+    with pytest.raises(ValueError):
+        parse_dmi_timestamps(["2023-01-03T22:00:00+00:00", "not a timestamp"])
+
+
+def test_parse_dmi_timestamps_raises_on_invalid_dates():
+    assert parse_dmi_timestamps(["2024-02-29T00:00:00+00:00"])[1].all()
+    with pytest.raises(ValueError):
+        parse_dmi_timestamps(["2023-02-29T00:00:00+00:00"])
+    with pytest.raises(ValueError):
+        parse_dmi_timestamps(["2023-04-31T00:00:00Z"])
+
+
+def test_filter_dmi_obs_data_drops_millisecond_duplicates():
+    rows = [
+        ("2023-01-03T00:00:00+00:00", 1.0),
+        ("2023-01-03T00:00:00.001000+00:00", 99.0),
+        ("2023-01-03T01:00:00+00:00", 2.0),
+    ]
+    dmi_obs = pd.DataFrame(
+        [{"cellId": "10km_622_71", "from": ts, "parameterId": "mean_wind_speed", "value": v} for ts, v in rows]
+    )
+
+    df = filter_dmi_obs_data(dmi_obs, "10km_622_71", "2023-01-03")
+
+    assert df["mean_wind_speed"].tolist() == [1.0, 2.0]
+    assert df["from"].is_unique
+
+
+def test_epoch_to_datetime_converts_to_copenhagen_time():
+    epoch_seconds, _ = parse_dmi_timestamps(["2025-03-30T00:00:00Z", "2025-03-30T01:00:00Z"])
+
+    assert epoch_to_datetime(epoch_seconds).strftime("%H:%M%z").tolist() == ["01:00+0100", "03:00+0200"]